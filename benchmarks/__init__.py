@@ -0,0 +1 @@
+"""Init module to fix Pylint errors"""
@@ -0,0 +1,44 @@
+"""Benchmark comparing PlantGetter's multiprocessing Pool path with the async path
+against a local mock plant API with simulated network latency
+Run from the project root: python3 -m benchmarks.bench_extract"""
+import logging
+import time
+
+from benchmarks.mock_plant_api import MockPlantAPI
+from src.api_to_rds_pipeline.extract import PlantGetter, START_ID, MAX_404_ERRORS
+
+PLANT_COUNTS = [100, 1_000]
+LATENCY = 0.02
+
+
+def time_pool(url: str, n_plants: int) -> tuple[float, int]:
+    """Times the Pool path, given the ID range it would need to cover every plant"""
+    getter = PlantGetter(url, START_ID, MAX_404_ERRORS)
+    getter.endpoints = list(range(START_ID, n_plants + MAX_404_ERRORS))
+    start = time.perf_counter()
+    plants = getter.loop_ids_multi_threaded()
+    return time.perf_counter() - start, sum("error" not in plant for plant in plants)
+
+
+def time_async(url: str) -> tuple[float, int]:
+    """Times the async path, which discovers the ID range by itself"""
+    getter = PlantGetter(url, START_ID, MAX_404_ERRORS)
+    start = time.perf_counter()
+    plants = getter.loop_ids_async()
+    return time.perf_counter() - start, len(plants)
+
+
+def run():
+    """Runs both paths at every plant count and prints timings"""
+    logging.disable(logging.CRITICAL)
+    print(f"{'plants':>7} {'pool (s)':>9} {'found':>6} {'async (s)':>10} {'found':>6}")
+    for n_plants in PLANT_COUNTS:
+        with MockPlantAPI(n_plants, delay=LATENCY) as api:
+            pool_time, pool_found = time_pool(api.url, n_plants)
+            async_time, async_found = time_async(api.url)
+        print(f"{n_plants:>7} {pool_time:>9.2f} {pool_found:>6} "
+              f"{async_time:>10.2f} {async_found:>6}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,43 @@
+"""Microbenchmark comparing the old pandas mask scan in DataLoader.fetch_id
+with the hash-indexed KeyIndex lookup as the table grows
+Run from the project root: python3 -m benchmarks.bench_key_lookup"""
+import random
+import timeit
+
+import pandas as pd
+
+from src.api_to_rds_pipeline.key_cache import KeyIndex
+
+TABLE_SIZES = [100, 1_000, 10_000, 100_000]
+LOOKUPS = 200
+
+
+def make_city_rows(n_rows: int) -> list[tuple]:
+    """Builds (id, city_name, country_id) rows for a city table of the given size"""
+    return [(i, f"city-{i}", i % 250) for i in range(1, n_rows + 1)]
+
+
+def mask_scan(table: pd.DataFrame, key: tuple):
+    """The lookup fetch_id used to do: a boolean mask over the first key column"""
+    return table.loc[table["city_name"] == key[0]]["id"].iloc[0]
+
+
+def run():
+    """Times both lookups at every table size and prints microseconds per lookup"""
+    print(f"{'rows':>8} {'mask scan (us)':>16} {'KeyIndex (us)':>15} {'speedup':>9}")
+    for n_rows in TABLE_SIZES:
+        rows = make_city_rows(n_rows)
+        table = pd.DataFrame(rows, columns=["id", "city_name", "country_id"])
+        index = KeyIndex(rows)
+        keys = [row[1:] for row in random.sample(rows, min(LOOKUPS, n_rows))]
+
+        scan_time = timeit.timeit(lambda: [mask_scan(table, key) for key in keys], number=1)
+        index_time = timeit.timeit(lambda: [index.lookup(key) for key in keys], number=1)
+
+        scan_us = scan_time / len(keys) * 1e6
+        index_us = index_time / len(keys) * 1e6
+        print(f"{n_rows:>8} {scan_us:>16.2f} {index_us:>15.3f} {scan_us / index_us:>8.0f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,188 @@
+"""Benchmark of the minute pipeline's pandas and plain-record transform/load paths
+Cold start runs each path in a fresh interpreter: import time, first run and peak RSS.
+Warm runs repeat transform and load in one process. Both load into an in-memory stand-in
+for an empty RDS, so only the Python side of the load is measured.
+Run from the project root: python3 -m benchmarks.bench_minute_paths [--plants N ...]"""
+import argparse
+import json
+import logging
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+
+from benchmarks.mock_plant_api import make_plant
+
+PATHS = ["pandas", "records"]
+
+
+class EmptyRDSCursor:
+    """Answers the bulk loader's statements as an empty RDS would"""
+
+    def __init__(self, conn: "EmptyRDS"):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, query: str, params: tuple = None):
+        """Builds the rows the statement would output"""
+        from src.api_to_rds_pipeline.rds import RDS_TABLES_WITH_FK, DIMENSION_LOAD_ORDER  # pylint: disable=import-outside-toplevel
+        self.rows = []
+        statement = query.lstrip()
+        if "UNION ALL" in query:
+            self.rows = [(table, 0, 0) for table in DIMENSION_LOAD_ORDER]
+        elif statement.startswith("MERGE INTO plant_daily_stats"):
+            pass
+        elif statement.startswith("MERGE INTO"):
+            width = len(RDS_TABLES_WITH_FK[statement.split()[2]])
+            self.rows = [("INSERT", self.conn.next_id(), *params[i:i+width])
+                         for i in range(0, len(params), width)]
+        elif statement.startswith("INSERT INTO reading"):
+            width = len(RDS_TABLES_WITH_FK["reading"])
+            self.rows = [(self.conn.next_id(), *params[i:i+width])
+                         for i in range(0, len(params), width)]
+
+    def fetchall(self) -> list[tuple]:
+        """Rows output by the last statement"""
+        return self.rows
+
+    def fetchone(self) -> tuple | None:
+        """First row output by the last statement"""
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        """Nothing to release"""
+
+
+class EmptyRDS:
+    """Connection stand-in handing out increasing IDs"""
+
+    def __init__(self):
+        self.last_id = 0
+
+    def next_id(self) -> int:
+        """Next surrogate key"""
+        self.last_id += 1
+        return self.last_id
+
+    def cursor(self) -> EmptyRDSCursor:
+        """New cursor"""
+        return EmptyRDSCursor(self)
+
+    def commit(self):
+        """Nothing to commit"""
+
+    def close(self):
+        """Nothing to close"""
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far
+    Prefers VmHWM, since Linux carries ru_maxrss over from the parent across exec"""
+    try:
+        with open("/proc/self/status", encoding="utf8") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def import_path(path: str) -> tuple[type, Callable]:
+    """Imports a path's transformer and loader and points the loader at an empty RDS
+    A fresh dimension cache is used on every load, like a cold container"""
+    # pylint: disable=import-outside-toplevel
+    from src.api_to_rds_pipeline.key_cache import DimensionKeyCache
+    from src.api_to_rds_pipeline.rds import RDS_TABLES_WITH_FK, DIMENSION_LOAD_ORDER
+    if path == "records":
+        from src.api_to_rds_pipeline import load_records as loader_module
+        from src.api_to_rds_pipeline.transform_records import PlantRecordTransformer as transformer
+        loader = loader_module.RecordLoader
+    else:
+        from src.api_to_rds_pipeline import load as loader_module
+        from src.api_to_rds_pipeline.transform import PlantDataTransformer as transformer
+        loader = loader_module.DataLoader
+    loader_module.get_conn = EmptyRDS
+
+    def load(cleaned):
+        cache = DimensionKeyCache({table: RDS_TABLES_WITH_FK[table]
+                                   for table in DIMENSION_LOAD_ORDER})
+        loader(cleaned, cache).upload_tables_to_rds_bulk()
+
+    return transformer, load
+
+
+def run_once(transformer: type, load: Callable, plants: list[dict]):
+    """One transform and load of a batch"""
+    cleaned = transformer(plants).transform()
+    load(cleaned)
+
+
+def child(path: str, n_plants: int) -> dict:
+    """Measures one cold start in this (fresh) interpreter"""
+    start = time.perf_counter()
+    transformer, load = import_path(path)
+    imported = time.perf_counter()
+    run_once(transformer, load, [make_plant(i) for i in range(1, n_plants + 1)])
+    finished = time.perf_counter()
+    return {"import_s": imported - start, "first_run_s": finished - imported,
+            "peak_rss_mb": peak_rss_mb(), "pandas_imported": "pandas" in sys.modules}
+
+
+def cold_start(path: str, n_plants: int, repeats: int) -> dict:
+    """Median of several cold starts, each in a new interpreter"""
+    results = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_minute_paths",
+             "--child", path, "--plants", str(n_plants)],
+            check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.splitlines()[-1]))
+    return {key: (statistics.median(result[key] for result in results)
+                  if key != "pandas_imported" else results[0][key])
+            for key in results[0]}
+
+
+def warm_runs(path: str, n_plants: int, repeats: int) -> dict:
+    """Latency of repeated runs in one process, after a first untimed run"""
+    transformer, load = import_path(path)
+    plants = [make_plant(i) for i in range(1, n_plants + 1)]
+    run_once(transformer, load, plants)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run_once(transformer, load, plants)
+        times.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(times), "min_s": min(times)}
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    """Benchmark parameters"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--plants", type=int, default=100)
+    parser.add_argument("--cold-repeats", type=int, default=5)
+    parser.add_argument("--warm-repeats", type=int, default=50)
+    parser.add_argument("--child", choices=PATHS, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str] = None) -> dict:
+    """Benchmarks both paths and prints the report as JSON"""
+    args = parse_args(argv)
+    logging.disable(logging.CRITICAL)
+    if args.child:
+        print(json.dumps(child(args.child, args.plants)))
+        return {}
+    report = {"plants": args.plants}
+    for path in PATHS:
+        report[path] = {"cold": cold_start(path, args.plants, args.cold_repeats),
+                        "warm": warm_runs(path, args.plants, args.warm_repeats)}
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,336 @@
+"""End-to-end benchmark of both pipelines against local stand-ins
+The minute pipeline polls a mock plant API, through both its pandas and its record path.
+The nightly pipeline runs its own run_pipeline over a simulated day of readings, with
+boto3, awswrangler and the RDS swapped for a local S3 directory, a Glue stub and an
+in-memory RDS, so streaming, uploads, compaction, cataloguing and the purge all run.
+With --db the RDS stages run too, against a throwaway local SQL Server rebuilt from
+db/schema.sql (DB_* environment variables; DB_HOST must be local).
+Reports per-stage latency percentiles, throughput, pipeline counters and peak RSS as JSON.
+Run from the project root: python3 -m benchmarks.bench_pipelines [--plants N ...]"""
+import argparse
+import importlib
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager, redirect_stdout
+from datetime import date, timedelta
+from functools import partial, partialmethod
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_summary import simulate_day
+from benchmarks.local_aws import (LocalS3, StubGlue, LocalRDS, table_definition,
+                                  boto3_module, awswrangler_module, pyarrow_fs_module)
+from benchmarks.mock_plant_api import MockPlantAPI, make_plant
+from src.api_to_rds_pipeline.extract import PlantGetter, START_ID, MAX_404_ERRORS
+from src.api_to_rds_pipeline.key_cache import DimensionKeyCache
+from src.api_to_rds_pipeline.pipeline import PIPELINE_PATHS, stage_classes
+from src.api_to_rds_pipeline.rds import RDS_TABLES_WITH_FK, DIMENSION_LOAD_ORDER
+from src.api_to_rds_pipeline.registry import EndpointRegistry
+from src.utils import metrics
+
+LOCAL_DB_HOSTS = {"localhost", "127.0.0.1"}
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(PROJECT_ROOT, "db", "schema.sql")
+NIGHTLY_DIR = os.path.join(PROJECT_ROOT, "src", "rds_to_s3_pipeline")
+READING_COLUMNS = ["id", "reading_taken", "last_watered", "soil_moisture",
+                   "soil_temperature", "plant_id", "botanist_id"]
+SUMMARY_COLUMNS = ["plant_id", "mean_soil_moisture", "mean_soil_temperature",
+                   "date", "watering_count", "most_recent"]
+SEED_BATCH_SIZE = 1000
+# the counter holding the rows each nightly span handled
+NIGHTLY_STAGE_ROWS = {"metadata": "metadata_rows_extracted", "readings": "readings_uploaded",
+                      "summary": "summary_rows", "compact": "readings_uploaded",
+                      "purge": "readings_purged"}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+class StageRecorder:
+    """Collects per-call latencies, row counts and peak RSS for each named stage"""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.rows: dict[str, int] = defaultdict(int)
+        self.peak_rss: dict[str, float] = {}
+        self.notes: dict[str, dict] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Times one call of a stage; the caller sets counts on the yielded dict"""
+        counts = {"rows": 0}
+        start = time.perf_counter()
+        yield counts
+        self.record(name, time.perf_counter() - start, counts.pop("rows"))
+        if counts:
+            self.notes.setdefault(name, defaultdict(int))
+            for key, value in counts.items():
+                self.notes[name][key] += value
+
+    def record(self, name: str, seconds: float, rows: int = 0):
+        """Adds one timed call of a stage"""
+        self.samples[name].append(seconds)
+        self.rows[name] += rows
+        self.peak_rss[name] = peak_rss_mb()
+
+    def skip(self, name: str, reason: str):
+        """Marks a stage as not run"""
+        self.notes[name] = {"skipped": reason}
+
+    def report(self) -> dict:
+        """Summarises every stage as latency percentiles, throughput and peak RSS"""
+        report = {}
+        for name, samples in self.samples.items():
+            seconds = np.array(samples)
+            total = float(seconds.sum())
+            report[name] = {
+                "calls": len(samples),
+                "total_s": round(total, 6),
+                "p50_s": round(float(np.percentile(seconds, 50)), 6),
+                "p90_s": round(float(np.percentile(seconds, 90)), 6),
+                "p99_s": round(float(np.percentile(seconds, 99)), 6),
+                "max_s": round(float(seconds.max()), 6),
+                "rows": self.rows[name],
+                "rows_per_s": round(self.rows[name] / total, 1) if total else None,
+                "peak_rss_mb": round(self.peak_rss[name], 1),
+                **self.notes.get(name, {}),
+            }
+        for name, note in self.notes.items():
+            report.setdefault(name, dict(note))
+        return report
+
+
+def simulate_metadata(n_plants: int, n_origins: int, n_botanists: int) -> dict[str, pd.DataFrame]:
+    """Metadata tables shaped like the RDS ones, built from the mock API's plants"""
+    plants = [make_plant(plant_id, n_origins, n_botanists) for plant_id in range(1, n_plants + 1)]
+    n_countries = min(n_origins, 10)
+    return {
+        "country": pd.DataFrame({"id": range(1, n_countries + 1),
+                                 "country_name": [f"Country {i}" for i in range(n_countries)]}),
+        "city": pd.DataFrame({"id": range(1, n_origins + 1),
+                              "city_name": [f"City {i}" for i in range(n_origins)],
+                              "country_id": [i % 10 + 1 for i in range(n_origins)]}),
+        "origin": pd.DataFrame({"id": range(1, n_origins + 1),
+                                "latitude": [float(i) for i in range(n_origins)],
+                                "longitude": [float(-i) for i in range(n_origins)],
+                                "city_id": range(1, n_origins + 1)}),
+        "botanist": pd.DataFrame({"id": range(1, n_botanists + 1),
+                                  "botanist_name": [f"Botanist {i}" for i in range(n_botanists)],
+                                  "botanist_email": [f"botanist.{i}@lnhm.co.uk"
+                                                     for i in range(n_botanists)],
+                                  "botanist_phone": [f"0{i:010d}" for i in range(n_botanists)]}),
+        "plant": pd.DataFrame({"id": [p["plant_id"] for p in plants],
+                               "english_name": [p["name"] for p in plants],
+                               "scientific_name": [p["scientific_name"][0] for p in plants],
+                               "origin_id": [p["plant_id"] % n_origins + 1 for p in plants]}),
+        "photo": pd.DataFrame({"id": [p["plant_id"] for p in plants],
+                               "plant_id": [p["plant_id"] for p in plants],
+                               "photo_link": [p["images"]["original_url"] for p in plants]}),
+    }
+
+
+def connect_local_db():
+    """Opens a connection to the local benchmark database, refusing anything remote"""
+    from src.utils.utils import get_conn  # pylint: disable=import-outside-toplevel
+    if os.environ.get("DB_HOST") not in LOCAL_DB_HOSTS:
+        raise SystemExit("--db rebuilds the schema; DB_HOST must be localhost or 127.0.0.1")
+    return get_conn()
+
+
+def reset_schema(conn):
+    """Drops and recreates every table from db/schema.sql"""
+    with open(SCHEMA_PATH, encoding="utf8") as f:
+        schema = f.read()
+    cursor = conn.cursor()
+    cursor.execute(schema)
+    conn.commit()
+    cursor.close()
+
+
+def seed_yesterday(conn, readings: pd.DataFrame) -> int:
+    """Inserts a simulated day of readings onto the plants the minute pipeline created"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM plant ORDER BY id;")
+    plant_ids = np.array([row[0] for row in cursor.fetchall()])
+    columns = READING_COLUMNS[1:-1]
+    rows = list(zip(readings["reading_taken"].dt.to_pydatetime(),
+                    readings["last_watered"].dt.to_pydatetime(),
+                    readings["soil_moisture"].astype(float),
+                    readings["soil_temperature"].astype(float),
+                    plant_ids[(readings["plant_id"].to_numpy() - 1) % len(plant_ids)].tolist()))
+    placeholder = f"({', '.join(['%s'] * len(columns))})"
+    for start in range(0, len(rows), SEED_BATCH_SIZE):
+        batch = rows[start:start + SEED_BATCH_SIZE]
+        cursor.execute(f"INSERT INTO reading ({', '.join(columns)}) VALUES "
+                       f"{', '.join([placeholder] * len(batch))};",
+                       tuple(value for row in batch for value in row))
+    conn.commit()
+    cursor.close()
+    return len(rows)
+
+
+def run_minute(args, recorder: StageRecorder, workdir: str, path: str):
+    """Runs the minute pipeline's stages on one path args.minute_runs times against the
+    mock API, starting from a cold dimension key cache"""
+    transformer_class, loader_class = stage_classes(path)
+    cache = DimensionKeyCache({table: RDS_TABLES_WITH_FK[table] for table in DIMENSION_LOAD_ORDER})
+    registry = EndpointRegistry(os.path.join(workdir, f"registry-{path}.json"))
+    with MockPlantAPI(args.plants, delay=args.latency, n_origins=args.origins,
+                      n_botanists=args.botanists) as api:
+        for _ in range(args.minute_runs):
+            with recorder.stage("extract") as counts:
+                getter = PlantGetter(api.url, START_ID, MAX_404_ERRORS)
+                plants = getter.loop_ids_async(registry=registry)
+                counts["rows"] = len(plants)
+                counts["requests"] = len(api.requested_ids)
+            api.requested_ids.clear()
+
+            with recorder.stage("transform") as counts:
+                transformer = transformer_class(plants)
+                cleaned = transformer.transform()
+                counts["rows"] = len(cleaned["plant_id"])
+                counts["rejected"] = len(transformer.rejects)
+
+            if not args.db:
+                recorder.skip("load", "no local database (--db)")
+                continue
+            with recorder.stage("load") as counts:
+                loader_class(cleaned, cache).upload_tables_to_rds_bulk()
+                counts["rows"] = len(cleaned["plant_id"])
+
+
+@contextmanager
+def local_nightly_pipeline(s3: LocalS3, glue: StubGlue, rds: LocalRDS | None,
+                           chunk_size: int | None):
+    """Imports the nightly pipeline as its image lays it out, with boto3, awswrangler and
+    the S3 filesystem used for compaction pointed at the local stand-ins, and the RDS too
+    when one is given; everything is restored on exit"""
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.dict(sys.modules, {
+            "boto3": boto3_module(s3, glue), "awswrangler": awswrangler_module(s3)}))
+        stack.enter_context(mock.patch.object(sys, "path", [NIGHTLY_DIR, *sys.path]))
+        pipeline = importlib.import_module("pipeline")
+        extract, load = sys.modules["extract"], sys.modules["load"]
+        stack.enter_context(mock.patch.object(load, "fs", pyarrow_fs_module(s3)))
+        if rds is not None:
+            for module in (extract, load):
+                stack.enter_context(mock.patch.object(module, "get_conn", lambda: rds))
+        if chunk_size:
+            getter = extract.RDSDataGetter
+            stack.enter_context(mock.patch.object(
+                getter, "iter_readings", partialmethod(getter.iter_readings, chunk_size)))
+        yield pipeline
+
+
+def run_nightly(args, recorder: StageRecorder, workdir: str, conn):
+    """Runs the nightly pipeline once over a simulated day of readings
+    Stage timings are the pipeline's own metrics spans"""
+    readings = simulate_day(args.plants, readings_per_day=args.readings_per_day,
+                            day=str(date.today() - timedelta(days=1)))
+    rds = None
+    if conn is not None:
+        seed_yesterday(conn, readings)
+    else:
+        rds = LocalRDS(simulate_metadata(args.plants, args.origins, args.botanists),
+                       readings[READING_COLUMNS])
+    s3 = LocalS3(os.path.join(workdir, "s3"))
+    glue = StubGlue()
+
+    with local_nightly_pipeline(s3, glue, rds, args.chunk_size) as pipeline:
+        glue.tables.update({
+            "reading": table_definition("reading", f"s3://{pipeline.BUCKET}/input/reading/",
+                                        READING_COLUMNS),
+            "summary": table_definition("summary", f"s3://{pipeline.BUCKET}/input/summary/",
+                                        SUMMARY_COLUMNS),
+        })
+        # the pipeline prints its EMF record, which would corrupt a report on stdout
+        with redirect_stdout(io.StringIO()):
+            pipeline.run_pipeline()
+
+    run_metrics = metrics.current_run()
+    for name, elapsed_ms in run_metrics.spans.items():
+        recorder.record(name, elapsed_ms / 1000,
+                        int(run_metrics.counters.get(NIGHTLY_STAGE_ROWS.get(name), 0)))
+    recorder.notes["catalogue"] = {"glue_calls": glue.calls, "crawls": glue.crawls}
+    recorder.notes["s3"] = {"objects_written": s3.puts, "bytes_written": s3.bytes_written}
+    recorder.notes["purge"] = {"rds": "in-memory" if rds is not None else "local database"}
+
+
+def parse_args(argv: list[str] = None) -> argparse.Namespace:
+    """Benchmark parameters"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--plants", type=int, default=200)
+    parser.add_argument("--readings-per-day", type=int, default=24 * 60,
+                        help="readings per plant per day for the nightly run")
+    parser.add_argument("--origins", type=int, default=50)
+    parser.add_argument("--botanists", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="mock API delay per request, in seconds")
+    parser.add_argument("--minute-runs", type=int, default=5)
+    parser.add_argument("--minute-paths", nargs="+", choices=PIPELINE_PATHS,
+                        default=PIPELINE_PATHS, help="minute pipeline paths to benchmark")
+    parser.add_argument("--chunk-size", type=int,
+                        help="readings per streamed chunk; defaults to the pipeline's own")
+    parser.add_argument("--db", action="store_true",
+                        help="also run the RDS stages against a local SQL Server")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str] = None) -> dict:
+    """Runs both pipelines and returns the report"""
+    args = parse_args(argv)
+    logging.disable(logging.CRITICAL)
+    conn = None
+    if args.db:
+        conn = connect_local_db()
+        reset_schema(conn)
+
+    report = {"config": vars(args),
+              "environment": {"python": platform.python_version(),
+                              "platform": platform.platform()}}
+    runners = [(f"minute_{path}", partial(run_minute, path=path), False)
+               for path in args.minute_paths]
+    runners.append(("nightly", run_nightly, True))
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, runner, uses_conn in runners:
+            recorder = StageRecorder()
+            metrics.start_run(name)
+            start = time.perf_counter()
+            if uses_conn:
+                runner(args, recorder, workdir, conn)
+            else:
+                runner(args, recorder, workdir)
+            # the nightly pipeline starts its own run, so read whichever is current now
+            run_metrics = metrics.current_run()
+            report[name] = {"wall_s": round(time.perf_counter() - start, 6),
+                            "peak_rss_mb": round(peak_rss_mb(), 1),
+                            "stages": recorder.report(),
+                            "counters": dict(sorted(run_metrics.counters.items()))}
+    if conn is not None:
+        conn.close()
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,95 @@
+"""Benchmark comparing the nightly summary's old four-groupby implementation with
+the single-pass SummaryAccumulator on a simulated full day of readings
+Run from the project root: python3 -m benchmarks.bench_summary"""
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.rds_to_s3_pipeline.transform import SummaryAccumulator
+
+N_PLANTS = 100
+READINGS_PER_DAY = 24 * 60
+CHUNK_SIZE = 50_000
+
+
+def simulate_day(n_plants: int = N_PLANTS, seed: int = 0,
+                 readings_per_day: int = READINGS_PER_DAY, day: str = "2025-07-22") -> pd.DataFrame:
+    """Evenly spaced readings per plant (one a minute by default), with a watering
+    roughly every six hours"""
+    rng = np.random.default_rng(seed)
+    minutes = pd.date_range(day, periods=readings_per_day,
+                            freq=pd.Timedelta(days=1) / readings_per_day)
+    reading_taken = np.repeat(minutes.values, n_plants)
+    plant_id = np.tile(np.arange(1, n_plants + 1), readings_per_day)
+    last_watered = pd.Series(reading_taken).dt.floor("6h") - pd.Timedelta(minutes=5)
+    return pd.DataFrame({
+        "id": np.arange(1, len(plant_id) + 1),
+        "reading_taken": reading_taken,
+        "last_watered": last_watered,
+        "soil_moisture": rng.uniform(10, 90, len(plant_id)),
+        "soil_temperature": rng.uniform(5, 30, len(plant_id)),
+        "plant_id": plant_id,
+        "botanist_id": plant_id % 5 + 1
+    })
+
+
+def multi_pass_summary(readings: pd.DataFrame) -> pd.DataFrame:
+    """The create_summary implementation this benchmark replaced"""
+    readings = readings.copy()
+    readings['reading_date'] = readings['reading_taken'].dt.date
+    readings['watered_date'] = readings['last_watered'].dt.date
+    means = readings.groupby('plant_id')[['soil_moisture', 'soil_temperature']].mean().rename(
+        columns={'soil_moisture': 'mean_soil_moisture',
+                 'soil_temperature': 'mean_soil_temperature'})
+    date = readings.groupby('plant_id')['reading_taken'].first(
+    ).reset_index().rename(columns={'reading_taken': 'date'})
+    watered = readings[readings['watered_date'] == readings['reading_date']]
+    watering_count = watered.groupby('plant_id')['last_watered'].nunique(
+    ).reset_index().rename(columns={'last_watered': 'watering_count'})
+    most_recent = readings.groupby('plant_id')['last_watered'].max(
+    ).reset_index().rename(columns={'last_watered': 'most_recent'})
+    summary = means.merge(date, on='plant_id', how='left').merge(
+        watering_count, on='plant_id', how='left').merge(most_recent, on='plant_id', how='left')
+    summary['watering_count'] = summary['watering_count'].fillna(0).astype(int)
+    return summary
+
+
+def timed(func, *args) -> tuple[float, pd.DataFrame]:
+    """Returns the wall-clock time and result of one call"""
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def single_pass_summary(readings: pd.DataFrame) -> pd.DataFrame:
+    """The whole day added to one accumulator"""
+    accumulator = SummaryAccumulator()
+    accumulator.add(readings)
+    return accumulator.summary()
+
+
+def chunked_summary(readings: pd.DataFrame) -> pd.DataFrame:
+    """The day fed to the accumulator in streamed-size chunks"""
+    accumulator = SummaryAccumulator()
+    for start in range(0, len(readings), CHUNK_SIZE):
+        accumulator.add(readings.iloc[start:start + CHUNK_SIZE])
+    return accumulator.summary()
+
+
+def run():
+    """Times each implementation on a simulated day and checks they agree"""
+    logging.disable(logging.CRITICAL)
+    readings = simulate_day()
+    print(f"{len(readings)} readings for {N_PLANTS} plants")
+    base_time, expected = timed(multi_pass_summary, readings)
+    print(f"{'multi-pass':>12}: {base_time:.3f} s")
+    for name, func in [("single-pass", single_pass_summary), ("chunked", chunked_summary)]:
+        elapsed, summary = timed(func, readings)
+        pd.testing.assert_frame_equal(summary, expected)
+        print(f"{name:>12}: {elapsed:.3f} s ({base_time / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,36 @@
+"""Benchmark comparing PlantDataTransformer's row-by-row and columnar transform paths
+on synthetic readings shaped like the test_atr_transform fixtures
+Run from the project root: python3 -m benchmarks.bench_transform"""
+import logging
+import time
+
+import pandas as pd
+
+from benchmarks.mock_plant_api import make_plant
+from src.api_to_rds_pipeline.transform import PlantDataTransformer
+
+READING_COUNTS = [10_000, 100_000]
+
+
+def time_transform(plant_data: list[dict], columnar: bool) -> tuple[float, pd.DataFrame]:
+    """Times one full transform of the batch"""
+    transformer = PlantDataTransformer(plant_data)
+    start = time.perf_counter()
+    df = transformer.transform(columnar=columnar)
+    return time.perf_counter() - start, df
+
+
+def run():
+    """Runs both paths at every batch size, checks they agree and prints timings"""
+    logging.disable(logging.CRITICAL)
+    print(f"{'readings':>9} {'row-by-row (s)':>15} {'columnar (s)':>13} {'speedup':>8}")
+    for n_readings in READING_COUNTS:
+        plant_data = [make_plant(i % 1000 + 1) for i in range(n_readings)]
+        row_time, row_df = time_transform(plant_data, columnar=False)
+        col_time, col_df = time_transform(plant_data, columnar=True)
+        pd.testing.assert_frame_equal(col_df, row_df)
+        print(f"{n_readings:>9} {row_time:>15.3f} {col_time:>13.3f} {row_time / col_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,304 @@
+"""Local stand-ins for the AWS services used by the nightly pipeline
+S3 objects live under a directory; Glue partitions and RDS rows are held in memory.
+boto3_module and awswrangler_module build drop-in modules over them, so the pipeline's
+own load code runs unchanged"""
+import hashlib
+import io
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from types import ModuleType, SimpleNamespace
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+
+class LocalS3:
+    """Directory-backed object store with the put/get/head calls of a boto3 S3 client"""
+
+    class exceptions:  # pylint: disable=invalid-name,too-few-public-methods
+        """Mirrors client.exceptions on a boto3 client"""
+
+        class NoSuchKey(KeyError):
+            """Raised for a missing object"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.puts = 0
+        self.bytes_written = 0
+        self.lock = threading.Lock()
+
+    def path(self, bucket: str, key: str) -> str:
+        """Local file holding one object"""
+        return os.path.join(self.root, bucket, key)
+
+    def uri_path(self, uri: str) -> str:
+        """Local path of an s3://bucket/key URI"""
+        bucket, _, key = uri.removeprefix("s3://").partition("/")
+        return self.path(bucket, key)
+
+    def count_put(self, size: int):
+        """Counts one object written, from any thread"""
+        with self.lock:
+            self.puts += 1
+            self.bytes_written += size
+
+    def filesystem(self) -> fs.FileSystem:
+        """A pyarrow filesystem over the store, addressed as bucket/key like S3FileSystem"""
+        os.makedirs(self.root, exist_ok=True)
+        return fs.SubTreeFileSystem(self.root, fs.LocalFileSystem())
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs):  # pylint: disable=invalid-name
+        """Writes an object, replacing any existing one"""
+        path = self.path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(Body)
+        self.count_put(len(Body))
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def get_object(self, Bucket: str, Key: str):  # pylint: disable=invalid-name
+        """Returns an object's body as a stream"""
+        try:
+            with open(self.path(Bucket, Key), "rb") as f:
+                return {"Body": io.BytesIO(f.read())}
+        except FileNotFoundError as e:
+            raise self.exceptions.NoSuchKey(Key) from e
+
+    def head_object(self, Bucket: str, Key: str):  # pylint: disable=invalid-name
+        """Returns an object's ETag and last-modified time"""
+        path = self.path(Bucket, Key)
+        try:
+            with open(path, "rb") as f:
+                etag = hashlib.md5(f.read()).hexdigest()
+        except FileNotFoundError as e:
+            raise self.exceptions.NoSuchKey(Key) from e
+        return {"ETag": f'"{etag}"',
+                "LastModified": datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)}
+
+
+class StubGlue:
+    """In-memory Glue catalog with the table and partition calls catalog.py makes"""
+
+    class exceptions:  # pylint: disable=invalid-name,too-few-public-methods
+        """Mirrors client.exceptions on a boto3 client"""
+
+        class EntityNotFoundException(KeyError):
+            """Raised for a missing table"""
+
+    def __init__(self, tables: dict[str, dict] = None):
+        self.tables = tables or {}
+        self.partitions: set[tuple] = set()
+        self.calls = 0
+        self.crawls = 0
+
+    def get_table(self, DatabaseName: str, Name: str):  # pylint: disable=invalid-name
+        """Returns a table definition"""
+        self.calls += 1
+        if Name not in self.tables:
+            raise self.exceptions.EntityNotFoundException(Name)
+        return {"Table": self.tables[Name]}
+
+    def batch_create_partition(self, DatabaseName: str, TableName: str,  # pylint: disable=invalid-name
+                               PartitionInputList: list[dict]):
+        """Adds partitions, reporting ones which already exist as errors"""
+        self.calls += 1
+        errors = []
+        for partition in PartitionInputList:
+            key = (TableName, *partition["Values"])
+            if key in self.partitions:
+                errors.append({"PartitionValues": partition["Values"],
+                               "ErrorDetail": {"ErrorCode": "AlreadyExistsException"}})
+            self.partitions.add(key)
+        return {"Errors": errors}
+
+
+    def start_crawler(self, Name: str):  # pylint: disable=invalid-name
+        """Counts a crawl, which finishes at once"""
+        self.calls += 1
+        self.crawls += 1
+
+    def get_crawler(self, Name: str):  # pylint: disable=invalid-name
+        """Reports every crawler as finished"""
+        self.calls += 1
+        return {"Crawler": {"Name": Name, "State": "READY"}}
+
+
+class LocalRDSCursor:
+    """Answers the nightly pipeline's extract and purge statements from a LocalRDS"""
+
+    def __init__(self, rds: "LocalRDS"):
+        self.rds = rds
+        self.rows = deque()
+        self.description = []
+        self.rowcount = -1
+
+    def serve(self, rows: list[tuple], columns: list[str]):
+        """Sets the result set of the last statement"""
+        self.rows = deque(rows)
+        self.description = [(column,) for column in columns]
+
+    def execute(self, query: str, params: tuple = None):
+        """Runs a statement against the in-memory tables"""
+        statement = " ".join(query.split())
+        self.serve([], [])
+        self.rowcount = -1
+        if "UNION ALL" in statement:
+            self.serve([(name, len(df), int(df["id"].max()) if len(df) else 0)
+                        for name, df in self.rds.tables.items()], ["table", "rows", "max_id"])
+        elif statement.startswith("SELECT * FROM reading "):
+            self.serve(self.rds.readings, self.rds.reading_columns)
+        elif statement.startswith("SELECT * FROM plant_daily_stats "):
+            pass
+        elif statement.startswith("SELECT * FROM "):
+            df = self.rds.tables[statement.split()[3].rstrip(";")]
+            self.serve(list(df.itertuples(index=False, name=None)), list(df.columns))
+        elif statement.startswith("DELETE TOP"):
+            self.rowcount = self.rds.delete_readings(*params)
+        elif statement.startswith("DELETE FROM plant_daily_stats"):
+            self.rowcount = 0
+
+    def fetchmany(self, size: int) -> list[tuple]:
+        """Returns the next batch of rows"""
+        return [self.rows.popleft() for _ in range(min(size, len(self.rows)))]
+
+    def fetchall(self) -> list[tuple]:
+        """Returns every remaining row"""
+        return self.fetchmany(len(self.rows))
+
+    def close(self):
+        """Nothing to release"""
+
+
+class LocalRDS:
+    """Connection stand-in holding metadata tables and yesterday's readings in memory
+    Readings are kept in id order and purged from the front, as the seek on the clustered
+    id does"""
+
+    def __init__(self, tables: dict[str, pd.DataFrame], readings: pd.DataFrame):
+        self.tables = tables
+        self.reading_columns = list(readings.columns)
+        self.readings = deque(readings.sort_values("id").itertuples(index=False, name=None))
+        self.commits = 0
+
+    def delete_readings(self, limit: int, max_id: int, max_taken: datetime) -> int:
+        """Deletes up to limit readings at or below the mark; returns how many went"""
+        taken = self.reading_columns.index("reading_taken")
+        deleted = 0
+        while (deleted < limit and self.readings and self.readings[0][0] <= max_id
+               and self.readings[0][taken] <= max_taken):
+            self.readings.popleft()
+            deleted += 1
+        return deleted
+
+    def cursor(self) -> LocalRDSCursor:
+        """New cursor"""
+        return LocalRDSCursor(self)
+
+    def commit(self):
+        """Counts commits"""
+        self.commits += 1
+
+    def close(self):
+        """Nothing to close; the pipeline closes one connection per stage"""
+
+
+class LocalCredentials:
+    """Frozen credentials stand-in; the local stores ignore them"""
+    access_key = "local"
+    secret_key = "local"
+    token = None
+
+    def get_frozen_credentials(self) -> "LocalCredentials":
+        """Credentials are already frozen"""
+        return self
+
+
+class LocalSession:
+    """boto3.Session stand-in handing out the local S3 and Glue clients"""
+    region_name = "eu-west-2"
+
+    def __init__(self, s3: LocalS3, glue: StubGlue):
+        self.s3 = s3
+        self.glue = glue
+
+    def get_credentials(self) -> LocalCredentials:
+        """Always has credentials"""
+        return LocalCredentials()
+
+    def client(self, service_name: str, **kwargs):
+        """The local client of a service"""
+        return {"s3": self.s3, "glue": self.glue}[service_name]
+
+
+class LocalWranglerS3:
+    """The awswrangler.s3 calls the nightly load makes, writing into a LocalS3"""
+
+    def __init__(self, s3: LocalS3):
+        self.s3 = s3
+
+    def to_parquet(self, df: pd.DataFrame, path: str, dataset: bool = False,  # pylint: disable=too-many-arguments
+                   partition_cols: list[str] = None, mode: str = "append",
+                   index: bool = False, **kwargs) -> dict:
+        """Writes a frame as one file, or appends it to a hive-partitioned dataset
+        Overwriting replaces only the partitions written to
+        Returns the written object URIs, like awswrangler"""
+        table = pa.Table.from_pandas(df, preserve_index=index)
+        local_path = self.s3.uri_path(path)
+        if not dataset:
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            pq.write_table(table, local_path)
+            files = [local_path]
+        else:
+            files = []
+            pq.write_to_dataset(table, local_path, partition_cols=partition_cols,
+                                basename_template=f"{uuid.uuid4().hex}-{{i}}.parquet",
+                                existing_data_behavior=(
+                                    "delete_matching"
+                                    if mode in ("overwrite", "overwrite_partitions")
+                                    else "overwrite_or_ignore"),
+                                file_visitor=lambda written: files.append(written.path))
+        for file in files:
+            self.s3.count_put(os.path.getsize(file))
+        return {"paths": [f"s3://{os.path.relpath(file, self.s3.root)}" for file in files],
+                "partitions_values": {}}
+
+    def size_objects(self, path: list[str], **kwargs) -> dict[str, int]:
+        """Sizes of the given objects in bytes"""
+        return {uri: os.path.getsize(self.s3.uri_path(uri)) for uri in path}
+
+
+def boto3_module(s3: LocalS3, glue: StubGlue) -> ModuleType:
+    """A stand-in boto3 module whose sessions and clients are the local stores"""
+    module = ModuleType("boto3")
+    module.Session = lambda *args, **kwargs: LocalSession(s3, glue)
+    module.client = lambda service_name, **kwargs: LocalSession(s3, glue).client(service_name)
+    return module
+
+
+def awswrangler_module(s3: LocalS3) -> ModuleType:
+    """A stand-in awswrangler module writing into the local S3"""
+    module = ModuleType("awswrangler")
+    module.s3 = LocalWranglerS3(s3)
+    return module
+
+
+def pyarrow_fs_module(s3: LocalS3) -> SimpleNamespace:
+    """Stands in for pyarrow.fs where only S3FileSystem is used, pointing it at the local S3"""
+    return SimpleNamespace(S3FileSystem=lambda **kwargs: s3.filesystem())
+
+
+def table_definition(name: str, location: str, columns: list[str]) -> dict:
+    """A Glue table partitioned by year/month/day, as the crawler would create it"""
+    return {
+        "Name": name,
+        "StorageDescriptor": {
+            "Location": location,
+            "Columns": [{"Name": column, "Type": "string"} for column in columns],
+        },
+        "PartitionKeys": [{"Name": key, "Type": "string"} for key in ["year", "month", "day"]],
+    }
@@ -0,0 +1,112 @@
+"""Local stand-in for the plant API, served from a background thread
+Serves plants 1..n_plants (minus any missing IDs) with an optional per-request delay"""
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PLANT_PATH = "/api/plants/"
+
+
+def make_plant(plant_id: int, n_origins: int = 50, n_botanists: int = 5) -> dict:
+    """Builds a plant payload shaped like the real API's, with bounded dimension cardinality"""
+    origin = plant_id % n_origins
+    botanist = plant_id % n_botanists
+    return {
+        "plant_id": plant_id,
+        "name": f"Plant {plant_id}",
+        "temperature": random.uniform(5, 30),
+        "soil_moisture": random.uniform(10, 90),
+        "recording_taken": datetime.now(timezone.utc).isoformat(),
+        "last_watered": datetime.now(timezone.utc).isoformat(),
+        "origin_location": {
+            "latitude": float(origin),
+            "longitude": float(-origin),
+            "city": f"City {origin}",
+            "country": f"Country {origin % 10}"
+        },
+        "botanist": {
+            "name": f"Botanist {botanist}",
+            "email": f"botanist.{botanist}@lnhm.co.uk",
+            "phone": f"0{botanist:010d}"
+        },
+        "images": {"original_url": f"https://example.com/{plant_id}.jpg"},
+        "scientific_name": [f"Plantus {plant_id}"]
+    }
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """Threaded server which ignores clients hanging up mid-request"""
+    daemon_threads = True
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        """Cancelled requests reset their connections; that is expected here"""
+
+
+class MockPlantAPI:
+    """Context manager running a threaded HTTP/1.1 plant API on localhost"""
+
+    def __init__(self, n_plants: int, delay: float = 0.0,
+                 missing_ids: set[int] = frozenset(), n_origins: int = 50,
+                 n_botanists: int = 5):
+        self.n_plants = n_plants
+        self.delay = delay
+        self.missing_ids = set(missing_ids)
+        self.n_origins = n_origins
+        self.n_botanists = n_botanists
+        self.request_count = 0
+        self.requested_ids: list[int] = []
+        self.server = QuietHTTPServer(("127.0.0.1", 0), self.make_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Base endpoint in the same form as extract.BASE_ENDPOINT"""
+        return f"http://127.0.0.1:{self.server.server_port}{PLANT_PATH}"
+
+    def make_handler(self):
+        """Builds a request handler class bound to this API's settings"""
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Answers GET /api/plants/<id>"""
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Serves one plant, or a 404 outside the known IDs"""
+                api.request_count += 1
+                if api.delay:
+                    time.sleep(api.delay)
+                try:
+                    plant_id = int(self.path.removeprefix(PLANT_PATH))
+                except ValueError:
+                    plant_id = 0
+                api.requested_ids.append(plant_id)
+                if 1 <= plant_id <= api.n_plants and plant_id not in api.missing_ids:
+                    status = 200
+                    payload = make_plant(plant_id, api.n_origins, api.n_botanists)
+                else:
+                    status = 404
+                    payload = {"error": "plant not found", "plant_id": plant_id}
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                """Keeps the benchmark output quiet"""
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,3 +1,4 @@
+drop table if exists plant_daily_stats;
 drop table if exists photo;
 drop table if exists reading;
 drop table if exists plant;
@@ -72,4 +73,31 @@ create table photo (
     photo_link varchar(250),
     primary key (id),
     constraint fk_plant_photo foreign key (plant_id) references plant (id)
+);
+
+
+-- Rolling per-plant aggregates for each day, maintained by the minute pipeline
+create table plant_daily_stats (
+    plant_id int not null,
+    stats_date date not null,
+    reading_count int not null,
+    first_reading_taken datetime,
+    latest_reading_taken datetime,
+    latest_soil_moisture float,
+    latest_soil_temperature float,
+    latest_last_watered datetime,
+    latest_botanist_id int,
+    moisture_sum float not null,
+    moisture_count int not null,
+    moisture_min float,
+    moisture_max float,
+    temperature_sum float not null,
+    temperature_count int not null,
+    temperature_min float,
+    temperature_max float,
+    most_recent_watering datetime,
+    last_watering_today datetime,
+    watering_count int not null,
+    primary key (plant_id, stats_date),
+    constraint fk_plant_daily_stats foreign key (plant_id) references plant (id)
 );
\ No newline at end of file
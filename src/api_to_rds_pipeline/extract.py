@@ -1,8 +1,11 @@
 """Extract plant data from endpoints"""
+import asyncio
 import logging
-from multiprocessing import Pool
 
-import requests
+import aiohttp
+
+from src.api_to_rds_pipeline.registry import EndpointRegistry
+from src.utils import metrics
 
 
 BASE_ENDPOINT = "https://sigma-labs-bot.herokuapp.com/api/plants/"
@@ -11,6 +14,13 @@ MAX_404_ERRORS = 5
 MAX_ID = 100
 MAX_THREADS = 5
 
+# Async extraction settings
+MAX_CONCURRENCY = 50
+REQUEST_TIMEOUT = 10
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.25
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 class PlantGetter:
     """Gets plant data from different endpoints"""
 
@@ -31,6 +41,8 @@ class PlantGetter:
         logging.debug("Constructing endpoint")
         endpoint_full_url = f'{self.url}{endpoint_id}'
         logging.debug("Getting plant ID %s from endpoint: %s", endpoint_id, endpoint_full_url)
+        # only the synchronous paths use requests, so the async Lambda never imports it
+        import requests  # pylint: disable=import-outside-toplevel
         try:
             response = requests.get(endpoint_full_url, timeout=10)
 
@@ -64,12 +76,126 @@ class PlantGetter:
     def loop_ids_multi_threaded(self) -> list[dict]:
         """Loops through endpoints with a multithreaded approach"""
         logging.info("Looping over IDs - multi-threaded")
+        from multiprocessing import Pool  # pylint: disable=import-outside-toplevel
         with Pool(MAX_THREADS) as p:
             result = p.map(self.get_plant, self.endpoints)
         logging.info("Finished looping IDs")
         self.plant_data = result
         return self.plant_data
 
+    async def get_plant_async(self, session: aiohttp.ClientSession,
+                              endpoint_id: int) -> tuple[int, dict]:
+        """Async version of get_plant which retries transient failures with backoff
+        Returns the endpoint ID alongside the data or error dictionary"""
+        endpoint_full_url = f'{self.url}{endpoint_id}'
+        logging.debug("Getting plant ID %s from endpoint: %s", endpoint_id, endpoint_full_url)
+        for attempt in range(MAX_RETRIES + 1):
+            metrics.incr("http_requests")
+            try:
+                async with session.get(endpoint_full_url) as response:
+                    metrics.incr(f"http_{response.status}")
+                    if response.status == 200:
+                        return endpoint_id, await response.json(content_type=None)
+                    if response.status not in RETRY_STATUSES:
+                        logging.error("Endpoint 404 error at ID %s", endpoint_id)
+                        return endpoint_id, {"error": "404 Not Found", "id": endpoint_id}
+                    logging.warning("Endpoint status %s at ID %s", response.status, endpoint_id)
+            # a 200 whose body is not JSON is treated like a dropped connection and retried
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                metrics.incr("http_exceptions")
+                logging.warning("Endpoint request exception at ID %s", endpoint_id)
+            if attempt < MAX_RETRIES:
+                metrics.incr("http_retries")
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+        logging.error("Endpoint request exception")
+        return endpoint_id, {"error": "Request Exception", "id": endpoint_id}
+
+    async def fetch_ids(self, session: aiohttp.ClientSession, endpoint_ids: list[int],
+                        concurrency: int) -> dict[int, dict]:
+        """Fetches a known list of IDs with at most `concurrency` requests in flight"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(endpoint_id: int) -> tuple[int, dict]:
+            async with semaphore:
+                return await self.get_plant_async(session, endpoint_id)
+
+        return dict(await asyncio.gather(*(fetch(i) for i in endpoint_ids)))
+
+    async def walk_ids(self, session: aiohttp.ClientSession,
+                       concurrency: int) -> dict[int, dict]:
+        """Keeps up to `concurrency` requests in flight, walking IDs upwards from
+        endpoint_id until max_404 consecutive IDs have failed"""
+        results = {}
+        pending = set()
+        next_id = frontier = self.endpoint_id
+        stop_id = None
+
+        while True:
+            while stop_id is None and len(pending) < concurrency:
+                pending.add(asyncio.create_task(self.get_plant_async(session, next_id)))
+                next_id += 1
+            if not pending:
+                break
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                endpoint_id, data = task.result()
+                results[endpoint_id] = data
+
+            # Apply the consecutive 404 rule to IDs in order, as far as they have returned
+            while stop_id is None and frontier in results:
+                if "error" in results[frontier]:
+                    self.consecutive_404 += 1
+                else:
+                    self.consecutive_404 = 0
+                if self.consecutive_404 >= self.max_404:
+                    stop_id = frontier
+                    logging.info("Stopping after %s consecutive 404s at ID %s",
+                                 self.consecutive_404, stop_id)
+                    for task in pending:
+                        task.cancel()
+                    metrics.incr("http_cancelled", len(pending))
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    pending = set()
+                frontier += 1
+
+        self.endpoint_id = frontier
+        return {i: data for i, data in results.items() if i <= stop_id}
+
+    async def loop_ids_in_session(self, concurrency: int,
+                                  known_ids: list[int]) -> dict[int, dict]:
+        """Fetches the known IDs then walks upwards for new ones, all over one
+        keep-alive session; returns every response keyed by ID, errors included"""
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            results = await self.fetch_ids(session, known_ids, concurrency)
+            results.update(await self.walk_ids(session, concurrency))
+        return results
+
+    def loop_ids_async(self, concurrency: int = MAX_CONCURRENCY,
+                       registry: EndpointRegistry = None) -> list[dict]:
+        """Loops through endpoints with asyncio over a pooled HTTP session,
+        discovering the highest ID instead of relying on MAX_ID
+        With a registry, only due known IDs are polled and the walk starts past them"""
+        logging.info("Looping over IDs - async with concurrency %s", concurrency)
+        known_ids = []
+        if registry is not None:
+            known_ids = registry.due_ids()
+            self.endpoint_id = max(self.endpoint_id, registry.discovery_start())
+
+        results = asyncio.run(self.loop_ids_in_session(concurrency, known_ids))
+        logging.info("Made %s requests", len(results))
+
+        if registry is not None:
+            registry.record(results)
+            registry.save()
+
+        self.plant_data = [results[i] for i in sorted(results) if "error" not in results[i]]
+        metrics.incr("plants_extracted", len(self.plant_data))
+        logging.info("Finished looping IDs; found %s plants", len(self.plant_data))
+        return self.plant_data
+
 if __name__ == "__main__":
     logging.basicConfig(
         level=logging.INFO,
@@ -78,4 +204,4 @@ if __name__ == "__main__":
         encoding="utf8"
     )
     getter = PlantGetter(BASE_ENDPOINT, START_ID, MAX_404_ERRORS)
-    plants = getter.loop_ids_multi_threaded()
+    plants = getter.loop_ids_async()
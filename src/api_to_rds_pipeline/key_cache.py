@@ -0,0 +1,90 @@
+"""In-memory cache mapping dimension natural keys to their RDS surrogate IDs
+Kept at module level by the loader so warm Lambda containers can reuse it"""
+import logging
+
+
+class KeyIndex:
+    """Hash index from the full natural key tuple of a table to its ID
+    Lookups are O(1) and report a missing key as None rather than raising"""
+
+    def __init__(self, rows: list[tuple] = ()):
+        """Constructor for class; each row is (id, *natural key columns)"""
+        self.ids: dict[tuple, int] = {tuple(row[1:]): row[0] for row in rows}
+        self.max_id = max((row[0] for row in rows), default=0)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self.ids
+
+    def lookup(self, key: tuple) -> int | None:
+        """Returns the ID for a key, or None if the key is not in the index"""
+        return self.ids.get(key)
+
+    def add(self, key: tuple, key_id: int):
+        """Adds or overwrites the ID for a key"""
+        self.ids[key] = key_id
+        self.max_id = max(self.max_id, key_id)
+
+
+class DimensionKeyCache:
+    """Maps the natural key tuple of each cached table to its ID
+    A (row count, max ID) fingerprint per table tells us when the RDS has moved on"""
+
+    def __init__(self, table_columns: dict[str, list[str]]):
+        """Constructor for class; table_columns maps each cached table to its key columns"""
+        self.table_columns = table_columns
+        self.indexes: dict[str, KeyIndex] = {table: KeyIndex() for table in table_columns}
+        self.fingerprints: dict[str, tuple[int, int]] = {}
+        logging.info("Dimension key cache constructed for tables %s", list(table_columns))
+
+    def load_table(self, conn, table_name: str):
+        """Replaces the cached keys of one table with the current RDS contents"""
+        logging.debug("Loading keys for table %s", table_name)
+        table_columns = self.table_columns[table_name]
+        cur = conn.cursor()
+        cur.execute(f"SELECT id, {', '.join(table_columns)} FROM {table_name};")
+        rows = cur.fetchall()
+        cur.close()
+
+        index = KeyIndex(rows)
+        self.indexes[table_name] = index
+        self.fingerprints[table_name] = (len(rows), index.max_id)
+        logging.debug("Loaded %s keys for table %s", len(rows), table_name)
+
+    def fetch_fingerprints(self, conn) -> dict[str, tuple[int, int]]:
+        """Fetches the row count and max ID of every cached table in one query"""
+        query = " UNION ALL ".join(
+            f"SELECT '{table}', COUNT(*), COALESCE(MAX(id), 0) FROM {table}"
+            for table in self.table_columns
+        )
+        cur = conn.cursor()
+        cur.execute(f"{query};")
+        rows = cur.fetchall()
+        cur.close()
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def refresh(self, conn) -> list[str]:
+        """Reloads only the tables whose fingerprint no longer matches the RDS
+        Returns the names of the tables which were reloaded"""
+        logging.info("Checking dimension key cache against the RDS")
+        remote = self.fetch_fingerprints(conn)
+        stale = [table for table in self.table_columns
+                 if self.fingerprints.get(table) != remote.get(table)]
+        for table in stale:
+            self.load_table(conn, table)
+        logging.info("Reloaded %s stale tables: %s", len(stale), stale)
+        return stale
+
+    def lookup(self, table_name: str, key: tuple) -> int | None:
+        """Returns the cached ID for a key, or None if the key is not cached"""
+        return self.indexes[table_name].lookup(key)
+
+    def add(self, table_name: str, key: tuple, key_id: int, inserted: bool):
+        """Records an ID returned by the RDS
+        Freshly inserted rows also advance the fingerprint so the cache stays current"""
+        self.indexes[table_name].add(key, key_id)
+        if inserted and table_name in self.fingerprints:
+            count, max_id = self.fingerprints[table_name]
+            self.fingerprints[table_name] = (count + 1, max(max_id, key_id))
@@ -6,73 +6,18 @@ import pandas as pd
 import numpy as np
 
 from src.utils.utils import get_conn
-
-# expose the ERD as a dictionary
-RDS_TABLES_WITH_FK = {
-    "country": [
-        "country_name"
-    ],
-    "city": [
-        "city_name",
-        "country_id"
-    ],
-    "origin": [
-        "latitude",
-        "longitude",
-        "city_id"
-    ],
-    "botanist": [
-        "botanist_name",
-        "botanist_email",
-        "botanist_phone"
-    ],
-    "plant": [
-        "english_name",
-        "scientific_name",
-        "origin_id"
-    ],
-    "reading": [
-        "reading_taken",
-        "last_watered",
-        "soil_moisture",
-        "soil_temperature",
-        "plant_id",
-        "botanist_id"
-    ],
-    "photo": [
-        "plant_id",
-        "photo_link"
-    ]
-}
-
-# Mapping of the foreign keys each table has
-# Used to "plan" recursion paths
-TABLE_DEPENDENCIES = {
-    "country": [],
-    "city": [
-        "country"
-    ],
-    "origin": [
-        "city"
-    ],
-    "botanist": [],
-    "plant": [
-        "origin"
-    ],
-    "reading": [
-        "plant",
-        "botanist"
-    ],
-    "photo": [
-        "plant",
-    ]
-}
+from src.api_to_rds_pipeline.key_cache import DimensionKeyCache, KeyIndex
+from src.api_to_rds_pipeline.rds import (RDS_TABLES_WITH_FK, TABLE_DEPENDENCIES,
+                                         DIMENSION_LOAD_ORDER, DAILY_STATS_SOURCE_COLUMNS,
+                                         DIMENSION_CACHE, check_table_name_valid,
+                                         merge_dimension_keys, insert_fact_rows,
+                                         merge_daily_stats, collection_value)
 
 
 class DataLoader:
     """Class which handles the loading of a clean dataframe to the RDS"""
 
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, cache: DimensionKeyCache = DIMENSION_CACHE):
         """Constructor for class"""
         logging.info("Constructing loader class")
         load_dotenv()
@@ -84,22 +29,32 @@ class DataLoader:
         self.api_data = df
         self.conn = get_conn()
 
-        self.remote_tables: dict[pd.DataFrame] = {}
-        self.update_tables()
+        self.cache = cache
+        try:
+            self.cache.refresh(self.conn)
+        except BaseException:
+            self.close_conn()
+            raise
+
+        # Only filled on demand by the row-by-row path
+        # Cached tables share the cache's indexes so they are never re-read
+        self.indexes: dict[str, KeyIndex] = dict(self.cache.indexes)
         logging.info("Loader constructed")
         logging.debug(self)
 
 
-    def update_table(self, table_name: str) -> pd.DataFrame:
-        """Function to quickly update a specific local table using RDS data"""
-        self.check_table_name_valid(table_name)
+    def update_table(self, table_name: str) -> KeyIndex:
+        """Function to quickly rebuild the local key index of a specific table using RDS data"""
+        check_table_name_valid(table_name)
         logging.debug("Updating local record of table %s", table_name)
-        cur = self.conn.cursor(as_dict=True)
-        cur.execute(f"select * from {table_name};")
-        data = pd.DataFrame(cur.fetchall())
+        table_columns = RDS_TABLES_WITH_FK[table_name]
+        cur = self.conn.cursor()
+        cur.execute(f"select id, {', '.join(table_columns)} from {table_name};")
+        index = KeyIndex(cur.fetchall())
         cur.close()
-        self.remote_tables[table_name] = data
+        self.indexes[table_name] = index
         logging.debug("Table record updated")
+        return index
 
 
     def update_tables(self):
@@ -113,15 +68,65 @@ class DataLoader:
         """Inserts fresh data into the RDS; skips addition if exact row already exists"""
         logging.info("Adding all rows to the RDS")
 
-        logging.debug("Adding rows for reading table")
-        self.api_data.apply(lambda x: self.add_row(x, "reading"), axis=1)
+        try:
+            logging.debug("Adding rows for reading table")
+            self.api_data.apply(lambda x: self.add_row(x, "reading"), axis=1)
 
-        logging.debug("Adding rows for photo table")
-        self.api_data.apply(lambda x: self.add_row(x, "photo"), axis=1)
+            logging.debug("Adding rows for photo table")
+            self.api_data.apply(lambda x: self.add_row(x, "photo"), axis=1)
 
-        logging.info("Added all rows")
+            logging.info("Added all rows")
+        finally:
+            self.close_conn()
 
-        self.close_conn()
+
+    def upload_tables_to_rds_bulk(self):
+        """Inserts fresh data into the RDS one table at a time rather than one row at a time
+        Round trips scale with the number of tables, not the number of rows"""
+        logging.info("Bulk adding all rows to the RDS")
+        batch = self.api_data.copy()
+
+        # closing returns the connection to the pool, rolling back anything uncommitted
+        try:
+            for table_name in DIMENSION_LOAD_ORDER:
+                logging.debug("Resolving IDs for table %s", table_name)
+                batch[f"{table_name}_id"] = self.resolve_dimension(batch, table_name)
+
+            logging.debug("Inserting rows for table reading")
+            inserted = self.insert_facts(batch, "reading")
+            self.update_daily_stats(inserted)
+
+            self.conn.commit()
+            logging.info("Bulk added all rows")
+        finally:
+            self.close_conn()
+
+
+    def resolve_dimension(self, batch: pd.DataFrame, table_name: str) -> list[int]:
+        """Merges every distinct key of a dimension table in the batch missing from the cache
+        into the RDS, then returns the ID of each batch row in that table"""
+        keys = batch_keys(batch, RDS_TABLES_WITH_FK[table_name])
+        return merge_dimension_keys(self.conn, self.cache, table_name, keys)
+
+
+    def insert_facts(self, batch: pd.DataFrame, table_name: str) -> pd.DataFrame:
+        """Inserts the rows of a fact table in the batch that are not already in the RDS
+        Returns the rows actually inserted, as output by the RDS"""
+        table_columns = RDS_TABLES_WITH_FK[table_name]
+        inserted = insert_fact_rows(self.conn, table_name, batch_keys(batch, table_columns))
+        return pd.DataFrame(inserted, columns=["id", *table_columns])
+
+
+    def update_daily_stats(self, readings: pd.DataFrame):
+        """Folds newly inserted readings into the rolling per-plant daily aggregates
+        Only rows the RDS reports as inserted are counted, so re-runs cannot double count"""
+        if readings.empty:
+            logging.info("No new readings; daily stats unchanged")
+            return
+        stats = daily_stats(readings)
+        rows = [tuple(to_sql_value(value) for value in row)
+                for row in stats[DAILY_STATS_SOURCE_COLUMNS].itertuples(index=False)]
+        merge_daily_stats(self.conn, rows)
 
 
     def add_row(self, row: pd.DataFrame, table_name: str, level=0) -> int:
@@ -134,20 +139,24 @@ class DataLoader:
             logging.debug("Dependency for table %s found: %s", table_name, dependency)
             row[f"{dependency}_id"] = self.add_row(row, dependency, level=level+1)
 
+        if table_name not in self.indexes:
+            self.update_table(table_name)
+
         val = self.fetch_id(row, table_name, table_columns)
-        if not isinstance(val, np.int64):
+        if val is None:
             logging.debug("No value found, adding to table to fetch foreign key ID")
 
             logging.debug("Constructing query")
             query_string = f"""
             INSERT INTO {table_name} ({', '.join(table_columns)})
+            OUTPUT inserted.id
             VALUES ({', '.join(['%s' for _ in range(len(table_columns))])});
             """
             logging.debug("Query string:")
             logging.debug(query_string)
 
             logging.debug("Constructing params")
-            query_params = [str(row[k]) if str(row[k]) != "nan" else "NULL" for k in table_columns]
+            query_params = [to_sql_value(row[k]) for k in table_columns]
             logging.debug("Params for query:")
             logging.debug(query_params)
 
@@ -157,11 +166,12 @@ class DataLoader:
                 operation=query_string,
                 params=query_params
             )
+            val = cur.fetchone()[0]
+            cur.close()
             self.conn.commit()
             logging.debug("Query executed")
 
-            self.update_table(table_name)
-            val = self.fetch_id(row, table_name, table_columns)
+            self.record_inserted_row(row, table_name, val)
             logging.debug("Returning newly inserted ID: %s", val)
 
         logging.debug("Returning %s ID", table_name)
@@ -171,26 +181,20 @@ class DataLoader:
         return val
 
 
-    def fetch_id(self, row: pd.DataFrame, table_name: str, table_columns: list[str]) -> int:
-        """Wrapper to neatly fetch an ID"""
-        logging.debug("Attempting to grab %s ID", table_name)
-        table = self.remote_tables[table_name]
-        try:
-            # "Expected" behaviour
-            val = table.loc[table[table_columns[0]] == row[table_columns[0]]]["id"].iloc[0]
-        except IndexError:
-            # I think happens when the target is an integer?
-            val = table.loc[table[table_columns[0]] == row[table_columns[0]]]["id"]
-            logging.debug("Error handled: value is not in a series OR column is empty")
-        except KeyError:
-            # happens when the database is completely empty
-            val = 0
-            logging.debug("Error handled: database table is empty AND/OR column does not exist")
-
-        if isinstance(val, pd.Series):
-            val = 0
-            logging.debug("Value found is a series; returning 0")
+    def record_inserted_row(self, row: pd.DataFrame, table_name: str, row_id: int):
+        """Adds a freshly inserted row to the local index instead of re-reading the RDS"""
+        key = row_key(row, RDS_TABLES_WITH_FK[table_name])
+        if table_name in self.cache.indexes:
+            self.cache.add(table_name, key, row_id, inserted=True)
+        else:
+            self.indexes[table_name].add(key, row_id)
 
+
+    def fetch_id(self, row: pd.DataFrame, table_name: str,
+                 table_columns: list[str]) -> int | None:
+        """Looks up the ID of a row on its full natural key; returns None if it is missing"""
+        logging.debug("Attempting to grab %s ID", table_name)
+        val = self.indexes[table_name].lookup(row_key(row, table_columns))
         logging.debug("ID for %s: %s", table_name, val)
         return val
 
@@ -202,13 +206,67 @@ class DataLoader:
         logging.info("RDS connection closed")
 
 
-def check_table_name_valid(table_name: str):
-    """Check if a table name is in the list of known tables before we try to query it"""
-    logging.debug("Checking table name %s is valid", table_name)
-    if table_name not in RDS_TABLES_WITH_FK:
-        raise ValueError(f"Given table name {table_name} is not a known destination")
-    logging.debug("Table name OK")
-    return True
+def to_sql_value(value):
+    """Converts a pandas/numpy scalar into a plain Python value pymssql can quote
+    Missing values of any kind become None so they are sent as NULL, and collections
+    such as an empty scientific_name list are collapsed by collection_value"""
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        if value.tzinfo is not None:
+            value = value.tz_convert(None)
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return collection_value(value)
+
+
+def row_key(row: pd.Series, table_columns: list[str]) -> tuple:
+    """Returns the given columns of a single row as a tuple of SQL-ready values"""
+    return tuple(to_sql_value(row[column]) for column in table_columns)
+
+
+def batch_keys(batch: pd.DataFrame, table_columns: list[str]) -> list[tuple]:
+    """Returns the given columns of every batch row as a tuple of SQL-ready values
+    Built as lists, since Series.map would re-infer the dtype and turn None back into NaN"""
+    columns = [[to_sql_value(value) for value in batch[column]] for column in table_columns]
+    return list(zip(*columns))
+
+
+def daily_stats(readings: pd.DataFrame) -> pd.DataFrame:
+    """Aggregates readings per plant and day into the plant_daily_stats merge source"""
+    readings = readings.assign(
+        reading_taken=pd.to_datetime(readings["reading_taken"]),
+        last_watered=pd.to_datetime(readings["last_watered"])
+    ).sort_values("reading_taken")
+    readings["stats_date"] = readings["reading_taken"].dt.normalize()
+    readings["watered_today"] = readings["last_watered"].where(
+        readings["last_watered"].dt.normalize() == readings["stats_date"])
+
+    keys = ["plant_id", "stats_date"]
+    stats = readings.groupby(keys).agg(
+        reading_count=("reading_taken", "size"),
+        first_reading_taken=("reading_taken", "min"),
+        moisture_sum=("soil_moisture", "sum"),
+        moisture_count=("soil_moisture", "count"),
+        moisture_min=("soil_moisture", "min"),
+        moisture_max=("soil_moisture", "max"),
+        temperature_sum=("soil_temperature", "sum"),
+        temperature_count=("soil_temperature", "count"),
+        temperature_min=("soil_temperature", "min"),
+        temperature_max=("soil_temperature", "max"),
+        most_recent_watering=("last_watered", "max"),
+        first_watering_today=("watered_today", "min"),
+        last_watering_today=("watered_today", "max"),
+        new_waterings=("watered_today", "nunique")
+    )
+    latest = readings.drop_duplicates(keys, keep="last").set_index(keys)[[
+        "reading_taken", "soil_moisture", "soil_temperature", "last_watered", "botanist_id"
+    ]].add_prefix("latest_")
+    stats = stats.join(latest).reset_index()
+    stats["stats_date"] = stats["stats_date"].dt.date
+    return stats
+
 
 # Example usage
 
@@ -0,0 +1,130 @@
+"""Pandas-free counterpart of load.py, bulk loading the plain columns of transform_records
+Sends exactly the statements DataLoader.upload_tables_to_rds_bulk does"""
+import logging
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+from src.utils.utils import get_conn
+from src.api_to_rds_pipeline.key_cache import DimensionKeyCache
+from src.api_to_rds_pipeline.rds import (RDS_TABLES_WITH_FK, DIMENSION_LOAD_ORDER,
+                                         DAILY_STATS_SOURCE_COLUMNS, DIMENSION_CACHE,
+                                         merge_dimension_keys, insert_fact_rows,
+                                         merge_daily_stats, collection_value)
+from src.api_to_rds_pipeline.transform_records import is_missing, to_timestamp
+
+READING_COLUMNS = ["id", *RDS_TABLES_WITH_FK["reading"]]
+
+
+def sql_value(value):
+    """Converts a cleaned value into one pymssql can quote, as to_sql_value does for pandas
+    Aware timestamps become naive UTC; missing values become None; collections are
+    collapsed by collection_value"""
+    if is_missing(value):
+        return None
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return collection_value(value)
+
+
+def column_keys(columns: dict[str, list], table_columns: list[str]) -> list[tuple]:
+    """Returns the given columns of every row as a tuple"""
+    return list(zip(*(columns[column] for column in table_columns)))
+
+
+def daily_stats_rows(inserted: list[tuple]) -> list[tuple]:
+    """Aggregates inserted readings per plant and day into plant_daily_stats merge rows,
+    matching load.daily_stats without pandas"""
+    readings = []
+    for row in inserted:
+        reading = dict(zip(READING_COLUMNS, row))
+        reading["reading_taken"] = to_timestamp(reading["reading_taken"])
+        reading["last_watered"] = to_timestamp(reading["last_watered"])
+        if reading["reading_taken"] is not None:
+            readings.append(reading)
+    readings.sort(key=lambda reading: reading["reading_taken"])
+
+    groups: dict[tuple, list[dict]] = {}
+    for reading in readings:
+        key = (reading["plant_id"], reading["reading_taken"].date())
+        groups.setdefault(key, []).append(reading)
+
+    rows = []
+    for (plant_id, day), group in sorted(groups.items()):
+        moisture = [r["soil_moisture"] for r in group if not is_missing(r["soil_moisture"])]
+        temperature = [r["soil_temperature"] for r in group
+                       if not is_missing(r["soil_temperature"])]
+        watered = [r["last_watered"] for r in group if r["last_watered"] is not None]
+        watered_today = [time for time in watered if time.date() == day]
+        latest = group[-1]
+        stats = {
+            "plant_id": plant_id,
+            "stats_date": day,
+            "reading_count": len(group),
+            "first_reading_taken": group[0]["reading_taken"],
+            "latest_reading_taken": latest["reading_taken"],
+            "latest_soil_moisture": latest["soil_moisture"],
+            "latest_soil_temperature": latest["soil_temperature"],
+            "latest_last_watered": latest["last_watered"],
+            "latest_botanist_id": latest["botanist_id"],
+            "moisture_sum": sum(moisture),
+            "moisture_count": len(moisture),
+            "moisture_min": min(moisture, default=None),
+            "moisture_max": max(moisture, default=None),
+            "temperature_sum": sum(temperature),
+            "temperature_count": len(temperature),
+            "temperature_min": min(temperature, default=None),
+            "temperature_max": max(temperature, default=None),
+            "most_recent_watering": max(watered, default=None),
+            "first_watering_today": min(watered_today, default=None),
+            "last_watering_today": max(watered_today, default=None),
+            "new_waterings": len(set(watered_today))
+        }
+        rows.append(tuple(sql_value(stats[column]) for column in DAILY_STATS_SOURCE_COLUMNS))
+    return rows
+
+
+class RecordLoader:
+    """Bulk loads cleaned columns to the RDS, as DataLoader.upload_tables_to_rds_bulk does"""
+
+    def __init__(self, columns: dict[str, list], cache: DimensionKeyCache = DIMENSION_CACHE):
+        """Constructor for class"""
+        load_dotenv()
+        if not isinstance(columns, dict):
+            raise ValueError(
+                f"Input to load stage must be a dict of columns; received {type(columns)}")
+        if not columns.get("plant_id"):
+            raise ValueError("Columns must contain data.")
+
+        self.columns = columns
+        self.conn = get_conn()
+        self.cache = cache
+        try:
+            self.cache.refresh(self.conn)
+        except BaseException:
+            self.conn.close()
+            raise
+
+    def upload_tables_to_rds_bulk(self):
+        """Inserts fresh data into the RDS one table at a time"""
+        logging.info("Bulk adding all records to the RDS")
+        batch = {column: [sql_value(value) for value in values]
+                 for column, values in self.columns.items()}
+
+        # closing returns the connection to the pool, rolling back anything uncommitted
+        try:
+            for table_name in DIMENSION_LOAD_ORDER:
+                keys = column_keys(batch, RDS_TABLES_WITH_FK[table_name])
+                batch[f"{table_name}_id"] = merge_dimension_keys(self.conn, self.cache,
+                                                                 table_name, keys)
+
+            inserted = insert_fact_rows(self.conn, "reading",
+                                        column_keys(batch, RDS_TABLES_WITH_FK["reading"]))
+            if inserted:
+                merge_daily_stats(self.conn, daily_stats_rows(inserted))
+            else:
+                logging.info("No new readings; daily stats unchanged")
+
+            self.conn.commit()
+            logging.info("Bulk added all records")
+        finally:
+            self.conn.close()
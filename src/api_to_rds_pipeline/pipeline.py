@@ -1,16 +1,51 @@
 '''runs full pipeline'''
+import os
 import logging
 import datetime
 from dotenv import load_dotenv
 
-from extract import PlantGetter, BASE_ENDPOINT, START_ID, MAX_404_ERRORS
-from transform import PlantDataTransformer
-from load import DataLoader
+from src.utils import metrics, profiling
+from src.api_to_rds_pipeline.extract import PlantGetter, BASE_ENDPOINT, START_ID, MAX_404_ERRORS
+from src.api_to_rds_pipeline.registry import EndpointRegistry, REGISTRY_PATH
 
+# "pandas" cleans and loads a DataFrame; "records" does the same on plain lists
+# and never imports pandas, which is most of a small batch's cold start
+PIPELINE_PATH = os.environ.get("API_PIPELINE_PATH", "pandas")
+PIPELINE_PATHS = ["pandas", "records"]
 
-def run_pipeline(terminal_output=True):
-    """uses etl files to create full pipeline that loads endpoint data to RDS"""
+# Kept across warm invocations, like the RDS connection pool and dimension key cache
+_REGISTRY = None
+
+
+def stage_classes(path: str) -> tuple[type, type]:
+    """The transformer and loader classes of a pipeline path
+    Imported here so that only the chosen path's dependencies are loaded"""
+    # pylint: disable=import-outside-toplevel
+    if path not in PIPELINE_PATHS:
+        raise ValueError(f"Unknown pipeline path {path}; expected one of {PIPELINE_PATHS}")
+    if path == "records":
+        from src.api_to_rds_pipeline.transform_records import PlantRecordTransformer
+        from src.api_to_rds_pipeline.load_records import RecordLoader
+        return PlantRecordTransformer, RecordLoader
+    from src.api_to_rds_pipeline.transform import PlantDataTransformer
+    from src.api_to_rds_pipeline.load import DataLoader
+    return PlantDataTransformer, DataLoader
+
+
+def endpoint_registry() -> EndpointRegistry:
+    """The endpoint registry, read from disk only on a cold start"""
+    global _REGISTRY  # pylint: disable=global-statement
+    if _REGISTRY is None:
+        _REGISTRY = EndpointRegistry.from_file(REGISTRY_PATH)
+    return _REGISTRY
+
+
+def run_pipeline(terminal_output=True, path=PIPELINE_PATH):
+    """uses etl files to create full pipeline that loads endpoint data to RDS
+    Stage timings and counts are emitted as one CloudWatch EMF record at the end"""
+    transformer_class, loader_class = stage_classes(path)
     pipeline_start = datetime.datetime.now()
+    metrics.start_run("api_to_rds")
 
     # logging handler setup
     logging_handlers = []
@@ -29,44 +64,40 @@ def run_pipeline(terminal_output=True):
     logging.info("Started execution of pipeline at %s", pipeline_start)
     load_dotenv()
 
-    # extract
-    extract_start = datetime.datetime.now()
-    getter = PlantGetter(BASE_ENDPOINT, START_ID, MAX_404_ERRORS)
-    plants = getter.loop_ids_multi_threaded()
-    extract_end = datetime.datetime.now()
-    logging.info("Finished execution of extract at %s", extract_end)
-    logging.info("Extract timer: %s", extract_end-extract_start)
-
-    # transform
-    transform_start = datetime.datetime.now()
-    transformer = PlantDataTransformer(plants)
-    transformer.transform()
-    transform_end = datetime.datetime.now()
-    logging.info("Finished execution of transform at %s", transform_end)
-    logging.info("Transform timer: %s", transform_end-transform_start)
-
-    # load
-    load_start = datetime.datetime.now()
-    loader = DataLoader(transformer.df)
-    loader.upload_tables_to_rds()
-    load_end = datetime.datetime.now()
-    logging.info("Finished execution of load at %s", load_end)
-    logging.info("Load timer: %s", load_end-load_start)
-
-    pipeline_end = datetime.datetime.now()
-    logging.info("Finished execution of pipeline at %s", pipeline_end)
-    logging.info("Pipeline timer: %s", pipeline_end-pipeline_start)
+    try:
+        with metrics.span("extract"):
+            getter = PlantGetter(BASE_ENDPOINT, START_ID, MAX_404_ERRORS)
+            plants = getter.loop_ids_async(registry=endpoint_registry())
+
+        with metrics.span("transform"):
+            transformer = transformer_class(plants)
+            cleaned = transformer.transform()
+            transformer.write_rejects()
+
+        with metrics.span("load"):
+            loader = loader_class(cleaned)
+            loader.upload_tables_to_rds_bulk()
+    finally:
+        pipeline_end = datetime.datetime.now()
+        logging.info("Finished execution of pipeline at %s", pipeline_end)
+        logging.info("Pipeline timer: %s", pipeline_end-pipeline_start)
 
 
 def handler(event, context):
-    """handler function for lambda function"""
+    """handler function for lambda function
+    {"profile": "sample"} or {"profile": "cprofile"} in the event profiles this run"""
     try:
-        run_pipeline()
-        print(f"{event} : Lambda time remaining in MS:",
-              context.get_remaining_time_in_millis())
+        with profiling.profiled("api_to_rds", profiling.profile_mode(event)):
+            run_pipeline()
         return {"statusCode": 200}
     except (TypeError, ValueError, IndexError) as e:
+        metrics.incr("pipeline_errors")
         return {"statusCode": 500, "error": str(e)}
+    finally:
+        metrics.gauge("lambda_remaining_ms", context.get_remaining_time_in_millis())
+        metrics.emit()
 
 if __name__ == "__main__":
-    run_pipeline()
+    with profiling.profiled("api_to_rds", profiling.profile_mode()):
+        run_pipeline()
+    metrics.emit()
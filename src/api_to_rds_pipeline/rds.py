@@ -0,0 +1,318 @@
+"""The RDS schema, the SQL the minute pipeline sends and the statements that send it
+Shared by the pandas and plain-record loaders, so it imports nothing heavy"""
+import logging
+
+from src.utils import metrics
+from src.api_to_rds_pipeline.key_cache import DimensionKeyCache
+
+# expose the ERD as a dictionary
+RDS_TABLES_WITH_FK = {
+    "country": [
+        "country_name"
+    ],
+    "city": [
+        "city_name",
+        "country_id"
+    ],
+    "origin": [
+        "latitude",
+        "longitude",
+        "city_id"
+    ],
+    "botanist": [
+        "botanist_name",
+        "botanist_email",
+        "botanist_phone"
+    ],
+    "plant": [
+        "english_name",
+        "scientific_name",
+        "origin_id"
+    ],
+    "reading": [
+        "reading_taken",
+        "last_watered",
+        "soil_moisture",
+        "soil_temperature",
+        "plant_id",
+        "botanist_id"
+    ],
+    "photo": [
+        "plant_id",
+        "photo_link"
+    ]
+}
+
+# Mapping of the foreign keys each table has
+# Used to "plan" recursion paths
+TABLE_DEPENDENCIES = {
+    "country": [],
+    "city": [
+        "country"
+    ],
+    "origin": [
+        "city"
+    ],
+    "botanist": [],
+    "plant": [
+        "origin"
+    ],
+    "reading": [
+        "plant",
+        "botanist"
+    ],
+    "photo": [
+        "plant",
+    ]
+}
+
+# Order in which the dimension tables are resolved by the bulk loader
+# Every table appears after all of its dependencies
+# Photo is keyed like a dimension so it is resolved and cached alongside them
+DIMENSION_LOAD_ORDER = [
+    "country",
+    "city",
+    "origin",
+    "botanist",
+    "plant",
+    "photo"
+]
+
+# Columns which identify a duplicate row in the fact tables
+FACT_NATURAL_KEYS = {
+    "reading": [
+        "plant_id",
+        "reading_taken"
+    ]
+}
+
+# Maximum rows sent in a single bulk statement
+BULK_BATCH_SIZE = 1000
+
+# Per-plant, per-day rolling aggregates merged into plant_daily_stats by the bulk loader
+# first_watering_today and new_waterings only exist in the merge source, to count waterings
+DAILY_STATS_SOURCE_COLUMNS = [
+    "plant_id",
+    "stats_date",
+    "reading_count",
+    "first_reading_taken",
+    "latest_reading_taken",
+    "latest_soil_moisture",
+    "latest_soil_temperature",
+    "latest_last_watered",
+    "latest_botanist_id",
+    "moisture_sum",
+    "moisture_count",
+    "moisture_min",
+    "moisture_max",
+    "temperature_sum",
+    "temperature_count",
+    "temperature_min",
+    "temperature_max",
+    "most_recent_watering",
+    "first_watering_today",
+    "last_watering_today",
+    "new_waterings"
+]
+
+# Shared across loaders so a warm Lambda container keeps its keys between invocations
+# The reading table is never cached
+DIMENSION_CACHE = DimensionKeyCache(
+    {table: RDS_TABLES_WITH_FK[table] for table in DIMENSION_LOAD_ORDER}
+)
+
+def collection_value(value):
+    """Collapses a list, tuple, set or dict into a string, or None when it is empty,
+    so that it can be hashed into a key and sent as a single SQL value"""
+    if isinstance(value, (list, tuple, set, dict)):
+        return str(value) if value else None
+    return value
+
+
+def collation_key(key: tuple) -> tuple:
+    """Normalises a key the way the RDS collation compares it: case-insensitively and
+    ignoring trailing spaces"""
+    return tuple(value.rstrip().lower() if isinstance(value, str) else value for value in key)
+
+
+def check_table_name_valid(table_name: str):
+    """Check if a table name is in the list of known tables before we try to query it"""
+    logging.debug("Checking table name %s is valid", table_name)
+    if table_name not in RDS_TABLES_WITH_FK:
+        raise ValueError(f"Given table name {table_name} is not a known destination")
+    logging.debug("Table name OK")
+    return True
+
+
+def build_values_clause(table_columns: list[str], n_rows: int) -> str:
+    """Builds a parameterised table value constructor aliased as v"""
+    row_placeholder = f"({', '.join(['%s' for _ in table_columns])})"
+    return f"""(VALUES {', '.join([row_placeholder] * n_rows)})
+            AS v ({', '.join(table_columns)})"""
+
+
+def build_match_condition(table_columns: list[str]) -> str:
+    """Builds a NULL-safe equality check between target t and source v"""
+    return " AND ".join(
+        f"(t.{column} = v.{column} OR (t.{column} IS NULL AND v.{column} IS NULL))"
+        for column in table_columns
+    )
+
+
+def build_merge_query(table_name: str, n_rows: int) -> str:
+    """Builds a MERGE which inserts missing keys and outputs the ID of every key given
+    The update on matched rows sets a column to its stored value, so existing keys appear
+    in the output too without changing, and $action tells the caller which keys were
+    actually inserted. The source columns are output rather than the stored ones, so each
+    ID comes back under the key as sent even where collation or trailing spaces make the
+    stored value compare differently. The source must not hold two keys that compare
+    equal, see collation_key"""
+    check_table_name_valid(table_name)
+    table_columns = RDS_TABLES_WITH_FK[table_name]
+    return f"""
+    MERGE INTO {table_name} AS t
+    USING {build_values_clause(table_columns, n_rows)}
+    ON {build_match_condition(table_columns)}
+    WHEN MATCHED THEN
+        UPDATE SET t.{table_columns[0]} = t.{table_columns[0]}
+    WHEN NOT MATCHED THEN
+        INSERT ({', '.join(table_columns)})
+        VALUES ({', '.join(f"v.{column}" for column in table_columns)})
+    OUTPUT $action, inserted.id, {', '.join(f"v.{column}" for column in table_columns)};
+    """
+
+
+def build_fact_insert_query(table_name: str, n_rows: int) -> str:
+    """Builds a multi-row INSERT which skips rows already present in a fact table"""
+    check_table_name_valid(table_name)
+    table_columns = RDS_TABLES_WITH_FK[table_name]
+    return f"""
+    INSERT INTO {table_name} ({', '.join(table_columns)})
+    OUTPUT inserted.id, {', '.join(f"inserted.{column}" for column in table_columns)}
+    SELECT {', '.join(f"v.{column}" for column in table_columns)}
+    FROM {build_values_clause(table_columns, n_rows)}
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {table_name} AS t
+        WHERE {build_match_condition(FACT_NATURAL_KEYS[table_name])}
+    );
+    """
+
+
+def build_daily_stats_merge_query(n_rows: int) -> str:
+    """Builds a MERGE which adds a batch's per-plant daily aggregates to plant_daily_stats
+    Waterings are counted assuming they arrive in time order, so only waterings after the
+    stored last_watering_today are new"""
+    def smallest(column):
+        return f"(SELECT MIN(x) FROM (VALUES (t.{column}), (v.{column})) AS m (x))"
+
+    def largest(column):
+        return f"(SELECT MAX(x) FROM (VALUES (t.{column}), (v.{column})) AS m (x))"
+
+    def if_newer(column):
+        return (f"CASE WHEN t.latest_reading_taken IS NULL "
+                f"OR v.latest_reading_taken >= t.latest_reading_taken "
+                f"THEN v.{column} ELSE t.{column} END")
+
+    stored_columns = [column for column in DAILY_STATS_SOURCE_COLUMNS
+                      if column not in ("first_watering_today", "new_waterings")]
+    return f"""
+    MERGE INTO plant_daily_stats AS t
+    USING {build_values_clause(DAILY_STATS_SOURCE_COLUMNS, n_rows)}
+    ON t.plant_id = v.plant_id AND t.stats_date = v.stats_date
+    WHEN MATCHED THEN UPDATE SET
+        t.reading_count = t.reading_count + v.reading_count,
+        t.first_reading_taken = {smallest("first_reading_taken")},
+        t.latest_soil_moisture = {if_newer("latest_soil_moisture")},
+        t.latest_soil_temperature = {if_newer("latest_soil_temperature")},
+        t.latest_last_watered = {if_newer("latest_last_watered")},
+        t.latest_botanist_id = {if_newer("latest_botanist_id")},
+        t.latest_reading_taken = {largest("latest_reading_taken")},
+        t.moisture_sum = t.moisture_sum + v.moisture_sum,
+        t.moisture_count = t.moisture_count + v.moisture_count,
+        t.moisture_min = {smallest("moisture_min")},
+        t.moisture_max = {largest("moisture_max")},
+        t.temperature_sum = t.temperature_sum + v.temperature_sum,
+        t.temperature_count = t.temperature_count + v.temperature_count,
+        t.temperature_min = {smallest("temperature_min")},
+        t.temperature_max = {largest("temperature_max")},
+        t.most_recent_watering = {largest("most_recent_watering")},
+        t.watering_count = t.watering_count + CASE
+            WHEN v.last_watering_today IS NULL THEN 0
+            WHEN t.last_watering_today IS NULL
+                OR v.first_watering_today > t.last_watering_today THEN v.new_waterings
+            WHEN v.last_watering_today > t.last_watering_today THEN v.new_waterings - 1
+            ELSE 0 END,
+        t.last_watering_today = {largest("last_watering_today")}
+    WHEN NOT MATCHED THEN
+        INSERT ({', '.join(stored_columns)}, watering_count)
+        VALUES ({', '.join(f"v.{column}" for column in stored_columns)}, v.new_waterings);
+    """
+
+
+def merge_dimension_keys(conn, cache: DimensionKeyCache, table_name: str,
+                         keys: list[tuple]) -> list[int]:
+    """Merges every distinct key of a dimension table missing from the cache into the RDS,
+    then returns the ID of each given key in that table"""
+    # a MERGE fails if two source rows match one target row, so keys which only differ in
+    # case or trailing spaces are sent once and the returned ID is given to every variant
+    variants = {}
+    for key in dict.fromkeys(keys):
+        if cache.lookup(table_name, key) is None:
+            variants.setdefault(collation_key(key), []).append(key)
+    missing_keys = [same_keys[0] for same_keys in variants.values()]
+    logging.debug("%s uncached keys for table %s", len(missing_keys), table_name)
+
+    if missing_keys:
+        cur = conn.cursor()
+        for start in range(0, len(missing_keys), BULK_BATCH_SIZE):
+            chunk = missing_keys[start:start+BULK_BATCH_SIZE]
+            cur.execute(
+                build_merge_query(table_name, len(chunk)),
+                tuple(value for key in chunk for value in key)
+            )
+            for row in cur.fetchall():
+                same_keys = variants.get(collation_key(tuple(row[2:])), [tuple(row[2:])])
+                cache.add(table_name, same_keys[0], row[1], row[0] == "INSERT")
+                for key in same_keys[1:]:
+                    cache.add(table_name, key, row[1], False)
+        cur.close()
+
+    ids = [cache.lookup(table_name, key) for key in keys]
+    unresolved = {key for key, key_id in zip(keys, ids) if key_id is None}
+    if unresolved:
+        raise RuntimeError(f"No {table_name} ID returned for keys: {sorted(unresolved, key=repr)}")
+    return ids
+
+
+def insert_fact_rows(conn, table_name: str, rows: list[tuple]) -> list[tuple]:
+    """Inserts the distinct rows of a fact table that are not already in the RDS
+    Returns the rows actually inserted, as output by the RDS: (id, *columns)"""
+    rows = list(dict.fromkeys(rows))
+
+    inserted = []
+    cur = conn.cursor()
+    for start in range(0, len(rows), BULK_BATCH_SIZE):
+        chunk = rows[start:start+BULK_BATCH_SIZE]
+        cur.execute(
+            build_fact_insert_query(table_name, len(chunk)),
+            tuple(value for row in chunk for value in row)
+        )
+        inserted.extend(cur.fetchall())
+    cur.close()
+
+    metrics.incr(f"{table_name}_rows_inserted", len(inserted))
+    logging.info("Inserted %s new rows into table %s", len(inserted), table_name)
+    return inserted
+
+
+def merge_daily_stats(conn, rows: list[tuple]):
+    """Merges rows of DAILY_STATS_SOURCE_COLUMNS into plant_daily_stats"""
+    cur = conn.cursor()
+    for start in range(0, len(rows), BULK_BATCH_SIZE):
+        chunk = rows[start:start+BULK_BATCH_SIZE]
+        cur.execute(
+            build_daily_stats_merge_query(len(chunk)),
+            tuple(value for row in chunk for value in row)
+        )
+    cur.close()
+    logging.info("Updated daily stats for %s plants", len(rows))
@@ -0,0 +1,78 @@
+"""Persisted registry of plant endpoint IDs and their health
+Lets the minute extract poll live IDs every run and re-probe dead ones occasionally"""
+import os
+import json
+import logging
+from datetime import datetime, timezone
+
+REGISTRY_PATH = os.environ.get("ENDPOINT_REGISTRY_PATH", "/tmp/endpoint_registry.json")
+DEAD_AFTER_MISSES = 3
+DEAD_PROBE_INTERVAL = 30
+
+LIVE = "live"
+DEAD = "dead"
+
+
+class EndpointRegistry:
+    """Tracks the state, consecutive misses and last success of every probed ID"""
+
+    def __init__(self, path: str = REGISTRY_PATH, endpoints: dict[int, dict] = None,
+                 run: int = 0):
+        """Constructor for class"""
+        self.path = path
+        self.endpoints = endpoints or {}
+        self.run = run
+        logging.info("Registry holds %s endpoints at run %s", len(self.endpoints), self.run)
+
+    @classmethod
+    def from_file(cls, path: str = REGISTRY_PATH) -> "EndpointRegistry":
+        """Loads a registry from disk, starting empty if the file is missing or unreadable"""
+        try:
+            with open(path, encoding="utf8") as f:
+                saved = json.load(f)
+            endpoints = {int(k): v for k, v in saved["endpoints"].items()}
+            return cls(path, endpoints, saved["run"])
+        except (OSError, ValueError, KeyError):
+            logging.warning("No usable registry at %s; starting empty", path)
+            return cls(path)
+
+    def save(self):
+        """Writes the registry atomically so a killed run cannot leave it half-written"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            json.dump({"run": self.run, "endpoints": self.endpoints}, f)
+        os.replace(tmp_path, self.path)
+        logging.info("Registry saved to %s", self.path)
+
+    def discovery_start(self) -> int:
+        """Returns the ID after the highest live one, where the upward walk resumes
+        IDs from here on are always walked, so new plants are found on the next run"""
+        live_ids = [endpoint_id for endpoint_id, entry in self.endpoints.items()
+                    if entry["state"] == LIVE]
+        return max(live_ids, default=0) + 1
+
+    def due_ids(self) -> list[int]:
+        """Returns every live ID plus the dead IDs whose re-probe slot is this run
+        Dead IDs are staggered so only ~1/DEAD_PROBE_INTERVAL of them are probed per run"""
+        start = self.discovery_start()
+        due = [endpoint_id for endpoint_id, entry in sorted(self.endpoints.items())
+               if endpoint_id < start
+               and (entry["state"] == LIVE or (self.run + endpoint_id) % DEAD_PROBE_INTERVAL == 0)]
+        logging.info("%s of %s known endpoints due this run", len(due), len(self.endpoints))
+        return due
+
+    def record(self, results: dict[int, dict]):
+        """Updates health from one run's responses, keyed by endpoint ID, and advances the run"""
+        now = datetime.now(timezone.utc).isoformat()
+        for endpoint_id, data in results.items():
+            entry = self.endpoints.setdefault(
+                endpoint_id, {"state": DEAD, "misses": 0, "last_seen": None})
+            if "error" in data:
+                entry["misses"] += 1
+                if entry["misses"] >= DEAD_AFTER_MISSES:
+                    entry["state"] = DEAD
+            else:
+                entry["state"] = LIVE
+                entry["misses"] = 0
+                entry["last_seen"] = now
+        self.run += 1
@@ -1,17 +1,26 @@
 """Transforms a list of dictionaries containing plant data into a clean dataframe,
 ensuring essential data is there and validating types and values"""
+import os
 import logging
+from datetime import datetime, timezone
 
+import numpy as np
 import pandas as pd
 
+from src.utils import metrics
+from src.api_to_rds_pipeline.transform_records import (QUARANTINE_DIR, VALIDATION_RULES,
+                                                       COLUMN_SPEC)
+
 
 class PlantDataTransformer:
     """Has properties plant_data: raw input, and df: transformed output"""
 
-    def __init__(self, plant_data: list[dict]):
+    def __init__(self, plant_data: list[dict], rules: list[dict] = None):
         logging.info("Constructing transformer class")
         self.plant_data = plant_data
+        self.rules = VALIDATION_RULES if rules is None else rules
         self.df = pd.DataFrame()
+        self.rejects = pd.DataFrame()
         logging.info("Transformer constructed")
         logging.debug("Received data:")
         logging.debug(self.plant_data)
@@ -53,8 +62,42 @@ class PlantDataTransformer:
         logging.debug("Converted dataframe:")
         logging.debug(self.df)
 
-    def clean_data(self):
-        """Clean the dataframe (e.g. handle nulls, ensure correct data types)"""
+    def create_dataframe_columnar(self):
+        """Columnar equivalent of create_dataframe driven by COLUMN_SPEC
+        Filters on required fields once, then builds each column in a single pass over the batch;
+        scientific names are unwrapped from their list here rather than row by row later"""
+        logging.info("Creating cleaned dataframe - columnar")
+        required = [path[0] for path, is_required in COLUMN_SPEC.values() if is_required]
+        records = [plant for plant in self.plant_data
+                   if all(key in plant for key in required)]
+        if len(records) < len(self.plant_data):
+            logging.error("Skipped %s rows on missing fields",
+                          len(self.plant_data) - len(records))
+
+        # Each nested object is fetched once per record, whichever columns need it
+        nested = {}
+        for path, _ in COLUMN_SPEC.values():
+            if len(path) > 1 and path[0] not in nested:
+                nested[path[0]] = [value if isinstance(value, dict) else {}
+                                   for value in (plant.get(path[0]) for plant in records)]
+
+        columns = {}
+        for column, (path, _) in COLUMN_SPEC.items():
+            if len(path) > 1:
+                columns[column] = [parent.get(path[1]) for parent in nested[path[0]]]
+            else:
+                columns[column] = [plant.get(path[0]) for plant in records]
+        columns["scientific_name"] = [
+            name[0].replace("'", '"') if isinstance(name, list) and name else name
+            for name in columns["scientific_name"]
+        ]
+
+        self.df = pd.DataFrame(columns, columns=list(COLUMN_SPEC))
+        logging.info("Conversion complete")
+
+    def clean_data(self, unwrap_names: bool = True):
+        """Clean the dataframe (e.g. handle nulls, ensure correct data types)
+        unwrap_names can be turned off when names were already unwrapped on creation"""
         logging.info("Cleaning dataframe")
         start_length = len(self.df)
         logging.info("Dataframe length: %s", start_length)
@@ -65,6 +108,9 @@ class PlantDataTransformer:
                 self.df[col] = pd.to_datetime(self.df[col], errors='coerce')
         logging.info("Converted timestamps to datetime")
 
+        # Keep the raw values of ruled columns so rejects show what was actually received
+        raw_columns = {rule["column"]: self.df[rule["column"]] for rule in self.rules}
+
         # Ensure readings are floats
         for col in ['soil_temperature', 'soil_moisture']:
             self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
@@ -72,32 +118,125 @@ class PlantDataTransformer:
 
 
         # If scientific_name is always in a list on its own
-        if 'scientific_name' in self.df.columns:
+        if unwrap_names and 'scientific_name' in self.df.columns:
             self.df['scientific_name'] = self.df['scientific_name'].apply(
                 lambda x: x[0].replace("'", '"') if isinstance(x, list) and x else x)
         logging.info("Extracted scientific names from length-1 list")
 
 
-        # Replace negative moisture with null
-        self.df['soil_moisture'] = self.df['soil_moisture'].mask(
-            self.df['soil_moisture'] < 0)
-        logging.info("Replaced negative moisture values with null")
-
-        # Replace temperatures outside of valid range with null
-        self.df['soil_temperature'] = self.df['soil_temperature'].mask(
-            (self.df['soil_temperature'] < -10) | (self.df['soil_temperature'] > 60))
-        logging.info("Replaced unusual temperature values with null")
-
-
-        # Drop rows which have a null value for moisture or temperature
-        self.df = self.df.dropna(subset=['soil_temperature', 'soil_moisture'])
-        logging.info("Dropped rows with a NaN in float columns")
+        # Split off rows failing any validation rule, keeping the reason for each
+        reasons = evaluate_rules(self.df, raw_columns, self.rules)
+        rejected = reasons != ""
+        self.rejects = self.df.loc[rejected].assign(
+            **{column: raw[rejected] for column, raw in raw_columns.items()},
+            reject_reason=reasons[rejected]
+        )
+        self.df = self.df.loc[~rejected]
+        logging.info("Rejected rows failing validation rules")
         logging.info("%s rows dropped", start_length - len(self.df))
+        for reason, count in self.rejects["reject_reason"].value_counts().items():
+            logging.info("Rejected %s rows: %s", count, reason)
 
         logging.info("Data cleaning complete")
 
-    def transform(self) -> pd.DataFrame:
-        """Full transformation process and returns the datafram"""
-        self.create_dataframe()
-        self.clean_data()
+    def write_rejects(self, directory: str = QUARANTINE_DIR, file_format: str = "csv") -> str:
+        """Writes this run's rejected rows and their reasons to a quarantine file
+        Returns the file path, or None when nothing was rejected"""
+        if self.rejects.empty:
+            logging.info("No rejected rows to quarantine")
+            return None
+        os.makedirs(directory, exist_ok=True)
+        run_time = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        path = os.path.join(directory, f"rejects_{run_time}.{file_format}")
+        if file_format == "parquet":
+            self.rejects.astype(str).to_parquet(path, index=False)
+        else:
+            self.rejects.to_csv(path, index=False)
+        logging.info("Quarantined %s rejected rows to %s", len(self.rejects), path)
+        return path
+
+    def transform(self, columnar: bool = True) -> pd.DataFrame:
+        """Full transformation process and returns the datafram
+        The columnar path is the default; the row-by-row path is kept for comparison"""
+        metrics.incr("transform_rows_in", len(self.plant_data))
+        if columnar:
+            self.create_dataframe_columnar()
+            self.clean_data(unwrap_names=False)
+        else:
+            self.create_dataframe()
+            self.clean_data()
+        metrics.incr("transform_rows_out", len(self.df))
+        metrics.incr("transform_rows_rejected", len(self.rejects))
         return self.df
+
+
+class ColumnMasks:
+    """The comparisons a column's rules are built from, each computed at most once
+    Rules on the same column share them rather than each rebuilding its own"""
+
+    def __init__(self, raw: pd.Series, values: pd.Series):
+        self.raw = raw
+        self.values = values
+        self.masks = {}
+
+    def mask(self, name: str, compute) -> np.ndarray:
+        """Returns the named comparison, computing it on first use"""
+        if name not in self.masks:
+            self.masks[name] = np.asarray(compute(), dtype=bool)
+        return self.masks[name]
+
+    def raw_missing(self) -> np.ndarray:
+        """Rows with no raw value"""
+        return self.mask("raw_missing", lambda: self.raw.isna().to_numpy())
+
+    def value_missing(self) -> np.ndarray:
+        """Rows with no value after conversion"""
+        return self.mask("value_missing", lambda: self.values.isna().to_numpy())
+
+    def below(self, bound: float) -> np.ndarray:
+        """Rows whose value is less than bound"""
+        return self.mask(("below", bound), lambda: (self.values < bound).to_numpy())
+
+    def above(self, bound: float) -> np.ndarray:
+        """Rows whose value is greater than bound"""
+        return self.mask(("above", bound), lambda: (self.values > bound).to_numpy())
+
+
+def check_not_null(masks: ColumnMasks, _rule: dict) -> np.ndarray:
+    """Fails rows with no raw value"""
+    return masks.raw_missing()
+
+
+def check_numeric(masks: ColumnMasks, _rule: dict) -> np.ndarray:
+    """Fails rows whose raw value was lost when converted to a number"""
+    return ~masks.raw_missing() & masks.value_missing()
+
+
+def check_range(masks: ColumnMasks, rule: dict) -> np.ndarray:
+    """Fails rows whose value lies outside the rule's min/max"""
+    failed = np.zeros(len(masks.values), dtype=bool)
+    if "min" in rule:
+        failed |= masks.below(rule["min"])
+    if "max" in rule:
+        failed |= masks.above(rule["max"])
+    return failed
+
+
+RULE_CHECKS = {
+    "not_null": check_not_null,
+    "numeric": check_numeric,
+    "range": check_range
+}
+
+
+def evaluate_rules(df: pd.DataFrame, raw_columns: dict[str, pd.Series],
+                   rules: list[dict]) -> np.ndarray:
+    """Evaluates every rule as a vectorised mask and picks each row's first failing rule
+    in a single np.select pass; rows passing every rule get an empty reason
+    Each column's comparisons are made once and shared by all the rules on that column"""
+    if not rules or df.empty:
+        return np.full(len(df), "", dtype=object)
+    columns = {column: ColumnMasks(raw_columns[column], df[column])
+               for column in dict.fromkeys(rule["column"] for rule in rules)}
+    masks = [RULE_CHECKS[rule["kind"]](columns[rule["column"]], rule) for rule in rules]
+    return np.select(masks, [rule["code"] for rule in rules], default="").astype(object)
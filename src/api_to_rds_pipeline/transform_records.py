@@ -0,0 +1,195 @@
+"""Pandas-free counterpart of transform.py for small minute batches
+Cleaned columns are plain lists, so a run that loads them with load_records never imports
+pandas or numpy; the rules and column spec here are shared with the DataFrame path"""
+import csv
+import os
+import math
+import logging
+from datetime import datetime, timezone
+
+from src.utils import metrics
+
+QUARANTINE_DIR = os.environ.get("QUARANTINE_DIR", "/tmp/quarantine")
+
+# Rules a reading must pass to be kept, checked in order; the first rule a row fails
+# becomes its reject reason. Kinds:
+#   not_null - the raw value is missing
+#   numeric  - the raw value is present but does not convert to a number
+#   range    - the converted value is below "min" or above "max" (either may be omitted)
+VALIDATION_RULES = [
+    {"code": "temperature_missing", "column": "soil_temperature", "kind": "not_null"},
+    {"code": "temperature_not_numeric", "column": "soil_temperature", "kind": "numeric"},
+    {"code": "temperature_out_of_range", "column": "soil_temperature", "kind": "range",
+     "min": -10, "max": 60},
+    {"code": "moisture_missing", "column": "soil_moisture", "kind": "not_null"},
+    {"code": "moisture_not_numeric", "column": "soil_moisture", "kind": "numeric"},
+    {"code": "moisture_negative", "column": "soil_moisture", "kind": "range", "min": 0}
+]
+
+# Output column -> (path into the raw plant record, whether the record is skipped without it)
+# Declared in output column order
+COLUMN_SPEC = {
+    "plant_id": (("plant_id",), True),
+    "english_name": (("name",), False),
+    "soil_temperature": (("temperature",), True),
+    "latitude": (("origin_location", "latitude"), False),
+    "longitude": (("origin_location", "longitude"), False),
+    "city_name": (("origin_location", "city"), False),
+    "country_name": (("origin_location", "country"), False),
+    "botanist_name": (("botanist", "name"), False),
+    "botanist_email": (("botanist", "email"), False),
+    "botanist_phone": (("botanist", "phone"), False),
+    "last_watered": (("last_watered",), False),
+    "soil_moisture": (("soil_moisture",), True),
+    "reading_taken": (("recording_taken",), True),
+    "photo_link": (("images", "original_url"), False),
+    "scientific_name": (("scientific_name",), False)
+}
+
+TIMESTAMP_COLUMNS = ["last_watered", "reading_taken"]
+
+
+def is_missing(value) -> bool:
+    """Whether a value counts as null: None or a float NaN"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def to_number(value) -> float | int | None:
+    """Converts a raw reading to a number, or None if it does not convert"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return None if is_missing(value) else value
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        return None if math.isnan(number) else number
+    return None
+
+
+def to_timestamp(value) -> datetime | None:
+    """Parses an ISO 8601 timestamp, or None if it does not parse"""
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def failed_rule(raw: dict, values: dict, rules: list[dict]) -> str:
+    """The code of the first rule a row fails, or an empty string if it passes them all"""
+    for rule in rules:
+        column = rule["column"]
+        if rule["kind"] == "not_null":
+            failed = is_missing(raw[column])
+        elif rule["kind"] == "numeric":
+            failed = not is_missing(raw[column]) and values[column] is None
+        else:
+            value = values[column]
+            failed = value is not None and (value < rule.get("min", -math.inf)
+                                            or value > rule.get("max", math.inf))
+        if failed:
+            return rule["code"]
+    return ""
+
+
+class PlantRecordTransformer:
+    """Plain-list counterpart of PlantDataTransformer's columnar path
+    Has properties plant_data: raw input, columns: cleaned output column -> list of values,
+    and rejects: rejected rows as dicts of their raw values and reject_reason"""
+
+    def __init__(self, plant_data: list[dict], rules: list[dict] = None):
+        """Constructor for class"""
+        self.plant_data = plant_data
+        self.rules = VALIDATION_RULES if rules is None else rules
+        self.columns = {column: [] for column in COLUMN_SPEC}
+        self.rejects = []
+
+    def __len__(self) -> int:
+        return len(self.columns["plant_id"])
+
+    def create_columns(self) -> dict[str, list]:
+        """Builds one list per output column, skipping records missing a required field"""
+        required = [path[0] for path, is_required in COLUMN_SPEC.values() if is_required]
+        records = [plant for plant in self.plant_data
+                   if all(key in plant for key in required)]
+        if len(records) < len(self.plant_data):
+            logging.error("Skipped %s rows on missing fields",
+                          len(self.plant_data) - len(records))
+
+        columns = {}
+        for column, (path, _) in COLUMN_SPEC.items():
+            if len(path) > 1:
+                parents = (plant.get(path[0]) for plant in records)
+                columns[column] = [parent.get(path[1]) if isinstance(parent, dict) else None
+                                   for parent in parents]
+            else:
+                columns[column] = [plant.get(path[0]) for plant in records]
+        columns["scientific_name"] = [
+            name[0].replace("'", '"') if isinstance(name, list) and name else name
+            for name in columns["scientific_name"]
+        ]
+        self.columns = columns
+        return columns
+
+    def clean_columns(self):
+        """Parses timestamps and readings, then splits off rows failing a validation rule"""
+        for column in TIMESTAMP_COLUMNS:
+            self.columns[column] = [to_timestamp(value) for value in self.columns[column]]
+        raw_columns = {rule["column"]: self.columns[rule["column"]] for rule in self.rules}
+        for column in ["soil_temperature", "soil_moisture"]:
+            self.columns[column] = [to_number(value) for value in self.columns[column]]
+
+        kept = []
+        self.rejects = []
+        for i in range(len(self)):
+            values = {column: self.columns[column][i] for column in raw_columns}
+            raw = {column: raw_columns[column][i] for column in raw_columns}
+            reason = failed_rule(raw, values, self.rules)
+            if reason:
+                row = {column: column_values[i]
+                       for column, column_values in self.columns.items()}
+                self.rejects.append({**row, **raw, "reject_reason": reason})
+            else:
+                kept.append(i)
+        if len(kept) < len(self):
+            self.columns = {column: [column_values[i] for i in kept]
+                            for column, column_values in self.columns.items()}
+        logging.info("%s rows dropped", len(self.rejects))
+
+    def transform(self) -> dict[str, list]:
+        """Full transformation process; returns the cleaned columns"""
+        metrics.incr("transform_rows_in", len(self.plant_data))
+        self.create_columns()
+        self.clean_columns()
+        metrics.incr("transform_rows_out", len(self))
+        metrics.incr("transform_rows_rejected", len(self.rejects))
+        return self.columns
+
+    def write_rejects(self, directory: str = QUARANTINE_DIR, file_format: str = "csv") -> str:
+        """Writes this run's rejected rows and their reasons to a quarantine file
+        Returns the file path, or None when nothing was rejected"""
+        if not self.rejects:
+            logging.info("No rejected rows to quarantine")
+            return None
+        os.makedirs(directory, exist_ok=True)
+        run_time = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        path = os.path.join(directory, f"rejects_{run_time}.{file_format}")
+        fields = [*COLUMN_SPEC, "reject_reason"]
+        if file_format == "parquet":
+            import pyarrow as pa  # pylint: disable=import-outside-toplevel
+            import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+            pq.write_table(pa.table({field: [str(row[field]) for row in self.rejects]
+                                     for field in fields}), path)
+        else:
+            with open(path, "w", newline="", encoding="utf8") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(self.rejects)
+        logging.info("Quarantined %s rejected rows to %s", len(self.rejects), path)
+        return path
@@ -0,0 +1,52 @@
+"""Builds the Athena queries behind the summary page
+Every query is restricted to the year/month/day partitions of the selected date range
+and reads the summary table alone; plant names and countries are joined locally"""
+from datetime import date
+
+ATHENA_DATABASE = "c18_botanists_db"
+
+
+def date_key(day: date) -> int:
+    """Encodes a date as YYYYMMDD so a range becomes one integer comparison"""
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def partition_predicate(start: date, end: date, table: str = "summary") -> str:
+    """Returns a WHERE condition on the partition columns only, so Athena skips
+    every partition outside start..end (inclusive) without reading it"""
+    if start > end:
+        raise ValueError("Start date must not be after end date")
+    partition_key = (f"CAST({table}.year AS INTEGER) * 10000"
+                     f" + CAST({table}.month AS INTEGER) * 100"
+                     f" + CAST({table}.day AS INTEGER)")
+    return f"{partition_key} BETWEEN {date_key(start)} AND {date_key(end)}"
+
+
+def plant_means_query(start: date, end: date) -> str:
+    """Per-plant sums and counts of the daily means over the range
+    Sums and counts rather than means, so they can be regrouped by country exactly"""
+    return f"""SELECT summary.plant_id,
+    SUM(summary.mean_soil_moisture) AS moisture_sum,
+    COUNT(summary.mean_soil_moisture) AS moisture_count,
+    SUM(summary.mean_soil_temperature) AS temperature_sum,
+    COUNT(summary.mean_soil_temperature) AS temperature_count
+    FROM summary
+    WHERE {partition_predicate(start, end)}
+    GROUP BY summary.plant_id"""
+
+
+def plant_watering_query(start: date, end: date) -> str:
+    """Mean daily watering count per plant over the range"""
+    return f"""SELECT summary.plant_id,
+    AVG(summary.watering_count) AS watering_count
+    FROM summary
+    WHERE {partition_predicate(start, end)}
+    GROUP BY summary.plant_id"""
+
+
+def daily_means_query(start: date, end: date) -> str:
+    """One point per plant per day over the range, for the temperature/moisture scatter"""
+    return f"""SELECT summary.plant_id, summary.date,
+    summary.mean_soil_moisture, summary.mean_soil_temperature
+    FROM summary
+    WHERE {partition_predicate(start, end)}"""
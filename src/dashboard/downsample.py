@@ -0,0 +1,60 @@
+"""Reduces plant time series to a fixed number of points before charting
+Keeps the Altair payload the same size however long the selected window is"""
+import numpy as np
+import pandas as pd
+
+CHART_WIDTH = 700
+BUCKET_SIZES = ["1min", "5min", "1h"]
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-triangle-three-buckets: picks n_out point indices which keep the
+    visual shape of the series, including isolated spikes"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(area.argmax())
+        kept[i + 1] = previous
+    return kept
+
+
+def lttb(df: pd.DataFrame, time_col: str, value_col: str,
+         n_out: int = CHART_WIDTH) -> pd.DataFrame:
+    """Returns at most n_out rows of the series chosen by LTTB"""
+    series = df[[time_col, value_col]].dropna().sort_values(time_col)
+    x = series[time_col].to_numpy(dtype="datetime64[ns]").astype("int64").astype(float)
+    y = series[value_col].to_numpy(dtype=float)
+    return series.iloc[lttb_indices(x, y, n_out)].reset_index(drop=True)
+
+
+def choose_bucket(start: pd.Timestamp, end: pd.Timestamp,
+                  max_points: int = CHART_WIDTH) -> str:
+    """Returns the finest bucket size giving at most max_points buckets over the window"""
+    span = end - start
+    for bucket in BUCKET_SIZES:
+        if span / pd.Timedelta(bucket) <= max_points:
+            return bucket
+    return BUCKET_SIZES[-1]
+
+
+def bucket_min_mean_max(df: pd.DataFrame, time_col: str, value_col: str,
+                        bucket: str) -> pd.DataFrame:
+    """Aggregates the series into fixed time buckets with the min, mean and max of each
+    Empty buckets are dropped so gaps in readings are not filled in"""
+    series = df[[time_col, value_col]].dropna().set_index(time_col)[value_col]
+    buckets = series.resample(bucket).agg(["min", "mean", "max"]).dropna()
+    return buckets.rename_axis(time_col).reset_index()
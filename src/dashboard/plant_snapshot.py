@@ -0,0 +1,106 @@
+"""Local denormalised snapshot of the plant dimension for the dashboard
+Built from the metadata Parquet files the nightly pipeline writes to S3 and only
+re-downloaded when one of their ETags changes"""
+import io
+import os
+import json
+import logging
+
+import pandas as pd
+
+METADATA_BUCKET = "c18-botanists-s3-bucket"
+SNAPSHOT_DIR = os.environ.get("PLANT_SNAPSHOT_DIR", "/tmp/plant_snapshot")
+SNAPSHOT_TABLES = ["plant", "origin", "city", "country"]
+SNAPSHOT_COLUMNS = ["plant_id", "english_name", "scientific_name", "city_name", "country_name"]
+
+
+def metadata_key(table_name: str) -> str:
+    """Key of a metadata table as written by rds_to_s3_pipeline.load.upload_metadata"""
+    return f"input/{table_name}/{table_name}.parquet"
+
+
+def denormalise(tables: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Joins plant through origin, city and country into one row per plant"""
+    plants = tables["plant"].rename(columns={"id": "plant_id"})
+    origins = tables["origin"].rename(columns={"id": "origin_id"})
+    cities = tables["city"].rename(columns={"id": "city_id"})
+    countries = tables["country"].rename(columns={"id": "country_id"})
+    snapshot = (plants
+                .merge(origins[["origin_id", "city_id"]], on="origin_id", how="left")
+                .merge(cities[["city_id", "city_name", "country_id"]], on="city_id", how="left")
+                .merge(countries[["country_id", "country_name"]], on="country_id", how="left"))
+    return snapshot[SNAPSHOT_COLUMNS].reset_index(drop=True)
+
+
+class PlantSnapshot:
+    """Plant id -> names, city and country, kept in memory and on local disk
+    A refresh costs one HEAD per metadata object unless something has changed"""
+
+    def __init__(self, s3_client, bucket: str = METADATA_BUCKET,
+                 snapshot_dir: str = SNAPSHOT_DIR):
+        """Constructor for class"""
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.snapshot_dir = snapshot_dir
+        self.versions: dict[str, str] = {}
+        self.plants: pd.DataFrame | None = None
+        self.load_local()
+
+    @property
+    def manifest_path(self) -> str:
+        """Path of the JSON file recording the object versions the snapshot was built from"""
+        return os.path.join(self.snapshot_dir, "manifest.json")
+
+    @property
+    def plants_path(self) -> str:
+        """Path of the denormalised snapshot"""
+        return os.path.join(self.snapshot_dir, "plants.parquet")
+
+    def load_local(self):
+        """Loads a snapshot left on disk by an earlier process, if there is one"""
+        try:
+            with open(self.manifest_path, encoding="utf8") as f:
+                versions = json.load(f)
+            self.plants = pd.read_parquet(self.plants_path)
+            self.versions = versions
+            logging.info("Loaded plant snapshot of %s plants from disk", len(self.plants))
+        except (OSError, ValueError):
+            logging.info("No usable plant snapshot at %s", self.snapshot_dir)
+
+    def save_local(self):
+        """Writes the snapshot, then its manifest, so a manifest never points at a stale file"""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        tmp_plants = f"{self.plants_path}.tmp"
+        self.plants.to_parquet(tmp_plants, index=False)
+        os.replace(tmp_plants, self.plants_path)
+        tmp_manifest = f"{self.manifest_path}.tmp"
+        with open(tmp_manifest, "w", encoding="utf8") as f:
+            json.dump(self.versions, f)
+        os.replace(tmp_manifest, self.manifest_path)
+
+    def remote_versions(self) -> dict[str, str]:
+        """Returns the ETag (or last-modified time) of every metadata object"""
+        versions = {}
+        for table in SNAPSHOT_TABLES:
+            head = self.s3_client.head_object(Bucket=self.bucket, Key=metadata_key(table))
+            versions[table] = head.get("ETag") or str(head["LastModified"])
+        return versions
+
+    def read_table(self, table_name: str) -> pd.DataFrame:
+        """Downloads one metadata table"""
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=metadata_key(table_name))
+        return pd.read_parquet(io.BytesIO(response["Body"].read()))
+
+    def refresh(self) -> bool:
+        """Rebuilds the snapshot if any metadata object has changed
+        Returns True if it was rebuilt"""
+        versions = self.remote_versions()
+        if self.plants is not None and versions == self.versions:
+            logging.info("Plant snapshot is current")
+            return False
+        tables = {table: self.read_table(table) for table in SNAPSHOT_TABLES}
+        self.plants = denormalise(tables)
+        self.versions = versions
+        self.save_local()
+        logging.info("Rebuilt plant snapshot with %s plants", len(self.plants))
+        return True
@@ -1,12 +1,16 @@
 """creates streamlit dashboard"""
 import awswrangler as wr
+import boto3
 import pandas as pd
 import altair as alt
 import streamlit as st
-import pymssql
-import os
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+from src.utils.db_pool import get_pool
+from src.dashboard.athena_queries import (ATHENA_DATABASE, plant_means_query,
+                                          plant_watering_query, daily_means_query)
+from src.dashboard.plant_snapshot import PlantSnapshot
+from src.dashboard.downsample import CHART_WIDTH, lttb, choose_bucket, bucket_min_mean_max
 
 
 def create_title(title_str: str) -> None:
@@ -14,43 +18,47 @@ def create_title(title_str: str) -> None:
     st.title(title_str)
 
 
-@st.cache_data
-def load_from_athena() -> pd.DataFrame:
-    """Loads all data from the Athena"""
-    return wr.athena.read_sql_query("SELECT plant_id, mean_soil_moisture, mean_soil_temperature, date, watering_count,"
-                                    "most_recent, english_name, country_name FROM summary INNER JOIN plant"
-                                    " ON summary.plant_id = plant.id"
-                                    " INNER JOIN origin ON plant.origin_id = origin.id"
-                                    " INNER JOIN city on origin.city_id= city.id"
-                                    " INNER JOIN country on city.country_id=country.id;", database="c18_botanists_db")
+@st.cache_data(ttl=3600)
+def load_from_athena(query: str) -> pd.DataFrame:
+    """Runs a query on Athena; results are cached per query"""
+    return wr.athena.read_sql_query(query, database=ATHENA_DATABASE)
+
+
+@st.cache_resource
+def plant_snapshot() -> PlantSnapshot:
+    """one plant dimension snapshot shared by every session"""
+    return PlantSnapshot(boto3.client("s3"))
+
+
+@st.cache_data(ttl=300)
+def load_plant_dimension() -> pd.DataFrame:
+    """plant id -> names, city and country, re-checked against S3 every few minutes"""
+    snapshot = plant_snapshot()
+    snapshot.refresh()
+    return snapshot.plants
+
+
+def select_date_range() -> tuple[date, date]:
+    """sidebar picker for the summary date range, defaulting to the last 30 days"""
+    yesterday = date.today() - timedelta(days=1)
+    selected = st.sidebar.date_input(
+        'Date range', (yesterday - timedelta(days=29), yesterday), max_value=yesterday)
+    if len(selected) == 2:
+        return selected
+    return selected[0], selected[0]
 
 
 def get_connection():
-    """get rds connection"""
-    load_dotenv()
-    conn = pymssql.connect(
-        os.environ["DB_HOST"],
-        os.environ["DB_USER"],
-        os.environ["DB_PASSWORD"],
-        os.environ["DB_NAME"]
-    )
-    return conn
+    """get rds connection from the shared pool; closing it returns it to the pool"""
+    return get_pool().acquire()
 
 
-@st.cache_data(ttl=120)
-def load_from_rds() -> pd.DataFrame:
-    """load data from rds"""
+def run_rds_query(query: str, params: tuple = None) -> pd.DataFrame:
+    """runs a parameterised query on the rds and returns the rows as a dataframe"""
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        query = """
-            SELECT reading.id, reading.reading_taken, reading.last_watered,
-            reading.soil_moisture, reading.soil_temperature, reading.plant_id,
-            reading.botanist_id, plant.english_name, plant.scientific_name,
-            botanist.botanist_name, botanist.botanist_email
-            FROM reading JOIN plant on reading.plant_id = plant.id LEFT JOIN botanist
-            ON reading.botanist_id = botanist.id"""
-        cursor.execute(query)
+        cursor.execute(query, params)
         rows = cursor.fetchall()
         columns = [desc[0] for desc in cursor.description]
         df = pd.DataFrame(rows, columns=columns)
@@ -60,37 +68,89 @@ def load_from_rds() -> pd.DataFrame:
     return df
 
 
+def minute_floor(timestamp: datetime) -> datetime:
+    """rounds a time down to the minute so cached queries are reused within the minute"""
+    return timestamp.replace(second=0, microsecond=0)
+
+
+@st.cache_data(ttl=600)
+def load_plants() -> pd.DataFrame:
+    """loads the id and name of every plant with readings"""
+    return run_rds_query("""
+            SELECT plant.id AS plant_id, plant.english_name
+            FROM plant WHERE EXISTS (SELECT 1 FROM reading WHERE reading.plant_id = plant.id)
+            ORDER BY plant.id""")
+
+
+@st.cache_data(ttl=120)
+def load_plant_readings(plant_id: int, since: datetime) -> pd.DataFrame:
+    """loads one plant's readings taken since the given time"""
+    return run_rds_query("""
+            SELECT reading_taken, last_watered, soil_moisture, soil_temperature
+            FROM reading
+            WHERE plant_id = %s AND reading_taken >= %s
+            ORDER BY reading_taken""", (plant_id, since))
+
+
+@st.cache_data(ttl=120)
+def load_latest_readings(max_moisture: float) -> pd.DataFrame:
+    """loads each plant's latest reading, keeping plants below the given moisture"""
+    return run_rds_query("""
+            SELECT latest.plant_id, plant.english_name, latest.reading_taken,
+            botanist.botanist_name, latest.soil_moisture, latest.last_watered
+            FROM (
+                SELECT plant_id, reading_taken, soil_moisture, last_watered, botanist_id,
+                ROW_NUMBER() OVER (PARTITION BY plant_id ORDER BY reading_taken DESC) AS row_num
+                FROM reading
+            ) AS latest
+            JOIN plant ON latest.plant_id = plant.id
+            LEFT JOIN botanist ON latest.botanist_id = botanist.id
+            WHERE latest.row_num = 1 AND latest.soil_moisture < %s
+            ORDER BY latest.plant_id""", (max_moisture,))
+
+
+@st.cache_data(ttl=120)
+def load_overdue_plants(cutoff: datetime) -> pd.DataFrame:
+    """loads plants whose most recent watering is before the cutoff"""
+    return run_rds_query("""
+            SELECT latest.plant_id, plant.english_name, latest.last_watered,
+            botanist.botanist_name, botanist.botanist_email
+            FROM (
+                SELECT plant_id, last_watered, botanist_id,
+                ROW_NUMBER() OVER (PARTITION BY plant_id ORDER BY last_watered DESC) AS row_num
+                FROM reading
+            ) AS latest
+            JOIN plant ON latest.plant_id = plant.id
+            LEFT JOIN botanist ON latest.botanist_id = botanist.id
+            WHERE latest.row_num = 1 AND latest.last_watered < %s
+            ORDER BY latest.plant_id""", (cutoff,))
+
+
 def live_temp_moisture():
     """line graph for temp/moisture over time"""
     st.write("### Plants moisture/temp over time")
-    df = load_from_rds()
-
-    df['id_name'] = df['plant_id'].astype(str) + '-' + df['english_name']
-
-    df['last_watered'] = pd.to_datetime(df['last_watered'], errors='coerce')
-    df['reading_taken'] = pd.to_datetime(df['reading_taken'], errors='coerce')
+    plants = load_plants()
 
-    plant_ids = df['id_name'].unique()
+    plant_ids = (plants['plant_id'].astype(str) + '-' + plants['english_name']).tolist()
     plant = st.sidebar.selectbox('Select plant', plant_ids)
     selected = int(plant.split('-')[0])
+    hours = st.sidebar.slider('Hours to show', min_value=1, max_value=24, value=24)
 
     metric = st.radio('Temp or Moisture', [
                       'soil_moisture', 'soil_temperature'])
+    reduction = st.radio('Downsampling', ['Shape (LTTB)', 'Min/mean/max buckets'])
 
-    filtered = df[df['plant_id'] == selected]
-    filtered = filtered.sort_values('reading_taken')
+    since = minute_floor(datetime.now() - timedelta(hours=hours))
+    filtered = load_plant_readings(selected, since).copy()
 
+    filtered['last_watered'] = pd.to_datetime(filtered['last_watered'], errors='coerce')
+    filtered['reading_taken'] = pd.to_datetime(filtered['reading_taken'], errors='coerce')
     filtered[metric] = pd.to_numeric(filtered[metric], errors='coerce')
 
-    filtered['diff'] = filtered[metric].diff()
-
-    filtered = filtered[filtered['diff'].isna() | (
-        filtered['diff'].abs() < 10)]
     earliest_reading = filtered['reading_taken'].min()
 
     watered_series = (
-        df[(df['plant_id'] == selected) & (df['last_watered'] > earliest_reading)]
-        ['last_watered']
+        filtered[filtered['last_watered'] > earliest_reading]['last_watered']
         .drop_duplicates()
         .dropna()
         .reset_index(drop=True)
@@ -98,10 +158,20 @@ def live_temp_moisture():
 
     watered_events = pd.DataFrame({'last_watered': watered_series})
 
-    chart = alt.Chart(filtered).mark_line().encode(
-        x='reading_taken:T',
-        y=f"{metric}:Q",
-    ).properties(width=700, height=400)
+    if reduction == 'Shape (LTTB)':
+        points = lttb(filtered, 'reading_taken', metric)
+        chart = alt.Chart(points).mark_line().encode(
+            x='reading_taken:T',
+            y=f"{metric}:Q",
+        )
+    else:
+        bucket = choose_bucket(since, datetime.now())
+        points = bucket_min_mean_max(filtered, 'reading_taken', metric, bucket)
+        base = alt.Chart(points).encode(x='reading_taken:T')
+        band = base.mark_area(opacity=0.3).encode(
+            y=alt.Y('min:Q', title=metric), y2='max:Q')
+        chart = band + base.mark_line().encode(y='mean:Q')
+    chart = chart.properties(width=CHART_WIDTH, height=400)
 
     watered = alt.Chart(watered_events).mark_rule(color='red', size=2).encode(
         x='last_watered:T'
@@ -114,10 +184,7 @@ def live_temp_moisture():
 def dry_plant():
     """finds sub 40% moisture plants"""
     st.write("### Plants with sub 40% moisture")
-    df = load_from_rds()
-    latest = df.sort_values('reading_taken').groupby(
-        'plant_id', as_index=False).last()
-    dry = latest[latest['soil_moisture'] < 40]
+    dry = load_latest_readings(40)
     botanists = dry['botanist_name'].dropna().unique()
     selected_botanist = st.selectbox(
         'select botanist', ['All']+list(botanists))
@@ -125,20 +192,14 @@ def dry_plant():
         dry = dry[dry['botanist_name'] == selected_botanist]
 
     st.dataframe(
-        dry[['english_name', 'plant_id', 'reading_taken', 'botanist_name', 'soil_moisture', 'last_watered']])
+        dry[['english_name', 'plant_id', 'reading_taken', 'botanist_name', 'soil_moisture',
+             'last_watered']])
 
 
 def filter_unwatered_plants():
     """Finds unwatered plants"""
-    df = load_from_rds()
     st.write("### Plants Not Watered in the Last 24 Hours")
-    df['last_watered'] = pd.to_datetime(df['last_watered'], errors='coerce')
-
-    latest_watered = df.sort_values('last_watered').groupby(
-        'plant_id', as_index=False).last()
-
-    cutoff = datetime.now() - timedelta(days=1)
-    overdue = latest_watered[latest_watered['last_watered'] < cutoff]
+    overdue = load_overdue_plants(minute_floor(datetime.now() - timedelta(days=1)))
     botanists = overdue['botanist_name'].dropna().unique()
     selected_botanist = st.selectbox(
         'select botanist:', ['All']+list(botanists))
@@ -149,39 +210,44 @@ def filter_unwatered_plants():
         overdue[['english_name', 'plant_id', 'last_watered', 'botanist_name', 'botanist_email']])
 
 
-def summary_country_data():
+def summary_country_data(start: date, end: date):
     """finds summary data by country"""
-    df = load_from_athena()
+    sums = load_from_athena(plant_means_query(start, end)).merge(
+        load_plant_dimension(), on='plant_id', how='left')
+    df = sums.groupby('country_name')[['moisture_sum', 'moisture_count',
+                                       'temperature_sum', 'temperature_count']].sum()
+    df['mean_soil_moisture'] = df['moisture_sum'] / df['moisture_count']
+    df['mean_soil_temperature'] = df['temperature_sum'] / df['temperature_count']
+    df = df.reset_index()
     st.write("### temp/moisture by country")
     metric = st.radio('Temp or Moisture', [
                       'mean_soil_moisture', 'mean_soil_temperature'])
-    mean_val = df.groupby('country_name')[metric].mean().reset_index()
-    chart = alt.Chart(mean_val).mark_bar().encode(
+    chart = alt.Chart(df).mark_bar().encode(
         x=alt.X('country_name:N', sort='-y', title='country of origin'),
         y=alt.Y(f"{metric}:Q")
     ).properties(width=600, height=400)
     st.altair_chart(chart)
 
 
-def summary_watering():
+def summary_watering(start: date, end: date):
     """finds which plants get watered the most"""
-    df = load_from_athena()
+    df = load_from_athena(plant_watering_query(start, end)).merge(
+        load_plant_dimension(), on='plant_id', how='left')
     st.write("### plants that are most watered")
     df['plant_label'] = df['plant_id'].astype(str) + '-' + df['english_name']
-    mean_water_count = df.groupby('plant_label')[
-        'watering_count'].mean().reset_index()
-    chart = alt.Chart(mean_water_count).mark_bar().encode(
+    chart = alt.Chart(df).mark_bar().encode(
         x=alt.X('plant_label:N', sort='-y', title='country of origin'),
         y=alt.Y("watering_count:Q", title='mean number of watering times a day')
     ).properties(width=600, height=400)
     st.altair_chart(chart)
 
 
-def temp_moisture_scatter():
+def temp_moisture_scatter(start: date, end: date):
     """scatter plot of temp vs moisture"""
     st.write("### Temperature vs moisture scatter plot")
 
-    df = load_from_athena()
+    df = load_from_athena(daily_means_query(start, end)).merge(
+        load_plant_dimension(), on='plant_id', how='left')
     df["date"] = pd.to_datetime(df["date"])
     # Scatter plot: Temperature vs Moisture
     chart = alt.Chart(df).mark_circle(size=80).encode(
@@ -214,9 +280,10 @@ def summary_page():
     """create summary page"""
     create_title("Summary data")
     st.write("Historical data")
-    summary_country_data()
-    summary_watering()
-    temp_moisture_scatter()
+    start, end = select_date_range()
+    summary_country_data(start, end)
+    summary_watering(start, end)
+    temp_moisture_scatter(start, end)
 
 
 def home():
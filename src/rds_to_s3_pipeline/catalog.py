@@ -0,0 +1,69 @@
+'''Registers newly written year/month/day partitions directly in the Glue catalog
+Saves starting a crawler, which is then only needed when a table or its schema changes'''
+import logging
+from datetime import date
+
+PARTITION_KEYS = ["year", "month", "day"]
+PARTITION_BATCH_SIZE = 100
+
+
+def partition_values(day: date) -> list[str]:
+    '''Partition values of a day, unpadded as awswrangler writes them'''
+    return [str(day.year), str(day.month), str(day.day)]
+
+
+def partition_input(table: dict, day: date) -> dict:
+    '''Builds a PartitionInput reusing the table's storage format, located under the table'''
+    descriptor = dict(table["StorageDescriptor"])
+    location = descriptor["Location"].rstrip("/")
+    suffix = "/".join(f"{key}={value}"
+                      for key, value in zip(PARTITION_KEYS, partition_values(day)))
+    descriptor["Location"] = f"{location}/{suffix}/"
+    return {"Values": partition_values(day), "StorageDescriptor": descriptor}
+
+
+def get_table(glue_client, database: str, table_name: str) -> dict | None:
+    '''Returns a table definition, or None if the catalog does not have the table yet'''
+    try:
+        return glue_client.get_table(DatabaseName=database, Name=table_name)["Table"]
+    except glue_client.exceptions.EntityNotFoundException:
+        return None
+
+
+def schema_matches(table: dict, columns: list[str]) -> bool:
+    '''Checks every written column is already in the table definition'''
+    known = {column["Name"] for column in table["StorageDescriptor"]["Columns"]}
+    known.update(key["Name"] for key in table.get("PartitionKeys", []))
+    return set(columns) <= known
+
+
+def register_partitions(glue_client, database: str, table: dict, days: list[date]) -> int:
+    '''Adds a partition for every day, ignoring ones which already exist
+    Returns the number of partitions created'''
+    created = 0
+    days = sorted(set(days))
+    for start in range(0, len(days), PARTITION_BATCH_SIZE):
+        batch = days[start:start + PARTITION_BATCH_SIZE]
+        response = glue_client.batch_create_partition(
+            DatabaseName=database, TableName=table["Name"],
+            PartitionInputList=[partition_input(table, day) for day in batch])
+        errors = response.get("Errors", [])
+        failed = [error for error in errors
+                  if error["ErrorDetail"]["ErrorCode"] != "AlreadyExistsException"]
+        if failed:
+            raise RuntimeError(f"Failed to register partitions of {table['Name']}: {failed}")
+        created += len(batch) - len(errors)
+    logging.info("Registered %s new partitions of %s", created, table["Name"])
+    return created
+
+
+def catalogue_table(glue_client, database: str, table_name: str, days: list[date],
+                    columns: list[str]) -> bool:
+    '''Registers the written partitions of a table directly when the catalog knows its schema
+    Returns False if a crawl is needed instead, because the table is new or has new columns'''
+    table = get_table(glue_client, database, table_name)
+    if table is None or not schema_matches(table, columns):
+        logging.info("Table %s is new or has new columns; a crawl is needed", table_name)
+        return False
+    register_partitions(glue_client, database, table, days)
+    return True
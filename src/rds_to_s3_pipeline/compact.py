@@ -0,0 +1,168 @@
+'''Compacts day partitions of the reading archive into a few large sorted Parquet files
+Works against any pyarrow filesystem, so the same code runs on S3 and on local disk'''
+import os
+import heapq
+import logging
+import tempfile
+import uuid
+from collections.abc import Iterator
+from datetime import date
+from itertools import islice
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+READING_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("reading_taken", pa.timestamp("ms")),
+    ("last_watered", pa.timestamp("ms")),
+    ("soil_moisture", pa.float64()),
+    ("soil_temperature", pa.float64()),
+    ("plant_id", pa.int64()),
+    ("botanist_id", pa.int64()),
+])
+SORT_KEYS = [("plant_id", "ascending"), ("reading_taken", "ascending")]
+COMPRESSION = "zstd"
+ROW_GROUP_SIZE = 64_000
+TARGET_FILE_ROWS = 2_000_000
+COMPACTED_PREFIX = "compacted-"
+MERGE_BATCH_ROWS = 10_000
+SPILL_DIR = os.environ.get("COMPACT_SPILL_DIR")
+MERGE_KEY_INDEXES = [READING_SCHEMA.get_field_index(name)
+                     for name, _ in SORT_KEYS] + [READING_SCHEMA.get_field_index("id")]
+
+
+def partition_path(root: str, day: date) -> str:
+    '''Path of one day partition, named the way awswrangler writes them'''
+    return f"{root}/year={day.year}/month={day.month}/day={day.day}"
+
+
+def list_parquet_files(filesystem: fs.FileSystem, path: str) -> list[str]:
+    '''Returns the Parquet files directly inside a partition, or none if it does not exist'''
+    selector = fs.FileSelector(path, allow_not_found=True)
+    return sorted(info.path for info in filesystem.get_file_info(selector)
+                  if info.type == fs.FileType.File and info.path.endswith(".parquet"))
+
+
+def sorted_run(filesystem: fs.FileSystem, path: str, run_path: str,
+               batch_rows: int = MERGE_BATCH_ROWS) -> int:
+    '''Reads one input file onto READING_SCHEMA, drops duplicate ids within it, sorts it
+    and writes it to run_path on local disk; returns its row count
+    Only this one file is in memory, and input files are as large as an upload chunk
+    Row groups of batch_rows let the merge decode the run one batch at a time'''
+    table = pq.read_table(path, filesystem=filesystem,
+                          columns=READING_SCHEMA.names).cast(READING_SCHEMA, safe=False)
+    last_of_id = (table.append_column("row", pa.array(np.arange(len(table))))
+                  .group_by("id", use_threads=False).aggregate([("row", "max")]))
+    table = table.take(last_of_id["row_max"]).sort_by(SORT_KEYS + [("id", "ascending")])
+    pq.write_table(table, run_path, row_group_size=batch_rows)
+    return len(table)
+
+
+def run_rows(run_path: str, batch_rows: int) -> Iterator[tuple]:
+    '''Yields the rows of a sorted run, holding one batch of it in memory at a time'''
+    # without pre-buffering, only the row group being decoded is read into memory
+    run = pq.ParquetFile(run_path, pre_buffer=False)
+    for batch in run.iter_batches(batch_size=batch_rows, use_threads=False):
+        columns = batch.to_pydict()
+        yield from zip(*(columns[name] for name in READING_SCHEMA.names))
+
+
+def merge_key(row: tuple) -> tuple:
+    '''Orders rows like SORT_KEYS then id, with nulls last as in Table.sort_by'''
+    return tuple((row[i] is None, row[i]) for i in MERGE_KEY_INDEXES)
+
+
+def merge_runs(run_paths: list[str], batch_rows: int) -> Iterator[tuple]:
+    '''K-way merges sorted runs into one sorted stream, keeping the last copy of each id
+    Copies of a reading share its sort key, so they meet side by side, and heapq.merge
+    yields equal keys in run order, so the copy from the latest file comes last'''
+    previous = None
+    for row in heapq.merge(*(run_rows(path, batch_rows) for path in run_paths), key=merge_key):
+        if previous is not None and previous[0] != row[0]:
+            yield previous
+        previous = row
+    if previous is not None:
+        yield previous
+
+
+def rows_to_table(rows: list[tuple]) -> pa.Table:
+    '''Builds a READING_SCHEMA table from row tuples'''
+    columns = list(zip(*rows)) if rows else [[] for _ in READING_SCHEMA]
+    return pa.Table.from_arrays([pa.array(column, type=field.type)
+                                 for column, field in zip(columns, READING_SCHEMA)],
+                                schema=READING_SCHEMA)
+
+
+def row_groups(rows: Iterator[tuple], size: int) -> Iterator[list[tuple]]:
+    '''Splits a row stream into lists of at most size rows'''
+    rows = iter(rows)
+    while group := list(islice(rows, size)):
+        yield group
+
+
+def write_sorted(filesystem: fs.FileSystem, path: str, rows: Iterator[tuple],
+                 target_rows: int = TARGET_FILE_ROWS,
+                 row_group_size: int = ROW_GROUP_SIZE) -> tuple[list[str], int]:
+    '''Writes sorted rows into files of at most target_rows rows, one row group at a time
+    Sorted row groups give tight per-plant min/max statistics for Athena to skip on
+    Returns the files written and the number of rows'''
+    batch_id = uuid.uuid4().hex
+    written = []
+    writer = None
+    file_rows = n_rows = 0
+    for group in row_groups(rows, min(row_group_size, target_rows)):
+        if writer is None or file_rows + len(group) > target_rows:
+            if writer is not None:
+                writer.close()
+            written.append(f"{path}/{COMPACTED_PREFIX}{batch_id}-{len(written)}.parquet")
+            writer = pq.ParquetWriter(written[-1], READING_SCHEMA, filesystem=filesystem,
+                                      compression=COMPRESSION, write_statistics=True)
+            file_rows = 0
+        writer.write_table(rows_to_table(group), row_group_size=row_group_size)
+        file_rows += len(group)
+        n_rows += len(group)
+    if writer is None:
+        # an empty partition still gets one file, so its originals can be deleted
+        written.append(f"{path}/{COMPACTED_PREFIX}{batch_id}-0.parquet")
+        pq.write_table(rows_to_table([]), written[-1], filesystem=filesystem,
+                       compression=COMPRESSION)
+    else:
+        writer.close()
+    return written, n_rows
+
+
+def compact_partition(filesystem: fs.FileSystem, path: str,
+                      target_rows: int = TARGET_FILE_ROWS,
+                      row_group_size: int = ROW_GROUP_SIZE,
+                      batch_rows: int = MERGE_BATCH_ROWS) -> list[str]:
+    '''Rewrites one partition into compacted files, then deletes the originals
+    Each file is sorted on its own and spilled to local disk, then the runs are merged, so
+    memory peaks at the largest input file, or at one batch_rows batch per input file plus
+    a row group while merging, however large the day is
+    A partition holding only compacted files is left alone
+    Returns the files the partition holds afterwards'''
+    files = list_parquet_files(filesystem, path)
+    if all(file.rsplit("/", 1)[-1].startswith(COMPACTED_PREFIX) for file in files):
+        logging.info("Partition %s needs no compaction", path)
+        return files
+
+    with tempfile.TemporaryDirectory(dir=SPILL_DIR) as spill_dir:
+        run_paths = [os.path.join(spill_dir, f"run-{n}.parquet") for n in range(len(files))]
+        for file, run_path in zip(files, run_paths):
+            sorted_run(filesystem, file, run_path, batch_rows)
+        written, n_rows = write_sorted(filesystem, path, merge_runs(run_paths, batch_rows),
+                                       target_rows, row_group_size)
+    # new files are written before the old ones go, so a failure never loses readings
+    for old_file in files:
+        filesystem.delete_file(old_file)
+    logging.info("Compacted %s files into %s in %s (%s rows)",
+                 len(files), len(written), path, n_rows)
+    return written
+
+
+def compact_days(filesystem: fs.FileSystem, root: str, days: list[date]) -> dict[date, list[str]]:
+    '''Compacts the partition of every given day under root'''
+    return {day: compact_partition(filesystem, partition_path(root, day)) for day in days}
@@ -1,11 +1,34 @@
 """Extracts all metadata from """
-import os
 import logging
+from collections.abc import Iterator
 import pandas as pd
-from dotenv import load_dotenv
 
+from src.utils import metrics
 from src.utils.utils import get_conn
 
+READING_BATCH_SIZE = 50_000
+
+YESTERDAY_READINGS_QUERY = """
+    SELECT * FROM reading
+    WHERE reading_taken >= CAST(DATEADD(DAY, -1, CAST(GETDATE() AS DATE)) AS DATETIME)
+    AND reading_taken < CAST(GETDATE() AS DATE)
+    """
+
+YESTERDAY_STATS_QUERY = """
+    SELECT * FROM plant_daily_stats
+    WHERE stats_date = CAST(DATEADD(DAY, -1, CAST(GETDATE() AS DATE)) AS DATE);
+    """
+
+# Fixed dtypes keep every streamed chunk on the same schema, even when a chunk is all nulls
+READING_DTYPES = {
+    "id": "int64",
+    "soil_moisture": "float64",
+    "soil_temperature": "float64",
+    "plant_id": "Int64",
+    "botanist_id": "Int64"
+}
+READING_TIMESTAMPS = ["reading_taken", "last_watered"]
+
 
 class RDSDataGetter:
     """gets data from RDS"""
@@ -13,30 +36,39 @@ class RDSDataGetter:
                        'city', 'origin', 'photo', 'plant']
 
     def __init__(self):
-        load_dotenv()
-        self.conn = pymssql.connect(
-            os.environ["DB_HOST"],
-            os.environ["DB_USER"],
-            os.environ["DB_PASSWORD"],
-            os.environ["DB_NAME"]
-        )
+        self.conn = get_conn()
 
         logging.info("Connected to RDS")
 
-    def get_metadata(self) -> dict[str, pd.DataFrame]:
-        """gets all metadata tables"""
+    def probe_metadata(self) -> dict[str, tuple[int, int]]:
+        """gets the row count and max id of every metadata table in one query"""
+        query = " UNION ALL ".join(
+            f"SELECT '{table}', COUNT(*), COALESCE(MAX(id), 0) FROM {table}"
+            for table in self.METADATA_TABLES
+        )
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"{query};")
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def get_metadata(self, tables: list[str] = None) -> dict[str, pd.DataFrame]:
+        """gets the given metadata tables, or all of them"""
         conn = self.conn
         cursor = conn.cursor()
         df_dict = {}
         try:
-            for table in self.METADATA_TABLES:
-                logging.info(f"Querying {table} table")
+            for table in self.METADATA_TABLES if tables is None else tables:
+                logging.info("Querying %s table", table)
                 query = f"SELECT * FROM {table};"
                 cursor.execute(query)
                 rows = cursor.fetchall()
                 columns = [desc[0] for desc in cursor.description]
                 df = pd.DataFrame(rows, columns=columns)
                 df_dict[table] = df
+                metrics.incr("metadata_rows_extracted", len(df))
         finally:
             cursor.close()
             logging.info("Cursor closed")
@@ -48,7 +80,7 @@ class RDSDataGetter:
         cursor = conn.cursor()
         df_dict = {}
         try:
-            logging.info(f"Querying readings table")
+            logging.info("Querying readings table")
             query = """
             SELECT * FROM reading
             WHERE reading_taken >= CAST(DATEADD(DAY, -1, CAST(GETDATE() AS DATE)) AS DATETIME)
@@ -66,6 +98,44 @@ class RDSDataGetter:
             logging.info("Connection closed")
         return df_dict
 
+    def get_daily_stats(self) -> pd.DataFrame:
+        """gets yesterday's rolling per-plant aggregates, one row per plant"""
+        cursor = self.conn.cursor()
+        try:
+            logging.info("Querying plant_daily_stats table")
+            cursor.execute(YESTERDAY_STATS_QUERY)
+            rows = cursor.fetchall()
+            columns = [desc[0] for desc in cursor.description]
+            df = pd.DataFrame(rows, columns=columns)
+        finally:
+            cursor.close()
+            logging.info("Cursor closed")
+        return df
+
+    def iter_readings(self, batch_size: int = READING_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """Streams yesterday's readings as typed dataframes of at most batch_size rows,
+        so peak memory does not grow with the day; closes the connection once exhausted"""
+        conn = self.conn
+        cursor = conn.cursor()
+        try:
+            logging.info("Streaming readings table in batches of %s", batch_size)
+            cursor.execute(f"{YESTERDAY_READINGS_QUERY} ORDER BY id;")
+            columns = [desc[0] for desc in cursor.description]
+            n_rows = 0
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                n_rows += len(rows)
+                metrics.incr("readings_extracted", len(rows))
+                logging.info("Fetched %s readings so far", n_rows)
+                yield rows_to_frame(rows, columns)
+        finally:
+            cursor.close()
+            logging.info("Cursor closed")
+            conn.close()
+            logging.info("Connection closed")
+
     def get_all_data(self) -> dict[str, pd.DataFrame]:
         """gets all data """
         meta = self.get_metadata()
@@ -75,6 +145,20 @@ class RDSDataGetter:
         return meta
 
 
+def rows_to_frame(rows: list[tuple], columns: list[str]) -> pd.DataFrame:
+    """Builds a reading dataframe column by column with fixed dtypes"""
+    buffers = dict(zip(columns, zip(*rows)))
+    data = {}
+    for column in columns:
+        if column in READING_TIMESTAMPS:
+            data[column] = pd.to_datetime(pd.Series(buffers[column], dtype=object))
+        elif column in READING_DTYPES:
+            data[column] = pd.array(buffers[column], dtype=READING_DTYPES[column])
+        else:
+            data[column] = list(buffers[column])
+    return pd.DataFrame(data, columns=columns)
+
+
 if __name__ == "__main__":
     get = RDSDataGetter()
     TAB = get.get_all_data()
@@ -1,18 +1,30 @@
 '''Receiving dictionary with keys containing table names, 
 and values containing dataframes of the tables' data'''
-import os
-from datetime import datetime
+from collections.abc import Iterator
+from functools import partial
 import time
 import logging
+import threading
 import pandas as pd
 import boto3
 import awswrangler as wr
-import pymssql
+
+from pyarrow import fs
+
+from src.utils import metrics
+from src.utils.utils import get_conn
+from src.rds_to_s3_pipeline.compact import compact_days
+from src.rds_to_s3_pipeline.catalog import catalogue_table
+from src.rds_to_s3_pipeline.watermark import Watermark, WATERMARK_KEY, purge_readings
+from src.rds_to_s3_pipeline.uploads import UploadBatch, run_uploads
+from src.rds_to_s3_pipeline.manifest import (MetadataManifest, MANIFEST_KEY,
+                                             table_hash, table_probe)
 
 BUCKET = "c18-botanists-s3-bucket"
 METADATA_TABLE_NAMES = ['plant', 'botanist', 'photo',
                         'origin', 'city', 'country']
 DATABASE = "c18_botanists_db"
+CRAWLER_NAME = "c18-botanists-crawler"
 
 
 class DataLoader:
@@ -29,45 +41,153 @@ class DataLoader:
         if creds is None:
             raise RuntimeError("Error: AWS credentials not found.")
 
-        self.conn = pymssql.connect(
-            os.environ["DB_HOST"],
-            os.environ["DB_USER"],
-            os.environ["DB_PASSWORD"],
-            os.environ["DB_NAME"]
-        )
-
-    def upload_metadata(self, table_name: str, df: pd.DataFrame):
+        self.reading_days = set()
+        self.summary_days = set()
+        self.written_columns = {}
+        self.written_paths = []
+        self.watermark = Watermark()
+        self.thread_sessions = threading.local()
+        self.manifest = self.load_manifest()
+        # acquired last so nothing above can fail while holding it
+        self.conn = get_conn()
+
+    def thread_session(self) -> boto3.Session:
+        '''boto3 sessions are not thread-safe, so each upload thread gets its own'''
+        if threading.current_thread() is threading.main_thread():
+            return self.session
+        if not hasattr(self.thread_sessions, 'session'):
+            self.thread_sessions.session = boto3.Session()
+        return self.thread_sessions.session
+
+    def load_manifest(self) -> MetadataManifest:
+        '''Reads the metadata manifest from S3, starting empty if there is none yet'''
+        s3 = self.session.client("s3")
+        try:
+            body = s3.get_object(Bucket=self.bucket, Key=MANIFEST_KEY)["Body"].read()
+        except s3.exceptions.NoSuchKey:
+            logging.info("No metadata manifest yet; every table will be uploaded")
+            return MetadataManifest()
+        return MetadataManifest.from_json(body.decode())
+
+    def save_manifest(self):
+        '''Writes the metadata manifest back to S3'''
+        body = self.manifest.to_json().encode()
+        self.session.client("s3").put_object(
+            Bucket=self.bucket, Key=MANIFEST_KEY, Body=body, ContentType="application/json")
+        metrics.incr("s3_objects_written")
+        metrics.incr("s3_put_bytes", len(body))
+        logging.info("Metadata manifest saved")
+
+    def count_written(self, written: dict):
+        '''Counts the objects a to_parquet call wrote and keeps their paths for
+        count_written_bytes, which sizes them once the uploads have finished'''
+        metrics.incr("s3_objects_written", len(written["paths"]))
+        self.written_paths.extend(written["paths"])
+
+    def count_written_bytes(self):
+        '''Adds the size of every Parquet object this run wrote to s3_put_bytes
+        This runs outside the retried uploads, so failing to size them loses only the count'''
+        if not self.written_paths:
+            return
+        try:
+            sizes = wr.s3.size_objects(path=self.written_paths, boto3_session=self.session)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logging.warning("Could not size %s written objects", len(self.written_paths),
+                            exc_info=True)
+            return
+        metrics.incr("s3_put_bytes", sum(size or 0 for size in sizes.values()))
+
+    def upload_metadata(self, table_name: str, df: pd.DataFrame, content_hash: str = None):
         '''Uploads metadata to ensure S3 bucket is all up-to-date
         Metadata includes: plant, botanist, photo, origin, city, country'''
         path = f"s3://{self.bucket}/input/{table_name}/{table_name}.parquet"
 
-        wr.s3.to_parquet(df, path=path, dataset=False, index=False,
-                         boto3_session=self.session)
-
-        logging.info('%s uploaded to %s bucket!', df, self.bucket)
+        written = wr.s3.to_parquet(df, path=path, dataset=False, index=False,
+                                   boto3_session=self.thread_session())
+        self.count_written(written)
+        metrics.incr("metadata_rows_uploaded", len(df))
+
+        self.manifest.record(table_name, content_hash or table_hash(df), table_probe(df))
+        logging.info('%s uploaded to %s bucket!', table_name, self.bucket)
+
+    def metadata_uploads(self, df_dict: dict[str, pd.DataFrame]) -> dict:
+        '''Builds one upload task per extracted metadata table whose contents have changed'''
+        uploads = {}
+        for table_name in METADATA_TABLE_NAMES:
+            if table_name not in df_dict:
+                continue
+            df = df_dict[table_name]
+            content_hash = table_hash(df)
+            if self.manifest.content_changed(table_name, content_hash):
+                uploads[table_name] = partial(self.upload_metadata, table_name, df, content_hash)
+            else:
+                self.manifest.record(table_name, content_hash, table_probe(df))
+                metrics.incr("metadata_tables_skipped")
+                logging.info('%s is unchanged; skipping upload', table_name)
+        return uploads
+
+    def upload_metadata_tables(self, df_dict: dict[str, pd.DataFrame]) -> dict[str, dict]:
+        '''Uploads every metadata table in parallel; returns the timing of each'''
+        return run_uploads(self.metadata_uploads(df_dict))
+
+    def start_metadata_uploads(self, df_dict: dict[str, pd.DataFrame]) -> UploadBatch:
+        '''Starts uploading every metadata table in the background
+        The caller must wait on the returned batch before finish()'''
+        return UploadBatch(self.metadata_uploads(df_dict))
 
     def upload_reading_data(self, df: pd.DataFrame):
         '''Uploads all the reading data '''
         df['year'] = df['reading_taken'].dt.year
         df['month'] = df['reading_taken'].dt.month
         df['day'] = df['reading_taken'].dt.day
+        self.reading_days.update(df['reading_taken'].dt.date.dropna().unique())
+        self.written_columns['reading'] = list(df.columns)
 
-        wr.s3.to_parquet(df, path=f's3://{self.bucket}/input/reading',
-                         dataset=True, partition_cols=['year', 'month', 'day'],
-                         mode='append', boto3_session=self.session)
+        written = wr.s3.to_parquet(df, path=f's3://{self.bucket}/input/reading',
+                                   dataset=True, partition_cols=['year', 'month', 'day'],
+                                   mode='append', boto3_session=self.thread_session())
+        self.count_written(written)
+        metrics.incr("readings_uploaded", len(df))
+        self.watermark.update(df)
 
         logging.info('Readings uploaded to %s, bucket!', self.bucket)
 
+    def upload_reading_chunks(self, chunks: Iterator[pd.DataFrame]) -> int:
+        '''Uploads reading data one chunk at a time, so only one chunk is held in memory
+        Returns the number of readings uploaded'''
+        n_rows = 0
+        for chunk in chunks:
+            self.upload_reading_data(chunk)
+            n_rows += len(chunk)
+        logging.info('%s readings uploaded in chunks', n_rows)
+        return n_rows
+
+    def compact_readings(self) -> dict:
+        '''Compacts every reading partition written by this run into sorted files'''
+        creds = self.session.get_credentials().get_frozen_credentials()
+        s3 = fs.S3FileSystem(access_key=creds.access_key, secret_key=creds.secret_key,
+                             session_token=creds.token, region=self.session.region_name)
+        compacted = compact_days(s3, f'{self.bucket}/input/reading',
+                                 sorted(self.reading_days))
+        logging.info('Compacted %s reading partitions', len(compacted))
+        return compacted
+
     def upload_summary_data(self, df: pd.DataFrame):
         '''Uploads small summary dataframe to S3 bucket
-        Partitions by day, using the date column in the summary: YYYYMMDD'''
+        Partitions by day, using the date column in the summary: YYYYMMDD
+        Each written day's partition is replaced rather than appended to, so a retried or
+        repeated upload leaves one summary per plant per day'''
         df['year'] = df['date'].dt.year
         df['month'] = df['date'].dt.month
         df['day'] = df['date'].dt.day
+        self.summary_days.update(df['date'].dt.date.dropna().unique())
+        self.written_columns['summary'] = list(df.columns)
 
-        wr.s3.to_parquet(df, path=f's3://{self.bucket}/input/summary',
-                         dataset=True, partition_cols=['year', 'month', 'day'],
-                         mode='append', boto3_session=self.session)
+        written = wr.s3.to_parquet(df, path=f's3://{self.bucket}/input/summary',
+                                   dataset=True, partition_cols=['year', 'month', 'day'],
+                                   mode='overwrite_partitions',
+                                   boto3_session=self.thread_session())
+        self.count_written(written)
 
         logging.info('Summaries uploaded to %s, bucket!', self.bucket)
 
@@ -87,69 +207,62 @@ class DataLoader:
             elapsed += 5
         raise TimeoutError(f"Crawler '{crawler_name}' did not finish in time.")
 
-    def get_latest_reading_taken(self) -> str:
-        '''Query S3 bucket for timestamp of latest reading'''
-        query = "SELECT MAX(reading_taken) AS latest FROM reading"
-        df = wr.athena.read_sql_query(
-            sql=query,
-            database=self.database,
-            ctas_approach=False,  # just need the result
-            s3_output=f's3://{self.bucket}/output',
-            boto3_session=self.session
-        )
-
-        latest = df.loc[0, 'latest']
-
-        # ensuring the correct format is returned as a string
-        if isinstance(latest, pd.Timestamp):
-            return latest.strftime('%Y-%m-%d %H:%M:%S')
-        return str(latest)
-
-    def delete_old_readings(self, latest_reading_taken):
-        '''Using the latest reading in S3, deleted all older readings from RDS'''
-        if latest_reading_taken in [None, 'NaT', 'nan']:
-            logging.warning(
-                "No latest reading found in S3. Skipping deletion.")
-            return 0
-
-        try:
-            timestamp = datetime.strptime(
-                latest_reading_taken, "%Y-%m-%d %H:%M:%S")
-        except ValueError as e:
-            logging.error(f"Invalid datetime format: {latest_reading_taken}")
-            return 0
-
-        cursor = self.conn.cursor()
-
-        delete_query = """DELETE FROM reading
-                        WHERE reading_taken < %s"""
-
-        cursor.execute(delete_query, (timestamp,))
-        deleted_count = cursor.rowcount
-
-        self.conn.commit()
-        cursor.close()
-        logging.info("DELETED %s rows from RDS", deleted_count)
-        return deleted_count
+    def catalogue(self) -> bool:
+        '''Registers the reading and summary partitions written by this run with Glue
+        Falls back to the crawler only for a new table or new columns
+        Returns True if the crawler had to run'''
+        glue = self.session.client("glue")
+        written_days = {'reading': self.reading_days, 'summary': self.summary_days}
+        needs_crawl = False
+        for table_name, days in written_days.items():
+            if days and not catalogue_table(glue, self.database, table_name, sorted(days),
+                                            self.written_columns[table_name]):
+                needs_crawl = True
+        if needs_crawl:
+            self.run_crawler_and_wait(CRAWLER_NAME)
+            logging.info("Crawler finished.")
+        return needs_crawl
+
+    def save_watermark(self):
+        '''Writes the high-water mark of the readings archived by this run to S3'''
+        body = self.watermark.to_json().encode()
+        self.session.client("s3").put_object(
+            Bucket=self.bucket, Key=WATERMARK_KEY, Body=body, ContentType="application/json")
+        metrics.incr("s3_objects_written")
+        metrics.incr("s3_put_bytes", len(body))
+        logging.info("Watermark saved: %s", self.watermark.to_json())
 
     def load(self):
         '''Uploads metadata, yesterday's summary and reading data to the S3 bucket
         Then deletes all old data from RDS'''
-        for key in METADATA_TABLE_NAMES:
-            self.upload_metadata(key, self.df_dict[key])
-
-        self.upload_reading_data(self.df_dict['reading'])
-        self.upload_summary_data(self.df_dict['summary'])
-
-        # runs the crawler
-        self.run_crawler_and_wait('c18-botanists-crawler')
-        logging.info("Crawler finished.")
-
-        # clean up
-        latest = self.get_latest_reading_taken()
-        logging.info("Latest reading_taken in S3: %s", latest)
-
-        deleted = self.delete_old_readings(latest)
+        uploads = self.metadata_uploads(self.df_dict)
+        uploads['reading'] = partial(self.upload_reading_data, self.df_dict['reading'])
+        uploads['summary'] = partial(self.upload_summary_data, self.df_dict['summary'])
+        # finish() only runs once every upload has succeeded
+        try:
+            run_uploads(uploads)
+            self.finish()
+        finally:
+            self.close_conn()
+
+    def finish(self):
+        '''Compacts and catalogues the uploaded data then deletes all old data from RDS'''
+        # sized before compaction replaces the reading files
+        self.count_written_bytes()
+        with metrics.span("compact"):
+            self.compact_readings()
+        with metrics.span("catalogue"):
+            metrics.incr("crawler_runs", int(self.catalogue()))
+
+        # clean up: everything up to the mark of what was just written is safely in S3
+        self.save_watermark()
+        self.save_manifest()
+        with metrics.span("purge"):
+            deleted = purge_readings(self.conn, self.watermark)
+        metrics.incr("readings_purged", deleted)
+
+        logging.info("Deleted %s rows from RDS up to id %s", deleted, self.watermark.max_id)
+
+    def close_conn(self):
+        '''Returns the RDS connection to the pool, rolling back anything uncommitted'''
         self.conn.close()
-
-        logging.info("Deleted %s rows from RDS older than %s", deleted, latest)
@@ -0,0 +1,59 @@
+'''Content-hash manifest of the metadata tables in S3
+Lets the nightly load skip re-uploading tables which have not changed, and optionally
+skip extracting them when a cheap row count / max id probe matches too'''
+import json
+import hashlib
+import logging
+
+import pandas as pd
+
+MANIFEST_KEY = "manifests/metadata_manifest.json"
+
+
+def table_hash(df: pd.DataFrame) -> str:
+    '''Hashes a table's contents independently of row and column order
+    Columns are sorted by name and rows by every column before hashing'''
+    columns = sorted(df.columns)
+    canonical = df[columns].sort_values(columns).reset_index(drop=True)
+    digest = hashlib.sha256(json.dumps(
+        [(column, str(canonical[column].dtype)) for column in columns]).encode())
+    digest.update(pd.util.hash_pandas_object(canonical, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class MetadataManifest:
+    '''Per-table content hash and (row count, max id) probe of what S3 holds'''
+
+    def __init__(self, tables: dict[str, dict] = None):
+        '''Constructor for class'''
+        self.tables = tables or {}
+
+    @classmethod
+    def from_json(cls, text: str) -> "MetadataManifest":
+        '''Reads a manifest back from its S3 object'''
+        return cls(json.loads(text))
+
+    def to_json(self) -> str:
+        '''Serialises the manifest for its S3 object'''
+        return json.dumps(self.tables, sort_keys=True)
+
+    def content_changed(self, table_name: str, content_hash: str) -> bool:
+        '''Whether a table's contents differ from what was last uploaded'''
+        return self.tables.get(table_name, {}).get("hash") != content_hash
+
+    def probe_changed(self, table_name: str, probe: tuple[int, int]) -> bool:
+        '''Whether a table's (row count, max id) differs from what was last uploaded
+        Dimension rows are only ever inserted, so an unchanged probe means unchanged rows'''
+        saved = self.tables.get(table_name, {}).get("probe")
+        return saved is None or tuple(saved) != tuple(probe)
+
+    def record(self, table_name: str, content_hash: str, probe: tuple[int, int] = None):
+        '''Records the hash, and probe if known, of a table that has just been uploaded'''
+        self.tables[table_name] = {"hash": content_hash,
+                                   "probe": list(probe) if probe else None}
+        logging.info("Manifest updated for %s", table_name)
+
+
+def table_probe(df: pd.DataFrame) -> tuple[int, int]:
+    '''The (row count, max id) of a table as extracted, matching RDSDataGetter.probe_metadata'''
+    return len(df), int(df["id"].max()) if len(df) else 0
@@ -1,18 +1,67 @@
 """complete pipeline"""
+from src.utils import metrics, profiling
 from extract import RDSDataGetter
 from transform import TransformRDSData
-from load import DataLoader, BUCKET, METADATA_TABLE_NAMES, DATABASE
+from load import DataLoader, BUCKET, DATABASE
 
 
-def run_pipeline():
-    """runs the whole pipeline"""
-    getter = RDSDataGetter()
-    tables = getter.get_all_data()
-    transformer = TransformRDSData(tables)
-    transformed = transformer.transformed_data()
-    loader = DataLoader(transformed, BUCKET, DATABASE)
-    loader.load()
+def run_pipeline(streaming=True, summary_from_stats=False, skip_unchanged_extract=False):
+    """runs the whole pipeline
+    Streaming mode moves readings through in chunks instead of holding the whole day
+    summary_from_stats builds the summary from plant_daily_stats instead of the readings
+    skip_unchanged_extract only extracts metadata tables whose row count or max id moved
+    Stage timings and counts are emitted as one CloudWatch EMF record at the end"""
+    metrics.start_run("rds_to_s3")
+    try:
+        getter = RDSDataGetter()
+        if not streaming:
+            with metrics.span("extract"):
+                tables = getter.get_all_data()
+            with metrics.span("transform"):
+                transformer = TransformRDSData(tables)
+                transformed = transformer.transformed_data()
+            with metrics.span("load"):
+                loader = DataLoader(transformed, BUCKET, DATABASE)
+                loader.load()
+            return
+
+        loader = DataLoader({}, BUCKET, DATABASE)
+        try:
+            # readings stream through extract, summary and upload together, so are timed as one
+            with metrics.span("metadata"):
+                changed = None
+                if skip_unchanged_extract:
+                    probes = getter.probe_metadata()
+                    changed = [table for table, probe in probes.items()
+                               if loader.manifest.probe_changed(table, probe)]
+                tables = getter.get_metadata(changed)
+                transformer = TransformRDSData(tables)
+            # metadata uploads overlap with the readings stream and are joined before finish()
+            metadata_uploads = loader.start_metadata_uploads(tables)
+            try:
+                with metrics.span("readings"):
+                    if summary_from_stats:
+                        summary = transformer.summary_from_daily_stats(getter.get_daily_stats())
+                        loader.upload_reading_chunks(getter.iter_readings())
+                    else:
+                        loader.upload_reading_chunks(
+                            transformer.summarise_chunks(getter.iter_readings()))
+                        summary = transformer.summary_from_chunks()
+                with metrics.span("summary"):
+                    loader.upload_summary_data(summary)
+            except BaseException:
+                metadata_uploads.cancel()
+                raise
+            with metrics.span("metadata_wait"):
+                metadata_uploads.wait()
+            loader.finish()
+        finally:
+            loader.close_conn()
+    finally:
+        metrics.emit()
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    # PIPELINE_PROFILE=sample or cprofile profiles the run
+    with profiling.profiled("rds_to_s3", profiling.profile_mode()):
+        run_pipeline()
@@ -1,7 +1,98 @@
 """adds summary data to dict"""
 import logging
+from collections.abc import Iterator
 import pandas as pd
 
+from src.utils import metrics
+
+SUMMARY_COLUMNS = ['plant_id', 'mean_soil_moisture', 'mean_soil_temperature',
+                   'date', 'watering_count', 'most_recent']
+
+
+def as_datetime(column: pd.Series) -> pd.Series:
+    """Converts a column to datetimes, skipping the conversion when it already is one"""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column
+    return pd.to_datetime(column)
+
+
+class SummaryAccumulator:
+    """Mergeable per-plant summary state, fed one batch of readings at a time
+    Holds running sums/counts, the first reading time, the latest watering and the
+    distinct waterings seen on their reading's day, so memory stays O(plants)"""
+
+    def __init__(self):
+        self.partials = pd.DataFrame()
+        self.waterings = pd.DataFrame(columns=['plant_id', 'watered_today'])
+        self.n_batches = 0
+
+    def add(self, readings: pd.DataFrame):
+        """Reduces a batch of readings with a single grouped aggregation and folds it in"""
+        reading_taken = as_datetime(readings['reading_taken'])
+        last_watered = as_datetime(readings['last_watered'])
+        values = pd.DataFrame({
+            'plant_id': readings['plant_id'],
+            'reading_taken': reading_taken,
+            'last_watered': last_watered,
+            'watered_today': last_watered.where(
+                last_watered.dt.normalize() == reading_taken.dt.normalize()),
+            'soil_moisture': readings['soil_moisture'],
+            'soil_temperature': readings['soil_temperature']
+        })
+        partial = values.groupby('plant_id').agg(
+            moisture_sum=('soil_moisture', 'sum'),
+            moisture_count=('soil_moisture', 'count'),
+            temperature_sum=('soil_temperature', 'sum'),
+            temperature_count=('soil_temperature', 'count'),
+            date=('reading_taken', 'first'),
+            most_recent=('last_watered', 'max')
+        )
+        waterings = values[['plant_id', 'watered_today']].dropna().drop_duplicates()
+        self.combine(partial, waterings)
+        self.n_batches += 1
+
+    def merge(self, other: "SummaryAccumulator") -> "SummaryAccumulator":
+        """Folds another accumulator into this one, e.g. a second batch or another day
+        This accumulator's first readings take precedence"""
+        self.combine(other.partials, other.waterings)
+        self.n_batches += other.n_batches
+        return self
+
+    def combine(self, partial: pd.DataFrame, waterings: pd.DataFrame):
+        """Reduces existing and new partial states back down to one row per plant"""
+        if self.partials.empty:
+            self.partials = partial
+        elif not partial.empty:
+            grouped = pd.concat([self.partials, partial]).groupby(level='plant_id')
+            self.partials = grouped.agg({
+                'moisture_sum': 'sum',
+                'moisture_count': 'sum',
+                'temperature_sum': 'sum',
+                'temperature_count': 'sum',
+                'date': 'first',
+                'most_recent': 'max'
+            })
+        if self.waterings.empty:
+            self.waterings = waterings
+        elif not waterings.empty:
+            self.waterings = pd.concat([self.waterings, waterings]).drop_duplicates()
+
+    def summary(self) -> pd.DataFrame:
+        """Finalises the state into the summary frame"""
+        if self.partials.empty:
+            logging.warning("No readings were added; summary is empty")
+            return pd.DataFrame(columns=SUMMARY_COLUMNS)
+        summary = pd.DataFrame({
+            'mean_soil_moisture': self.partials['moisture_sum'] / self.partials['moisture_count'],
+            'mean_soil_temperature': (self.partials['temperature_sum']
+                                      / self.partials['temperature_count']),
+            'date': self.partials['date'],
+            'watering_count': self.waterings.groupby('plant_id')['watered_today'].count(),
+            'most_recent': self.partials['most_recent']
+        }, index=self.partials.index)
+        summary['watering_count'] = summary['watering_count'].fillna(0).astype(int)
+        return summary.reset_index()[SUMMARY_COLUMNS]
+
 
 class TransformRDSData:
     """class to transform data to include summary"""
@@ -9,49 +100,56 @@ class TransformRDSData:
     def __init__(self, df_dict: dict[str, pd.DataFrame]):
         self.df_dict = df_dict
         self.readings = df_dict.get('reading')
+        self.accumulator = SummaryAccumulator()
         logging.info("Constructed transformer")
 
     def create_summary(self):
-        """create summary dataframe"""
+        """create summary dataframe in one grouped pass over the readings"""
         self.readings['reading_taken'] = pd.to_datetime(
             self.readings['reading_taken'])
 
         self.readings['last_watered'] = pd.to_datetime(
             self.readings['last_watered'])
 
-        self.readings['reading_date'] = self.readings['reading_taken'].dt.date
-        self.readings['watered_date'] = self.readings['last_watered'].dt.date
-
-        means = self.readings.groupby('plant_id')[
-            ['soil_moisture', 'soil_temperature']].mean().rename(
-                columns={
-                    'soil_moisture': 'mean_soil_moisture',
-                    'soil_temperature': 'mean_soil_temperature'
-                })
-
-        date = self.readings.groupby('plant_id')['reading_taken'].first(
-        ).reset_index().rename(columns={'reading_taken': 'date'})
-
-        watered_on_the_day = self.readings[self.readings['watered_date']
-                                           == self.readings['reading_date']]
-
-        watering_count = watered_on_the_day.groupby(
-            'plant_id')['last_watered'].nunique()
-
-        watering_count = watering_count.reset_index().rename(
-            columns={'last_watered': 'watering_count'})
+        accumulator = SummaryAccumulator()
+        accumulator.add(self.readings)
+        summary = accumulator.summary()
+        logging.info("Summary created")
+        return summary
 
-        most_recent = self.readings.groupby('plant_id')['last_watered'].max(
-        ).reset_index().rename(columns={'last_watered': 'most_recent'})
+    def add_chunk(self, chunk: pd.DataFrame):
+        """Adds one chunk of readings to the streamed summary"""
+        self.accumulator.add(chunk)
+        metrics.incr("readings_summarised", len(chunk))
 
-        summary = means.merge(date, on='plant_id', how='left').merge(
-            watering_count, on='plant_id', how='left').merge(most_recent, on='plant_id', how='left')
+    def summarise_chunks(self, chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Passes chunks of readings straight through, adding each one to the summary on the way"""
+        for chunk in chunks:
+            self.add_chunk(chunk)
+            yield chunk
 
-        summary['watering_count'] = summary['watering_count'].fillna(
-            0).astype(int)
-        logging.info("Summary created")
+    def summary_from_chunks(self) -> pd.DataFrame:
+        """Finalises the streamed summary into the same frame as create_summary"""
+        summary = self.accumulator.summary()
+        metrics.incr("summary_rows", len(summary))
+        logging.info("Summary created from %s chunks", self.accumulator.n_batches)
         return summary
 
+    def summary_from_daily_stats(self, stats: pd.DataFrame) -> pd.DataFrame:
+        """Builds the summary from the rolling aggregates kept by the minute pipeline,
+        reading one row per plant instead of every reading"""
+        summary = pd.DataFrame({
+            'plant_id': stats['plant_id'],
+            'mean_soil_moisture': stats['moisture_sum'] / stats['moisture_count'],
+            'mean_soil_temperature': stats['temperature_sum'] / stats['temperature_count'],
+            'date': as_datetime(stats['first_reading_taken']),
+            'watering_count': stats['watering_count'].astype(int),
+            'most_recent': as_datetime(stats['most_recent_watering'])
+        })
+        summary = summary.sort_values('plant_id').reset_index(drop=True)
+        logging.info("Summary created from daily stats")
+        return summary[SUMMARY_COLUMNS]
+
     def transformed_data(self):
         """returns the entire dataset with summary"""
         summary = self.create_summary()
@@ -0,0 +1,89 @@
+'''Runs independent S3 uploads concurrently on a bounded thread pool
+Each upload is timed and retried with backoff; the stage only succeeds if all of them do'''
+import time
+import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.utils import metrics
+
+UPLOAD_WORKERS = 8
+UPLOAD_RETRIES = 3
+UPLOAD_BACKOFF = 0.5
+
+
+class UploadError(RuntimeError):
+    '''Raised once every upload has finished if any of them failed'''
+
+    def __init__(self, failures: dict[str, Exception]):
+        self.failures = failures
+        super().__init__(f"Uploads failed: {', '.join(sorted(failures))}")
+
+
+def run_with_retry(upload: Callable[[], None], retries: int = UPLOAD_RETRIES,
+                   backoff: float = UPLOAD_BACKOFF) -> int:
+    '''Calls an upload until it succeeds, doubling the wait between attempts
+    Returns the number of attempts it took'''
+    for attempt in range(1, retries + 1):
+        try:
+            upload()
+            return attempt
+        except Exception:  # pylint: disable=broad-exception-caught
+            if attempt == retries:
+                raise
+            metrics.incr("upload_retries")
+            logging.warning("Upload attempt %s failed; retrying", attempt, exc_info=True)
+            time.sleep(backoff * 2 ** (attempt - 1))
+    return retries
+
+
+def timed_upload(name: str, upload: Callable[[], None], retries: int,
+                 backoff: float) -> dict:
+    '''Runs one upload with retries and reports how long it took'''
+    start = time.perf_counter()
+    attempts = run_with_retry(upload, retries, backoff)
+    seconds = time.perf_counter() - start
+    logging.info("Uploaded %s in %.2fs after %s attempt(s)", name, seconds, attempts)
+    return {"seconds": seconds, "attempts": attempts}
+
+
+class UploadBatch:
+    '''Named uploads running in the background on their own thread pool'''
+
+    def __init__(self, uploads: dict[str, Callable[[], None]], max_workers: int = UPLOAD_WORKERS,
+                 retries: int = UPLOAD_RETRIES, backoff: float = UPLOAD_BACKOFF):
+        self.start = time.perf_counter()
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.futures = {self.pool.submit(timed_upload, name, upload, retries, backoff): name
+                        for name, upload in uploads.items()}
+
+    def wait(self) -> dict[str, dict]:
+        '''Waits for every upload in the batch
+        Returns the timing and attempt count of each; raises UploadError if any failed'''
+        timings = {}
+        failures = {}
+        for future in as_completed(self.futures):
+            name = self.futures[future]
+            try:
+                timings[name] = future.result()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                metrics.incr("upload_failures")
+                logging.error("Upload of %s failed: %s", name, e)
+                failures[name] = e
+        self.pool.shutdown()
+        logging.info("Upload stage of %s tasks took %.2fs", len(self.futures),
+                     time.perf_counter() - self.start)
+        if failures:
+            raise UploadError(failures)
+        return timings
+
+    def cancel(self):
+        '''Drops the uploads not yet started and waits for the running ones to end'''
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_uploads(uploads: dict[str, Callable[[], None]], max_workers: int = UPLOAD_WORKERS,
+                retries: int = UPLOAD_RETRIES, backoff: float = UPLOAD_BACKOFF) -> dict[str, dict]:
+    '''Runs named uploads in parallel and waits for all of them
+    Returns the timing and attempt count of each; raises UploadError if any failed'''
+    return UploadBatch(uploads, max_workers, retries, backoff).wait()
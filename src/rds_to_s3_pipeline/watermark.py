@@ -0,0 +1,82 @@
+'''High-water mark of the readings archived to S3, and the batched RDS purge it drives
+Taken from the batches as they are written, so no archive-wide query is needed'''
+import json
+import logging
+from datetime import datetime
+
+import pandas as pd
+
+WATERMARK_KEY = "manifests/reading_watermark.json"
+PURGE_BATCH_SIZE = 5_000
+
+PURGE_READINGS_QUERY = """DELETE TOP (%s) FROM reading
+                        WHERE id <= %s AND reading_taken <= %s"""
+PURGE_DAILY_STATS_QUERY = """DELETE FROM plant_daily_stats
+                        WHERE stats_date < CAST(%s AS DATE)"""
+
+
+class Watermark:
+    '''Largest reading id and reading_taken written so far, plus the row count'''
+
+    def __init__(self, max_id: int | None = None, max_reading_taken: datetime | None = None,
+                 rows: int = 0):
+        '''Constructor for class'''
+        self.max_id = max_id
+        self.max_reading_taken = max_reading_taken
+        self.rows = rows
+
+    def update(self, readings: pd.DataFrame):
+        '''Advances the mark past a batch of readings which has just been written'''
+        if readings.empty:
+            return
+        batch_id = int(readings['id'].max())
+        batch_taken = readings['reading_taken'].max().to_pydatetime()
+        self.max_id = batch_id if self.max_id is None else max(self.max_id, batch_id)
+        self.max_reading_taken = (batch_taken if self.max_reading_taken is None
+                                  else max(self.max_reading_taken, batch_taken))
+        self.rows += len(readings)
+
+    def to_json(self) -> str:
+        '''Serialises the mark for the manifest object'''
+        return json.dumps({
+            "max_id": self.max_id,
+            "max_reading_taken": (self.max_reading_taken.isoformat()
+                                  if self.max_reading_taken else None),
+            "rows": self.rows
+        })
+
+    @classmethod
+    def from_json(cls, text: str) -> "Watermark":
+        '''Reads a mark back from its manifest object'''
+        saved = json.loads(text)
+        taken = saved["max_reading_taken"]
+        return cls(saved["max_id"], datetime.fromisoformat(taken) if taken else None,
+                   saved["rows"])
+
+
+def purge_readings(conn, watermark: Watermark, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    '''Deletes archived readings from the RDS in batches, committing after each
+    Batches seek on the clustered id, so locks are short and the cost tracks one day
+    Returns the number of readings deleted'''
+    if watermark.max_id is None:
+        logging.warning("Nothing was archived. Skipping deletion.")
+        return 0
+
+    cursor = conn.cursor()
+    deleted = 0
+    while True:
+        cursor.execute(PURGE_READINGS_QUERY,
+                       (batch_size, watermark.max_id, watermark.max_reading_taken))
+        batch_deleted = cursor.rowcount
+        conn.commit()
+        deleted += batch_deleted
+        if batch_deleted < batch_size:
+            break
+
+    # rolling daily stats are only kept for days still held in the reading table
+    cursor.execute(PURGE_DAILY_STATS_QUERY, (watermark.max_reading_taken,))
+    logging.info("DELETED %s daily stats rows from RDS", cursor.rowcount)
+    conn.commit()
+    cursor.close()
+    logging.info("DELETED %s rows from RDS", deleted)
+    return deleted
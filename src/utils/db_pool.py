@@ -0,0 +1,243 @@
+"""Process-wide pool of RDS connections shared by the pipelines and the dashboard
+Kept at module level so warm Lambda invocations and Streamlit sessions reuse logins"""
+import os
+import time
+import logging
+import threading
+from collections.abc import Callable
+
+import dotenv
+import pymssql
+
+from src.utils import metrics
+
+POOL_MAX_SIZE = int(os.environ.get("RDS_POOL_MAX_SIZE", "4"))
+POOL_MAX_LIFETIME = float(os.environ.get("RDS_POOL_MAX_LIFETIME", "1800"))
+POOL_HEALTH_CHECK_AFTER = float(os.environ.get("RDS_POOL_HEALTH_CHECK_AFTER", "60"))
+POOL_CHECKOUT_TIMEOUT = float(os.environ.get("RDS_POOL_CHECKOUT_TIMEOUT", "30"))
+
+
+class PoolTimeoutError(RuntimeError):
+    """Raised when no connection frees up within the checkout timeout"""
+
+
+def connect_from_env():
+    """Opens a new RDS connection from the environment"""
+    return pymssql.connect(
+        os.environ["DB_HOST"],
+        os.environ["DB_USER"],
+        os.environ["DB_PASSWORD"],
+        os.environ["DB_NAME"]
+    )
+
+
+class PoolEntry:
+    """A raw connection with the times used to expire and health check it"""
+
+    def __init__(self, conn):
+        """Constructor for class"""
+        self.conn = conn
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class CountingCursor:
+    """Cursor proxy counting the statements it executes into the run metrics"""
+
+    def __init__(self, cursor):
+        """Constructor for class"""
+        self._cursor = cursor
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, operation, params=None):
+        """Executes one statement, counting it as an RDS round trip"""
+        metrics.incr("sql_statements")
+        return self._cursor.execute(operation, params)
+
+
+class PooledConnection:
+    """Proxy handed out by the pool; close() returns the connection instead of closing it
+    Everything else is passed through to the underlying connection"""
+
+    def __init__(self, pool: "ConnectionPool", entry: PoolEntry):
+        """Constructor for class"""
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name: str):
+        return getattr(self._connection(), name)
+
+    def _connection(self):
+        """The underlying connection, while this proxy still holds it"""
+        if self._entry is None:
+            raise RuntimeError("Connection has already been returned to the pool")
+        return self._entry.conn
+
+    def cursor(self, *args, **kwargs) -> CountingCursor:
+        """Opens a cursor whose statements are counted"""
+        return CountingCursor(self._connection().cursor(*args, **kwargs))
+
+    def commit(self):
+        """Commits, counting the commit"""
+        metrics.incr("sql_commits")
+        return self._connection().commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Returns the connection to the pool; closing twice is a no-op"""
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool.release(entry)
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of connections
+    Idle connections are health checked before reuse and retired after max_lifetime"""
+
+    def __init__(self, connect: Callable = connect_from_env, max_size: int = POOL_MAX_SIZE,
+                 max_lifetime: float = POOL_MAX_LIFETIME,
+                 health_check_after: float = POOL_HEALTH_CHECK_AFTER,
+                 checkout_timeout: float = POOL_CHECKOUT_TIMEOUT):
+        """Constructor for class"""
+        self.connect = connect
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+
+        self._idle: list[PoolEntry] = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self.counters = {"checkouts": 0, "hits": 0, "misses": 0, "discards": 0,
+                         "timeouts": 0, "wait_total": 0.0, "wait_max": 0.0}
+        logging.info("Connection pool constructed with max size %s", max_size)
+
+    def acquire(self, timeout: float = None) -> PooledConnection:
+        """Checks out an idle connection, or opens a new one while under max_size
+        Waits for a connection to be released when the pool is full"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        while True:
+            entry = None
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No RDS connection free after {timeout}s")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if entry is None:
+                try:
+                    entry = PoolEntry(self.connect())
+                except Exception:
+                    self._forget()
+                    raise
+                self._record_checkout(start, hit=False)
+                logging.info("Opened new RDS connection")
+                return PooledConnection(self, entry)
+
+            if self._is_usable(entry):
+                self._record_checkout(start, hit=True)
+                return PooledConnection(self, entry)
+            self._discard(entry)
+
+    def release(self, entry: PoolEntry):
+        """Takes a connection back, rolling back anything left uncommitted"""
+        try:
+            entry.conn.rollback()
+        except Exception:  # pylint: disable=broad-exception-caught
+            logging.warning("Rollback failed on release; discarding connection")
+            self._discard(entry)
+            return
+        entry.last_used = time.monotonic()
+        if entry.last_used - entry.created > self.max_lifetime:
+            self._discard(entry)
+            return
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        """Returns a snapshot of the counters and current pool occupancy"""
+        with self._cond:
+            return {**self.counters, "size": self._size, "idle": len(self._idle)}
+
+    def close_all(self):
+        """Closes every idle connection; checked-out ones close when released"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._discard(entry)
+
+    def _is_usable(self, entry: PoolEntry) -> bool:
+        """Rejects expired connections and pings ones that have sat idle a while"""
+        now = time.monotonic()
+        if now - entry.created > self.max_lifetime:
+            logging.info("Retiring RDS connection past its max lifetime")
+            return False
+        if now - entry.last_used <= self.health_check_after:
+            return True
+        try:
+            cur = entry.conn.cursor()
+            cur.execute("SELECT 1;")
+            cur.fetchall()
+            cur.close()
+            return True
+        except Exception:  # pylint: disable=broad-exception-caught
+            logging.warning("Idle RDS connection failed its health check")
+            return False
+
+    def _record_checkout(self, start: float, hit: bool):
+        """Adds one checkout and its wait time to the counters"""
+        wait = time.monotonic() - start
+        with self._cond:
+            self.counters["checkouts"] += 1
+            self.counters["hits" if hit else "misses"] += 1
+            self.counters["wait_total"] += wait
+            self.counters["wait_max"] = max(self.counters["wait_max"], wait)
+
+    def _discard(self, entry: PoolEntry):
+        """Closes a connection for good and frees its slot"""
+        try:
+            entry.conn.close()
+        except Exception:  # pylint: disable=broad-exception-caught
+            logging.debug("Error closing discarded connection", exc_info=True)
+        self._forget(discarded=True)
+
+    def _forget(self, discarded: bool = False):
+        """Frees one slot and wakes a waiting checkout"""
+        with self._cond:
+            self._size -= 1
+            self.counters["discards"] += discarded
+            self._cond.notify()
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Returns the process-wide pool, creating it and loading .env on first use"""
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is None:
+            dotenv.load_dotenv()
+            _POOL = ConnectionPool()
+    return _POOL
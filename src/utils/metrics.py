@@ -0,0 +1,116 @@
+"""Per-run metrics shared by every pipeline stage
+Stages add timed spans, counters and gauges to the current run, which is emitted as one
+CloudWatch Embedded Metric Format (EMF) JSON record at the end"""
+import json
+import time
+import logging
+import resource
+import sys
+import threading
+from contextlib import contextmanager
+
+NAMESPACE = "LNHMBotanists"
+
+
+def peak_memory_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+class RunMetrics:
+    """Spans, counters and gauges for one pipeline run; safe to update from threads"""
+
+    def __init__(self, pipeline: str = "unknown", namespace: str = NAMESPACE):
+        """Constructor for class"""
+        self.pipeline = pipeline
+        self.namespace = namespace
+        self.started = time.time()
+        self.spans: dict[str, float] = {}
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str):
+        """Times a block; repeated spans of the same name add up"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self.lock:
+                self.spans[name] = self.spans.get(name, 0.0) + elapsed_ms
+            logging.info("%s took %.1f ms", name, elapsed_ms)
+
+    def incr(self, name: str, value: float = 1):
+        """Adds to a counter"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        """Records a gauge, keeping the highest value seen"""
+        with self.lock:
+            self.gauges[name] = max(self.gauges.get(name, value), value)
+
+    def record(self) -> dict:
+        """Builds the EMF record: metric definitions under _aws, values at the top level"""
+        self.gauge("peak_memory_mb", peak_memory_mb())
+        with self.lock:
+            values = {f"{name}_ms": value for name, value in self.spans.items()}
+            units = {name: "Milliseconds" for name in values}
+            for name, value in self.counters.items():
+                values[name] = value
+                units[name] = "Bytes" if name.endswith("bytes") else "Count"
+            for name, value in self.gauges.items():
+                values[name] = value
+                units[name] = "Megabytes" if name.endswith("_mb") else "None"
+        return {
+            "_aws": {
+                "Timestamp": int(self.started * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [["pipeline"]],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, unit in units.items()],
+                }],
+            },
+            "pipeline": self.pipeline,
+            **{name: round(value, 3) for name, value in values.items()},
+        }
+
+
+_RUN = RunMetrics()
+
+
+def start_run(pipeline: str) -> RunMetrics:
+    """Starts collecting a fresh run, discarding anything recorded before"""
+    global _RUN  # pylint: disable=global-statement
+    _RUN = RunMetrics(pipeline)
+    return _RUN
+
+
+def current_run() -> RunMetrics:
+    """The run stages are currently reporting into"""
+    return _RUN
+
+
+def span(name: str):
+    """Times a block against the current run"""
+    return _RUN.span(name)
+
+
+def incr(name: str, value: float = 1):
+    """Adds to a counter of the current run"""
+    _RUN.incr(name, value)
+
+
+def gauge(name: str, value: float):
+    """Records a gauge on the current run"""
+    _RUN.gauge(name, value)
+
+
+def emit() -> dict:
+    """Prints the current run as one EMF JSON line, which CloudWatch turns into metrics"""
+    record = _RUN.record()
+    print(json.dumps(record), flush=True)
+    return record
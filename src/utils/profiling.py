@@ -0,0 +1,136 @@
+"""Opt-in profiling of whole pipeline runs
+Switched on by the PIPELINE_PROFILE environment variable or a "profile" field in the
+Lambda event. "sample" (or any true value) writes collapsed stacks for flamegraph.pl or
+speedscope; "cprofile" writes deterministic pstats. When off, nothing is started."""
+import cProfile
+import os
+import sys
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PROFILE_MODE = os.environ.get("PIPELINE_PROFILE", "")
+PROFILE_DIR = os.environ.get("PIPELINE_PROFILE_DIR", "/tmp/profiles")
+PROFILE_S3_URI = os.environ.get("PIPELINE_PROFILE_S3", "")
+SAMPLE_INTERVAL = 0.005
+
+MODES = {"sample", "cprofile"}
+OFF_VALUES = {"", "0", "false", "off", "no", "none"}
+ON_VALUES = {"1", "true", "on", "yes"}
+
+
+def profile_mode(event: dict = None, default: str = PROFILE_MODE) -> str | None:
+    """The profiling mode asked for by the event, falling back to the environment
+    Returns None when profiling is off"""
+    value = event.get("profile") if isinstance(event, dict) else None
+    if value is None:
+        value = default
+    value = str(value).strip().lower()
+    if value in OFF_VALUES:
+        return None
+    if value in ON_VALUES:
+        return "sample"
+    if value not in MODES:
+        logging.warning("Unknown profile mode %r; profiling is off", value)
+        return None
+    return value
+
+
+def frame_stack(frame) -> list[str]:
+    """A frame's call stack as module:function entries, outermost first"""
+    stack = []
+    while frame is not None:
+        stack.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return stack[::-1]
+
+
+class StackSampler:
+    """Samples the stack of every other thread at a fixed interval from a daemon thread
+    Costs one stack walk per thread per interval, whatever the pipeline is doing"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        """Constructor for class"""
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        """Starts sampling"""
+        self.thread.start()
+
+    def stop(self):
+        """Stops sampling and waits for the sampler thread"""
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        """Sampler loop"""
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                if ident == own:
+                    continue
+                stack = [names.get(ident, str(ident)), *frame_stack(frame)]
+                self.stacks[";".join(stack)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format: one "frame;frame;frame count" line per stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+def upload_profile(path: str, s3_uri: str):
+    """Copies a profile to s3://bucket/prefix/; failures are logged, never raised"""
+    bucket, _, prefix = s3_uri.removeprefix("s3://").partition("/")
+    key = f"{prefix.rstrip('/')}/{os.path.basename(path)}".lstrip("/")
+    try:
+        import boto3  # pylint: disable=import-outside-toplevel
+        boto3.client("s3").upload_file(path, bucket, key)
+        logging.info("Profile uploaded to s3://%s/%s", bucket, key)
+    except Exception:  # pylint: disable=broad-exception-caught
+        logging.warning("Could not upload profile %s", path, exc_info=True)
+
+
+@contextmanager
+def profiled(name: str, mode: str | None, directory: str = PROFILE_DIR,
+             s3_uri: str = PROFILE_S3_URI):
+    """Profiles the block in the given mode and writes the result under directory,
+    and to s3_uri if set; yields the profiler, or None when mode is None"""
+    if mode is None:
+        yield None
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    base = os.path.join(directory, f"{name}-{stamp}")
+    path = f"{base}.pstats" if mode == "cprofile" else f"{base}.folded"
+    try:
+        if mode == "cprofile":
+            # cProfile only sees the thread it was enabled on
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield profiler
+            finally:
+                profiler.disable()
+                profiler.dump_stats(path)
+        else:
+            profiler = StackSampler()
+            profiler.start()
+            try:
+                yield profiler
+            finally:
+                profiler.stop()
+                with open(path, "w", encoding="utf8") as f:
+                    f.write(profiler.collapsed())
+    finally:
+        # a run that failed is the one most worth looking at, so publish it either way
+        logging.info("Profile of %s written to %s", name, path)
+        if s3_uri:
+            upload_profile(path, s3_uri)
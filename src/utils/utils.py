@@ -1,16 +1,8 @@
 """File for code used in multiple different files"""
 
-import os
-import dotenv
+from src.utils.db_pool import get_pool, PooledConnection
 
-import pymssql
-
-def get_conn():
-    """Gets a connection to the RDS with local .env"""
-    dotenv.load_dotenv()
-    return pymssql.connect(
-            os.environ["DB_HOST"],
-            os.environ["DB_USER"],
-            os.environ["DB_PASSWORD"],
-            os.environ["DB_NAME"]
-        )
+def get_conn() -> PooledConnection:
+    """Checks out a connection to the RDS from the shared pool
+    Closing it returns it to the pool for the next caller"""
+    return get_pool().acquire()
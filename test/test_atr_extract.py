@@ -1,7 +1,66 @@
 # pylint: skip-file
-from src.api_to_rds_pipeline.extract import PlantGetter, BASE_ENDPOINT, START_ID, MAX_404_ERRORS
+import asyncio
+import json
+
+from src.api_to_rds_pipeline import extract
+from src.api_to_rds_pipeline.extract import (PlantGetter, BASE_ENDPOINT, START_ID,
+                                             MAX_404_ERRORS, MAX_RETRIES)
+import pytest
 import requests
 
+from benchmarks.mock_plant_api import MockPlantAPI
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self, content_type="application/json"):
+        return json.loads(self.body)
+
+
+class FakeRaisingResponse:
+    def __init__(self, exc):
+        self.exc = exc
+
+    async def __aenter__(self):
+        raise self.exc
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Answers each request with the next scripted (status, body) or exception"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    def get(self, url):
+        self.calls += 1
+        answer = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        if isinstance(answer, Exception):
+            return FakeRaisingResponse(answer)
+        return FakeResponse(*answer)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(extract, "RETRY_BACKOFF", 0)
+
+
+def fetch_one(session):
+    pg = PlantGetter(BASE_ENDPOINT, START_ID, MAX_404_ERRORS)
+    return asyncio.run(pg.get_plant_async(session, 1))
+
 
 def test_successful_request(requests_mock):
     """checks successful requests are returned"""
@@ -73,3 +132,51 @@ def test_exception_returns_error_dict(requests_mock):
     data = pg.get_plant(1)
     assert data == {"error": "Request Exception", "id": 1}
     assert requests_mock.call_count == 1
+
+
+def test_async_loop_finds_ids_past_max_id():
+    """checks the async loop discovers plants above the old hard-coded MAX_ID"""
+    with MockPlantAPI(120) as api:
+        pg = PlantGetter(api.url, START_ID, MAX_404_ERRORS)
+        data = pg.loop_ids_async(concurrency=10)
+    assert [plant['plant_id'] for plant in data] == list(range(1, 121))
+
+
+def test_async_loop_continues_over_short_gaps():
+    """checks the async loop applies the consecutive 404 rule in ID order"""
+    gap = set(range(10, 10 + MAX_404_ERRORS - 1))
+    far = set(range(30, 40))
+    with MockPlantAPI(60, missing_ids=gap | far) as api:
+        pg = PlantGetter(api.url, START_ID, MAX_404_ERRORS)
+        data = pg.loop_ids_async(concurrency=8)
+    ids = [plant['plant_id'] for plant in data]
+    assert ids == [i for i in range(1, 30) if i not in gap]
+
+
+def test_async_request_retries_server_errors(no_backoff):
+    """checks a 5xx is retried and the following 200 is returned"""
+    session = FakeSession([(503, ""), (200, '{"plant_id": 1}')])
+    assert fetch_one(session) == (1, {"plant_id": 1})
+    assert session.calls == 2
+
+
+def test_async_request_gives_up_after_timeouts(no_backoff):
+    """checks repeated timeouts return an error once the retries are used up"""
+    session = FakeSession([asyncio.TimeoutError()])
+    assert fetch_one(session) == (1, {"error": "Request Exception", "id": 1})
+    assert session.calls == MAX_RETRIES + 1
+
+
+def test_async_request_does_not_retry_404s(no_backoff):
+    """checks a 404 is returned straight away as an error"""
+    session = FakeSession([(404, "")])
+    assert fetch_one(session) == (1, {"error": "404 Not Found", "id": 1})
+    assert session.calls == 1
+
+
+def test_async_request_retries_non_json_bodies(no_backoff):
+    """checks a 200 with a body that is not JSON is retried instead of raising"""
+    session = FakeSession([(200, "<html>Application Error</html>"), (200, '{"plant_id": 1}')])
+    assert fetch_one(session) == (1, {"plant_id": 1})
+    session = FakeSession([(200, "<html>Application Error</html>")])
+    assert fetch_one(session) == (1, {"error": "Request Exception", "id": 1})
@@ -0,0 +1,63 @@
+# pylint: skip-file
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE_DIR = os.path.join(PROJECT_ROOT, "src", "api_to_rds_pipeline")
+
+# Cold import of the Lambda handler on the records path, as the image runs it
+# Measured at about 0.3s, against about 0.8s on the pandas path; most of it is aiohttp,
+# which every run needs. Wall-clock timings depend on the machine, so the budget is
+# generous and the records path is also timed against the pandas path on the same machine
+IMPORT_BUDGET_S = 2.0
+HEAVY_MODULES = ["pandas", "numpy", "requests", "pyarrow", "awswrangler", "boto3", "streamlit"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import src.api_to_rds_pipeline.pipeline as pipeline
+pipeline.stage_classes(sys.argv[1])
+seconds = time.perf_counter() - start
+files = {name: getattr(module, "__file__", None) for name, module in sys.modules.items()}
+print(json.dumps({"seconds": seconds, "modules": sorted(sys.modules), "files": files}))
+"""
+
+
+def cold_import(path: str = "records") -> dict:
+    # the pipeline directory is on the path too, so a flat import would load a second copy
+    env = {**os.environ, "PYTHONPATH": PROJECT_ROOT, "PYTHONDONTWRITEBYTECODE": "1"}
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT, path], cwd=PIPELINE_DIR,
+                            env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_handler_import_skips_heavy_modules():
+    modules = set(cold_import()["modules"])
+    assert [module for module in HEAVY_MODULES if module in modules] == []
+
+
+def test_handler_import_loads_each_module_once():
+    names = defaultdict(list)
+    for name, path in cold_import()["files"].items():
+        if path and path.startswith(PROJECT_ROOT):
+            names[os.path.realpath(path)].append(name)
+    assert {path: found for path, found in names.items() if len(found) > 1} == {}
+
+
+def best_import_seconds(path: str) -> float:
+    # best of three, so one slow run on a busy machine does not fail the build
+    return min(cold_import(path)["seconds"] for _ in range(3))
+
+
+def test_handler_import_within_budget():
+    seconds = best_import_seconds("records")
+    assert seconds < IMPORT_BUDGET_S, f"handler import took {seconds:.3f}s"
+
+
+def test_records_path_imports_faster_than_pandas_path():
+    records, pandas = best_import_seconds("records"), best_import_seconds("pandas")
+    assert "pandas" in cold_import("pandas")["modules"]
+    assert records < pandas, f"records path {records:.3f}s, pandas path {pandas:.3f}s"
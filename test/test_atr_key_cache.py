@@ -0,0 +1,104 @@
+# pylint: skip-file
+import pytest
+
+from src.api_to_rds_pipeline.key_cache import DimensionKeyCache, KeyIndex
+
+
+class FakeCursor:
+    def __init__(self, tables, log):
+        self.tables = tables
+        self.log = log
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.log.append(query)
+        if "UNION ALL" in query or "COUNT(*)" in query:
+            self.rows = [(name, len(rows), max((r[0] for r in rows), default=0))
+                         for name, rows in self.tables.items()]
+        else:
+            table = query.split(" FROM ")[1].rstrip(";")
+            self.rows = self.tables[table]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, tables):
+        self.tables = tables
+        self.log = []
+
+    def cursor(self):
+        return FakeCursor(self.tables, self.log)
+
+
+def test_key_index_matches_full_key():
+    index = KeyIndex([(1, "Edwardfurt", 1), (2, "Edwardfurt", 2)])
+    assert index.lookup(("Edwardfurt", 1)) == 1
+    assert index.lookup(("Edwardfurt", 2)) == 2
+    assert len(index) == 2
+
+
+def test_key_index_missing_key_is_none():
+    index = KeyIndex()
+    assert index.lookup(("Edwardfurt", 1)) is None
+    assert ("Edwardfurt", 1) not in index
+    assert index.max_id == 0
+
+
+def test_key_index_add_tracks_max_id():
+    index = KeyIndex([(4, "Liberia")])
+    index.add(("Peru",), 9)
+    assert index.lookup(("Peru",)) == 9
+    assert index.max_id == 9
+
+
+@pytest.fixture
+def conn():
+    return FakeConn({
+        "country": [(1, "Liberia"), (2, "Peru")],
+        "city": [(1, "Edwardfurt", 1)]
+    })
+
+
+@pytest.fixture
+def cache():
+    return DimensionKeyCache({"country": ["country_name"],
+                              "city": ["city_name", "country_id"]})
+
+
+def test_refresh_loads_every_table(conn, cache):
+    assert cache.refresh(conn) == ["country", "city"]
+    assert cache.lookup("country", ("Peru",)) == 2
+    assert cache.lookup("city", ("Edwardfurt", 1)) == 1
+
+
+def test_lookup_missing_key_is_none(conn, cache):
+    cache.refresh(conn)
+    assert cache.lookup("country", ("Chile",)) is None
+    assert cache.lookup("city", ("Edwardfurt", 2)) is None
+
+
+def test_refresh_skips_unchanged_tables(conn, cache):
+    cache.refresh(conn)
+    conn.log.clear()
+    assert cache.refresh(conn) == []
+    assert len(conn.log) == 1
+
+
+def test_refresh_reloads_only_changed_table(conn, cache):
+    cache.refresh(conn)
+    conn.tables["country"].append((3, "Chile"))
+    assert cache.refresh(conn) == ["country"]
+    assert cache.lookup("country", ("Chile",)) == 3
+
+
+def test_inserted_keys_keep_cache_current(conn, cache):
+    cache.refresh(conn)
+    conn.tables["country"].append((3, "Chile"))
+    cache.add("country", ("Chile",), 3, inserted=True)
+    assert cache.refresh(conn) == []
+    assert cache.lookup("country", ("Chile",)) == 3
@@ -1,11 +1,18 @@
 # pylint: skip-file
 
+from datetime import datetime
+
 import pandas as pd
 import pytest
 import dotenv
 
 from src.api_to_rds_pipeline.transform import PlantDataTransformer
-from src.api_to_rds_pipeline.load import RDS_TABLES_WITH_FK, check_table_name_valid
+from src.api_to_rds_pipeline.load import to_sql_value, batch_keys, daily_stats
+from src.api_to_rds_pipeline.rds import (RDS_TABLES_WITH_FK, check_table_name_valid,
+                                         build_merge_query, build_fact_insert_query,
+                                         build_daily_stats_merge_query,
+                                         DAILY_STATS_SOURCE_COLUMNS)
+from src.rds_to_s3_pipeline.transform import TransformRDSData
 from test_atr_transform import EXAMPLE
 
 def test_check_table_name_valid_bad_input():
@@ -31,3 +38,94 @@ def test_check_table_name_valid_good_input():
     assert check_table_name_valid("reading")
     assert check_table_name_valid("photo")
 
+
+def test_to_sql_value_nulls():
+    assert to_sql_value(None) is None
+    assert to_sql_value(float("nan")) is None
+    assert to_sql_value(pd.NaT) is None
+
+
+def test_to_sql_value_collapses_collections():
+    assert to_sql_value([]) is None
+    assert to_sql_value(["Pteridium aquilinum", "Bracken"]) == "['Pteridium aquilinum', 'Bracken']"
+
+
+def test_to_sql_value_plain_types():
+    value = to_sql_value(pd.Series([1.5]).iloc[0])
+    assert value == 1.5
+    assert type(value) is float
+    timestamp = to_sql_value(pd.Timestamp("2025-07-22T09:31:22.102Z"))
+    assert timestamp.tzinfo is None
+    assert timestamp.hour == 9
+
+
+def test_batch_keys_uses_every_column():
+    transformer = PlantDataTransformer(EXAMPLE)
+    df = transformer.transform()
+    keys = batch_keys(df, ["latitude", "longitude", "city_name"])
+    assert keys == [(54.1635, 8.6662, "Edwardfurt")]
+
+
+def test_batch_keys_sends_missing_values_as_none():
+    df = pd.DataFrame({"country_name": ["Peru", None],
+                       "last_watered": pd.to_datetime(["2025-07-22 08:00:00", None])})
+    keys = batch_keys(df, ["country_name", "last_watered"])
+    assert keys[1] == (None, None)
+    assert type(keys[0][1]) is datetime
+
+
+def test_build_merge_query_placeholders():
+    query = build_merge_query("city", 3)
+    assert query.count("%s") == 3 * len(RDS_TABLES_WITH_FK["city"])
+    assert "OUTPUT $action, inserted.id, v.city_name, v.country_id" in query
+    assert "UPDATE SET t.city_name = t.city_name" in query
+
+
+def test_build_fact_insert_query_dedupes_on_natural_key():
+    query = build_fact_insert_query("reading", 2)
+    assert query.count("%s") == 2 * len(RDS_TABLES_WITH_FK["reading"])
+    assert "t.reading_taken = v.reading_taken" in query
+    assert "t.soil_moisture = v.soil_moisture" not in query
+
+
+def test_build_queries_reject_unknown_table():
+    with pytest.raises(ValueError):
+        build_merge_query("bad", 1)
+    with pytest.raises(ValueError):
+        build_fact_insert_query("bad", 1)
+
+
+READINGS = pd.DataFrame([
+    {"id": 1, "reading_taken": "2025-07-22 08:00:00", "last_watered": "2025-07-22 06:00:00",
+     "soil_moisture": 30.0, "soil_temperature": 22.5, "plant_id": 1, "botanist_id": 1},
+    {"id": 2, "reading_taken": "2025-07-22 10:00:00", "last_watered": "2025-07-22 08:30:00",
+     "soil_moisture": 40.0, "soil_temperature": 23.0, "plant_id": 1, "botanist_id": 2},
+    {"id": 3, "reading_taken": "2025-07-22 09:00:00", "last_watered": "2025-07-21 20:00:00",
+     "soil_moisture": 50.0, "soil_temperature": 21.0, "plant_id": 2, "botanist_id": 1}
+])
+
+
+def test_daily_stats_aggregates_per_plant():
+    stats = daily_stats(READINGS).set_index("plant_id")
+    assert set(DAILY_STATS_SOURCE_COLUMNS) == set(stats.reset_index().columns)
+    assert stats.loc[1, "reading_count"] == 2
+    assert stats.loc[1, "moisture_min"] == 30.0
+    assert stats.loc[1, "latest_soil_moisture"] == 40.0
+    assert stats.loc[1, "latest_botanist_id"] == 2
+    assert stats.loc[1, "new_waterings"] == 2
+    assert stats.loc[2, "new_waterings"] == 0
+    assert pd.isna(stats.loc[2, "last_watering_today"])
+
+
+def test_daily_stats_summary_matches_nightly_summary():
+    expected = TransformRDSData({"reading": READINGS.copy()}).create_summary()
+    # a single batch stored as-is: its new waterings are the day's watering count
+    stored = daily_stats(READINGS).rename(columns={"new_waterings": "watering_count"})
+    summary = TransformRDSData({}).summary_from_daily_stats(stored)
+    pd.testing.assert_frame_equal(summary, expected)
+
+
+def test_build_daily_stats_merge_query_placeholders():
+    query = build_daily_stats_merge_query(4)
+    assert query.count("%s") == 4 * len(DAILY_STATS_SOURCE_COLUMNS)
+    assert "v.new_waterings" in query
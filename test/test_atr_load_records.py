@@ -0,0 +1,155 @@
+# pylint: skip-file
+import pytest
+
+from src.api_to_rds_pipeline import load, load_records
+from src.api_to_rds_pipeline.key_cache import DimensionKeyCache
+from src.api_to_rds_pipeline.load import DataLoader, daily_stats, to_sql_value
+from src.api_to_rds_pipeline.load_records import RecordLoader, daily_stats_rows
+from src.api_to_rds_pipeline.rds import (RDS_TABLES_WITH_FK, DIMENSION_LOAD_ORDER,
+                                         DAILY_STATS_SOURCE_COLUMNS, merge_dimension_keys)
+from src.api_to_rds_pipeline.transform import PlantDataTransformer
+from src.api_to_rds_pipeline.transform_records import PlantRecordTransformer
+from test_atr_load import READINGS
+from test_atr_transform import MIXED
+
+
+class RecordingCursor:
+    """Answers the loader's statements like an empty RDS would, recording each one"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.conn.statements.append((" ".join(query.split()), params))
+        self.rows = []
+        if "UNION ALL" in query:
+            self.rows = [(table, 0, 0) for table in DIMENSION_LOAD_ORDER]
+        for table in DIMENSION_LOAD_ORDER:
+            if query.lstrip().startswith(f"MERGE INTO {table} "):
+                width = len(RDS_TABLES_WITH_FK[table])
+                self.rows = [("INSERT", self.conn.next_id(), *params[i:i+width])
+                             for i in range(0, len(params), width)]
+        if query.lstrip().startswith("INSERT INTO reading"):
+            width = len(RDS_TABLES_WITH_FK["reading"])
+            self.rows = [(self.conn.next_id(), *params[i:i+width])
+                         for i in range(0, len(params), width)]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class RecordingConn:
+    def __init__(self):
+        self.statements = []
+        self.ids = 0
+        self.commits = 0
+        self.closes = 0
+
+    def next_id(self):
+        self.ids += 1
+        return self.ids
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        self.closes += 1
+
+
+class DroppingCursor(RecordingCursor):
+    """Loses the first row a MERGE outputs, as if its key came back changed"""
+
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        if query.lstrip().startswith("MERGE INTO"):
+            self.rows = self.rows[1:]
+
+
+class DroppingConn(RecordingConn):
+    def cursor(self):
+        return DroppingCursor(self)
+
+
+def dimension_cache():
+    return DimensionKeyCache({table: RDS_TABLES_WITH_FK[table] for table in DIMENSION_LOAD_ORDER})
+
+
+def test_daily_stats_rows_match_dataframe_path():
+    inserted = list(READINGS.itertuples(index=False, name=None))
+    expected = [tuple(to_sql_value(value) for value in row)
+                for row in daily_stats(READINGS)[DAILY_STATS_SOURCE_COLUMNS].itertuples(index=False)]
+    assert daily_stats_rows(inserted) == expected
+
+
+def test_record_loader_sends_same_statements_as_data_loader(monkeypatch):
+    pandas_conn, records_conn = RecordingConn(), RecordingConn()
+    monkeypatch.setattr(load, "get_conn", lambda: pandas_conn)
+    monkeypatch.setattr(load_records, "get_conn", lambda: records_conn)
+    df = PlantDataTransformer(MIXED).transform()
+    DataLoader(df, dimension_cache()).upload_tables_to_rds_bulk()
+    columns = PlantRecordTransformer(MIXED).transform()
+    RecordLoader(columns, dimension_cache()).upload_tables_to_rds_bulk()
+
+    assert records_conn.statements == pandas_conn.statements
+    assert any("plant_daily_stats" in query for query, _ in records_conn.statements)
+    assert records_conn.commits == pandas_conn.commits == 1
+
+
+def test_data_loader_loads_plants_with_empty_scientific_names(monkeypatch):
+    conn = RecordingConn()
+    monkeypatch.setattr(load, "get_conn", lambda: conn)
+    df = PlantDataTransformer(MIXED).transform()
+    assert 12 in set(df["plant_id"])
+    DataLoader(df, dimension_cache()).upload_tables_to_rds_bulk()
+    plant_merge = next(params for query, params in conn.statements
+                       if query.startswith("MERGE INTO plant "))
+    assert None in plant_merge[1::3]
+    assert conn.commits == 1
+
+
+def test_record_loader_rejects_empty_columns():
+    with pytest.raises(ValueError):
+        RecordLoader({"plant_id": []})
+    with pytest.raises(ValueError):
+        RecordLoader([])
+
+
+def test_merge_dimension_keys_returns_an_id_per_key():
+    keys = [("Peru",), ("Chile",), ("Peru",)]
+    ids = merge_dimension_keys(RecordingConn(), dimension_cache(), "country", keys)
+    assert ids[0] == ids[2] and None not in ids
+
+
+def test_merge_dimension_keys_refuses_unresolved_keys():
+    with pytest.raises(RuntimeError, match="Peru"):
+        merge_dimension_keys(DroppingConn(), dimension_cache(), "country",
+                             [("Peru",), ("Chile",)])
+
+
+def test_merge_dimension_keys_sends_collation_variants_once():
+    conn = RecordingConn()
+    keys = [("Peru",), ("peru ",), ("Chile",)]
+    ids = merge_dimension_keys(conn, dimension_cache(), "country", keys)
+    assert conn.statements[0][1] == ("Peru", "Chile")
+    assert ids[0] == ids[1] != ids[2]
+
+
+def test_loaders_release_connection_when_load_fails(monkeypatch):
+    pandas_conn, records_conn = DroppingConn(), DroppingConn()
+    monkeypatch.setattr(load, "get_conn", lambda: pandas_conn)
+    monkeypatch.setattr(load_records, "get_conn", lambda: records_conn)
+    with pytest.raises(RuntimeError):
+        DataLoader(PlantDataTransformer(MIXED).transform(),
+                   dimension_cache()).upload_tables_to_rds_bulk()
+    with pytest.raises(RuntimeError):
+        RecordLoader(PlantRecordTransformer(MIXED).transform(),
+                     dimension_cache()).upload_tables_to_rds_bulk()
+    for conn in (pandas_conn, records_conn):
+        assert conn.commits == 0 and conn.closes == 1
@@ -0,0 +1,65 @@
+# pylint: skip-file
+import pytest
+
+from src.api_to_rds_pipeline.extract import PlantGetter, START_ID, MAX_404_ERRORS
+from src.api_to_rds_pipeline.registry import (EndpointRegistry, DEAD_AFTER_MISSES,
+                                              DEAD_PROBE_INTERVAL, LIVE, DEAD)
+from benchmarks.mock_plant_api import MockPlantAPI
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return EndpointRegistry.from_file(str(tmp_path / "registry.json"))
+
+
+def test_missing_file_starts_empty(registry):
+    assert registry.endpoints == {}
+    assert registry.discovery_start() == 1
+    assert registry.due_ids() == []
+
+
+def test_id_dies_after_repeated_misses(registry):
+    registry.record({1: {"plant_id": 1}})
+    for _ in range(DEAD_AFTER_MISSES - 1):
+        registry.record({1: {"error": "404 Not Found", "id": 1}})
+        assert registry.endpoints[1]["state"] == LIVE
+    registry.record({1: {"error": "404 Not Found", "id": 1}})
+    assert registry.endpoints[1]["state"] == DEAD
+
+
+def test_dead_ids_are_reprobed_once_per_interval(registry):
+    registry.record({i: {"plant_id": i} for i in range(1, 11)})
+    for i in range(1, 10):
+        registry.endpoints[i]["state"] = DEAD
+    due_counts = []
+    for _ in range(DEAD_PROBE_INTERVAL):
+        due_counts.append(len(registry.due_ids()))
+        registry.run += 1
+    # the 9 dead IDs are spread over the interval, and the live one is always due
+    assert sum(due_counts) == DEAD_PROBE_INTERVAL + 9
+
+
+def test_registry_round_trips_through_file(registry):
+    registry.record({3: {"plant_id": 3}})
+    registry.save()
+    loaded = EndpointRegistry.from_file(registry.path)
+    assert loaded.endpoints[3]["state"] == LIVE
+    assert loaded.run == 1
+
+
+def test_registry_skips_dead_ids_on_later_runs(registry):
+    dead = set(range(5, 5 + MAX_404_ERRORS - 1))
+    with MockPlantAPI(20) as api:
+        PlantGetter(api.url, START_ID, MAX_404_ERRORS).loop_ids_async(
+            concurrency=5, registry=registry)
+        api.missing_ids = dead
+        for _ in range(DEAD_AFTER_MISSES):
+            assert all(registry.endpoints[i]["state"] == LIVE for i in dead)
+            PlantGetter(api.url, START_ID, MAX_404_ERRORS).loop_ids_async(
+                concurrency=5, registry=registry)
+        assert all(registry.endpoints[i]["state"] == DEAD for i in dead)
+        api.requested_ids.clear()
+        data = PlantGetter(api.url, START_ID, MAX_404_ERRORS).loop_ids_async(
+            concurrency=5, registry=registry)
+    assert [plant["plant_id"] for plant in data] == [i for i in range(1, 21) if i not in dead]
+    assert not dead & set(api.requested_ids)
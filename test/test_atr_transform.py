@@ -61,3 +61,66 @@ def test_invalid_timestamp_is_handled():
     assert pd.api.types.is_datetime64_any_dtype(
         df["reading_taken"])  #  column type remains
     assert pd.isna(df.loc[0, "reading_taken"])  # becomes NaT
+
+
+MIXED = EXAMPLE + [
+    {"plant_id": 9, "temperature": 70, "soil_moisture": 40, "recording_taken": "2025-07-22T09:32:00.000Z"},
+    {"plant_id": 10, "name": "Fern", "temperature": "12.5", "soil_moisture": 55.1,
+     "recording_taken": "2025-07-22T09:33:00.000Z", "images": None, "botanist": {"name": "Gertrude"},
+     "scientific_name": "Pteridium aquilinum"},
+    {"plant_id": 11, "temperature": 20, "recording_taken": "2025-07-22T09:34:00.000Z"},
+    {"plant_id": 12, "temperature": 21, "soil_moisture": 30, "recording_taken": "lol",
+     "origin_location": {"city": "Lima", "country": "Peru"}, "scientific_name": []}
+]
+
+
+def test_columnar_matches_row_by_row():
+    expected = PlantDataTransformer(MIXED).transform(columnar=False)
+    result = PlantDataTransformer(MIXED).transform(columnar=True)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_columnar_no_required_fields():
+    transformer = PlantDataTransformer(
+        [{"plant_id": 8, "temperature": 16.29981566929083, "recording_taken": "2025-07-22T09:31:22.102Z"}])
+    transformer.create_dataframe_columnar()
+    assert transformer.df.empty
+
+
+def test_rejects_carry_reason_codes():
+    transformer = PlantDataTransformer(MIXED)
+    transformer.transform()
+    reasons = dict(zip(transformer.rejects["plant_id"], transformer.rejects["reject_reason"]))
+    assert reasons == {9: "temperature_out_of_range"}
+    assert list(transformer.df["plant_id"]) == [8, 10, 12]
+
+
+def test_rejects_keep_raw_values():
+    transformer = PlantDataTransformer(
+        [{"plant_id": 8, "temperature": "hot", "soil_moisture": -5, "recording_taken": "2025-07-22T09:31:22.102Z"}])
+    transformer.transform()
+    reject = transformer.rejects.iloc[0]
+    assert reject["soil_temperature"] == "hot"
+    assert reject["reject_reason"] == "temperature_not_numeric"
+
+
+def test_custom_rules():
+    rules = [{"code": "too_dry", "column": "soil_moisture", "kind": "range", "min": 50}]
+    transformer = PlantDataTransformer(MIXED, rules=rules)
+    transformer.transform()
+    assert list(transformer.df["plant_id"]) == [10]
+    assert set(transformer.rejects["reject_reason"]) == {"too_dry"}
+
+
+def test_write_rejects(tmp_path):
+    transformer = PlantDataTransformer(MIXED)
+    transformer.transform()
+    path = transformer.write_rejects(str(tmp_path))
+    written = pd.read_csv(path)
+    assert list(written["reject_reason"]) == ["temperature_out_of_range"]
+
+
+def test_write_rejects_nothing_rejected(tmp_path):
+    transformer = PlantDataTransformer(EXAMPLE)
+    transformer.transform()
+    assert transformer.write_rejects(str(tmp_path)) is None
@@ -0,0 +1,86 @@
+# pylint: skip-file
+import csv
+from datetime import datetime, timezone
+
+from src.api_to_rds_pipeline.transform import PlantDataTransformer
+from src.api_to_rds_pipeline.transform_records import (PlantRecordTransformer, to_number,
+                                                       to_timestamp, COLUMN_SPEC)
+from src.api_to_rds_pipeline.load import to_sql_value
+from src.api_to_rds_pipeline.load_records import sql_value
+from test_atr_transform import EXAMPLE, MIXED
+
+
+def test_to_number():
+    assert to_number(12) == 12
+    assert to_number("12.5") == 12.5
+    assert to_number("hot") is None
+    assert to_number(None) is None
+    assert to_number(float("nan")) is None
+    assert to_number(True) is None
+
+
+def test_to_timestamp():
+    parsed = to_timestamp("2025-07-22T09:31:22.102Z")
+    assert parsed == datetime(2025, 7, 22, 9, 31, 22, 102000, tzinfo=timezone.utc)
+    assert to_timestamp("lol") is None
+    assert to_timestamp(None) is None
+
+
+def test_columns_match_dataframe_path():
+    expected = PlantDataTransformer(MIXED).transform()
+    transformer = PlantRecordTransformer(MIXED)
+    columns = transformer.transform()
+    assert list(columns) == list(COLUMN_SPEC)
+    for column in COLUMN_SPEC:
+        assert ([sql_value(value) for value in columns[column]]
+                == [to_sql_value(value) for value in expected[column]]), column
+
+
+def test_rejects_match_dataframe_path():
+    expected = PlantDataTransformer(MIXED)
+    expected.transform()
+    transformer = PlantRecordTransformer(MIXED)
+    transformer.transform()
+    assert ([(row["plant_id"], row["reject_reason"]) for row in transformer.rejects]
+            == list(zip(expected.rejects["plant_id"], expected.rejects["reject_reason"])))
+
+
+def test_rejects_keep_raw_values():
+    transformer = PlantRecordTransformer(
+        [{"plant_id": 8, "temperature": "hot", "soil_moisture": -5, "recording_taken": "2025-07-22T09:31:22.102Z"}])
+    transformer.transform()
+    assert len(transformer) == 0
+    assert transformer.rejects[0]["soil_temperature"] == "hot"
+    assert transformer.rejects[0]["reject_reason"] == "temperature_not_numeric"
+
+
+def test_missing_required_field_is_skipped():
+    transformer = PlantRecordTransformer(
+        [{"plant_id": 8, "temperature": 16.3, "recording_taken": "2025-07-22T09:31:22.102Z"}])
+    transformer.transform()
+    assert len(transformer) == 0
+    assert transformer.rejects == []
+
+
+def test_custom_rules():
+    rules = [{"code": "too_dry", "column": "soil_moisture", "kind": "range", "min": 50}]
+    transformer = PlantRecordTransformer(MIXED, rules=rules)
+    columns = transformer.transform()
+    assert columns["plant_id"] == [10]
+    assert {row["reject_reason"] for row in transformer.rejects} == {"too_dry"}
+
+
+def test_write_rejects(tmp_path):
+    transformer = PlantRecordTransformer(MIXED)
+    transformer.transform()
+    path = transformer.write_rejects(str(tmp_path))
+    with open(path, newline="") as f:
+        written = list(csv.DictReader(f))
+    assert [row["reject_reason"] for row in written] == ["temperature_out_of_range"]
+    assert written[0]["soil_temperature"] == "70"
+
+
+def test_write_rejects_nothing_rejected(tmp_path):
+    transformer = PlantRecordTransformer(EXAMPLE)
+    transformer.transform()
+    assert transformer.write_rejects(str(tmp_path)) is None
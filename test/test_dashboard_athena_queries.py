@@ -0,0 +1,44 @@
+# pylint: skip-file
+from datetime import date
+
+import pytest
+
+from src.dashboard.athena_queries import (date_key, partition_predicate,
+                                          plant_means_query, plant_watering_query,
+                                          daily_means_query)
+
+
+def test_date_key_orders_like_dates():
+    assert date_key(date(2025, 7, 22)) == 20250722
+    assert date_key(date(2024, 12, 31)) < date_key(date(2025, 1, 1))
+
+
+def test_partition_predicate_uses_partition_columns():
+    predicate = partition_predicate(date(2025, 6, 30), date(2025, 7, 2))
+    assert "summary.year" in predicate
+    assert "summary.month" in predicate
+    assert "summary.day" in predicate
+    assert predicate.endswith("BETWEEN 20250630 AND 20250702")
+
+
+def test_partition_predicate_rejects_inverted_range():
+    with pytest.raises(ValueError):
+        partition_predicate(date(2025, 7, 2), date(2025, 7, 1))
+
+
+@pytest.mark.parametrize("build", [plant_means_query, plant_watering_query,
+                                   daily_means_query])
+def test_every_query_is_partition_pruned(build):
+    query = build(date(2025, 7, 1), date(2025, 7, 7))
+    assert partition_predicate(date(2025, 7, 1), date(2025, 7, 7)) in query
+
+
+def test_aggregations_happen_in_sql():
+    assert "GROUP BY summary.plant_id" in plant_means_query(date(2025, 7, 1), date(2025, 7, 7))
+    assert "AVG(summary.watering_count)" in plant_watering_query(date(2025, 7, 1), date(2025, 7, 7))
+
+
+@pytest.mark.parametrize("build", [plant_means_query, plant_watering_query,
+                                   daily_means_query])
+def test_queries_do_not_join_dimensions(build):
+    assert "JOIN" not in build(date(2025, 7, 1), date(2025, 7, 7))
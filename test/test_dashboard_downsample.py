@@ -0,0 +1,49 @@
+# pylint: skip-file
+import numpy as np
+import pandas as pd
+
+from src.dashboard.downsample import (lttb, lttb_indices, choose_bucket,
+                                      bucket_min_mean_max)
+
+
+def make_series(n, spike_at=None):
+    times = pd.date_range("2025-07-22", periods=n, freq="10s")
+    values = np.sin(np.arange(n) / 50) * 10 + 40
+    if spike_at is not None:
+        values[spike_at] = 95
+    return pd.DataFrame({"reading_taken": times, "soil_moisture": values})
+
+
+def test_lttb_returns_requested_size_with_endpoints():
+    df = make_series(10_000)
+    points = lttb(df, "reading_taken", "soil_moisture", 500)
+    assert len(points) == 500
+    assert points["reading_taken"].iloc[0] == df["reading_taken"].iloc[0]
+    assert points["reading_taken"].iloc[-1] == df["reading_taken"].iloc[-1]
+    assert points["reading_taken"].is_monotonic_increasing
+
+
+def test_lttb_keeps_spike():
+    df = make_series(10_000, spike_at=4321)
+    points = lttb(df, "reading_taken", "soil_moisture", 200)
+    assert points["soil_moisture"].max() == 95
+
+
+def test_lttb_short_series_unchanged():
+    assert list(lttb_indices(np.arange(5.0), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+
+
+def test_choose_bucket_scales_with_window():
+    start = pd.Timestamp("2025-07-22")
+    assert choose_bucket(start, start + pd.Timedelta(hours=6)) == "1min"
+    assert choose_bucket(start, start + pd.Timedelta(days=1)) == "5min"
+    assert choose_bucket(start, start + pd.Timedelta(days=7)) == "1h"
+
+
+def test_buckets_keep_extremes():
+    df = make_series(360, spike_at=100)
+    buckets = bucket_min_mean_max(df, "reading_taken", "soil_moisture", "5min")
+    assert len(buckets) == 12
+    assert list(buckets.columns) == ["reading_taken", "min", "mean", "max"]
+    assert buckets["max"].max() == 95
+    assert buckets["min"].min() == df["soil_moisture"].min()
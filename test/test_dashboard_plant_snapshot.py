@@ -0,0 +1,66 @@
+# pylint: skip-file
+import io
+
+import pandas as pd
+
+from src.dashboard.plant_snapshot import PlantSnapshot, denormalise, metadata_key
+
+TABLES = {
+    "plant": pd.DataFrame({"id": [1, 2], "english_name": ["Rose", "Fern"],
+                           "scientific_name": ["Rosa", "Filix"], "origin_id": [10, 11]}),
+    "origin": pd.DataFrame({"id": [10, 11], "latitude": [1.0, 2.0],
+                            "longitude": [1.0, 2.0], "city_id": [100, 101]}),
+    "city": pd.DataFrame({"id": [100, 101], "city_name": ["Leeds", "Lyon"],
+                          "country_id": [7, 8]}),
+    "country": pd.DataFrame({"id": [7, 8], "country_name": ["UK", "France"]}),
+}
+
+
+class FakeS3:
+    def __init__(self):
+        self.etags = {metadata_key(t): f'"{t}-1"' for t in TABLES}
+        self.gets = 0
+
+    def head_object(self, Bucket, Key):
+        return {"ETag": self.etags[Key], "LastModified": "2025-07-22"}
+
+    def get_object(self, Bucket, Key):
+        self.gets += 1
+        table = Key.split("/")[1]
+        buffer = io.BytesIO()
+        TABLES[table].to_parquet(buffer, index=False)
+        return {"Body": io.BytesIO(buffer.getvalue())}
+
+
+def test_denormalise_one_row_per_plant():
+    plants = denormalise(TABLES)
+    assert list(plants["plant_id"]) == [1, 2]
+    assert list(plants["country_name"]) == ["UK", "France"]
+    assert list(plants["city_name"]) == ["Leeds", "Lyon"]
+
+
+def test_refresh_skips_download_when_etags_match(tmp_path):
+    s3 = FakeS3()
+    snapshot = PlantSnapshot(s3, snapshot_dir=str(tmp_path))
+    assert snapshot.refresh()
+    assert s3.gets == 4
+    assert not snapshot.refresh()
+    assert s3.gets == 4
+
+
+def test_refresh_rebuilds_when_an_object_changes(tmp_path):
+    s3 = FakeS3()
+    snapshot = PlantSnapshot(s3, snapshot_dir=str(tmp_path))
+    snapshot.refresh()
+    s3.etags[metadata_key("city")] = '"city-2"'
+    assert snapshot.refresh()
+    assert s3.gets == 8
+
+
+def test_new_process_reuses_snapshot_on_disk(tmp_path):
+    PlantSnapshot(FakeS3(), snapshot_dir=str(tmp_path)).refresh()
+    s3 = FakeS3()
+    snapshot = PlantSnapshot(s3, snapshot_dir=str(tmp_path))
+    assert len(snapshot.plants) == 2
+    assert not snapshot.refresh()
+    assert s3.gets == 0
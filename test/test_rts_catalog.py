@@ -0,0 +1,98 @@
+# pylint: skip-file
+from datetime import date
+
+import pytest
+
+from src.rds_to_s3_pipeline.catalog import (catalogue_table, partition_input,
+                                            register_partitions, schema_matches)
+
+READING_TABLE = {
+    "Name": "reading",
+    "StorageDescriptor": {
+        "Location": "s3://bucket/input/reading/",
+        "Columns": [{"Name": name, "Type": "string"} for name in
+                    ["id", "reading_taken", "last_watered", "soil_moisture",
+                     "soil_temperature", "plant_id", "botanist_id"]],
+        "InputFormat": "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+    },
+    "PartitionKeys": [{"Name": key, "Type": "string"} for key in ["year", "month", "day"]],
+}
+COLUMNS = ["id", "reading_taken", "last_watered", "soil_moisture", "soil_temperature",
+           "plant_id", "botanist_id", "year", "month", "day"]
+
+
+class EntityNotFoundException(Exception):
+    pass
+
+
+class StubGlue:
+    class exceptions:
+        EntityNotFoundException = EntityNotFoundException
+
+    def __init__(self, tables=None, existing=(), fail=False):
+        self.tables = tables or {}
+        self.partitions = {tuple(values) for values in existing}
+        self.fail = fail
+        self.calls = []
+
+    def get_table(self, DatabaseName, Name):
+        if Name not in self.tables:
+            raise EntityNotFoundException(Name)
+        return {"Table": self.tables[Name]}
+
+    def batch_create_partition(self, DatabaseName, TableName, PartitionInputList):
+        self.calls.append(PartitionInputList)
+        errors = []
+        for partition in PartitionInputList:
+            values = tuple(partition["Values"])
+            if self.fail:
+                errors.append({"PartitionValues": list(values),
+                               "ErrorDetail": {"ErrorCode": "InternalServiceException"}})
+            elif values in self.partitions:
+                errors.append({"PartitionValues": list(values),
+                               "ErrorDetail": {"ErrorCode": "AlreadyExistsException"}})
+            else:
+                self.partitions.add(values)
+        return {"Errors": errors}
+
+
+def test_partition_input_points_under_table_location():
+    partition = partition_input(READING_TABLE, date(2025, 7, 2))
+    assert partition["Values"] == ["2025", "7", "2"]
+    assert partition["StorageDescriptor"]["Location"] == \
+        "s3://bucket/input/reading/year=2025/month=7/day=2/"
+    assert partition["StorageDescriptor"]["InputFormat"] == \
+        READING_TABLE["StorageDescriptor"]["InputFormat"]
+    assert READING_TABLE["StorageDescriptor"]["Location"] == "s3://bucket/input/reading/"
+
+
+def test_existing_partitions_are_not_errors():
+    glue = StubGlue({"reading": READING_TABLE}, existing=[["2025", "7", "21"]])
+    created = register_partitions(glue, "db", READING_TABLE,
+                                  [date(2025, 7, 21), date(2025, 7, 22)])
+    assert created == 1
+    assert ("2025", "7", "22") in glue.partitions
+
+
+def test_other_errors_raise():
+    glue = StubGlue({"reading": READING_TABLE}, fail=True)
+    with pytest.raises(RuntimeError):
+        register_partitions(glue, "db", READING_TABLE, [date(2025, 7, 22)])
+
+
+def test_schema_matches_counts_partition_keys():
+    assert schema_matches(READING_TABLE, COLUMNS)
+    assert not schema_matches(READING_TABLE, COLUMNS + ["soil_ph"])
+
+
+def test_catalogue_registers_known_table():
+    glue = StubGlue({"reading": READING_TABLE})
+    assert catalogue_table(glue, "db", "reading", [date(2025, 7, 22)], COLUMNS)
+    assert glue.partitions == {("2025", "7", "22")}
+
+
+def test_catalogue_asks_for_crawl_on_new_table_or_columns():
+    assert not catalogue_table(StubGlue(), "db", "reading", [date(2025, 7, 22)], COLUMNS)
+    glue = StubGlue({"reading": READING_TABLE})
+    assert not catalogue_table(glue, "db", "reading", [date(2025, 7, 22)], COLUMNS + ["soil_ph"])
+    assert glue.calls == []
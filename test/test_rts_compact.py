@@ -0,0 +1,120 @@
+# pylint: skip-file
+import os
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from src.rds_to_s3_pipeline import compact
+from src.rds_to_s3_pipeline.compact import (compact_partition, compact_days,
+                                            partition_path, list_parquet_files)
+
+
+def make_readings(ids):
+    return pd.DataFrame({
+        "id": ids,
+        "reading_taken": [pd.Timestamp("2025-07-22 08:00") + pd.Timedelta(minutes=i) for i in ids],
+        "last_watered": pd.Timestamp("2025-07-22 06:00"),
+        "soil_moisture": [30.0 + i for i in ids],
+        "soil_temperature": 20.0,
+        "plant_id": [(i * 7) % 5 + 1 for i in ids],
+        "botanist_id": 1,
+    })
+
+
+def write_small_files(path, id_batches):
+    os.makedirs(path, exist_ok=True)
+    for n, ids in enumerate(id_batches):
+        make_readings(ids).to_parquet(f"{path}/part-{n}.parquet", index=False)
+
+
+def test_partition_path_matches_wrangler_layout():
+    assert partition_path("bucket/input/reading", date(2025, 7, 2)) == \
+        "bucket/input/reading/year=2025/month=7/day=2"
+
+
+def test_compaction_merges_sorts_and_dedupes(tmp_path):
+    path = str(tmp_path / "year=2025/month=7/day=22")
+    write_small_files(path, [range(1, 11), range(11, 21), range(15, 25)])
+    local = fs.LocalFileSystem()
+
+    written = compact_partition(local, path, row_group_size=4)
+
+    assert len(written) == 1
+    assert list_parquet_files(local, path) == written
+    table = pq.read_table(written[0])
+    assert sorted(table["id"].to_pylist()) == list(range(1, 25))
+    df = table.to_pandas()
+    assert df.equals(df.sort_values(["plant_id", "reading_taken"]).reset_index(drop=True))
+
+    metadata = pq.ParquetFile(written[0]).metadata
+    assert metadata.num_row_groups == 6
+    first_group = metadata.row_group(0).column(5)
+    assert first_group.statistics.has_min_max
+    assert first_group.compression == "ZSTD"
+
+
+def test_compaction_splits_large_partitions(tmp_path):
+    path = str(tmp_path / "day")
+    write_small_files(path, [range(1, 51), range(51, 101)])
+    written = compact_partition(fs.LocalFileSystem(), path, target_rows=30)
+    assert len(written) == 4
+    assert sum(pq.read_metadata(file).num_rows for file in written) == 100
+
+
+def test_compacted_partition_is_left_alone(tmp_path):
+    path = str(tmp_path / "day")
+    write_small_files(path, [range(1, 5), range(5, 9)])
+    local = fs.LocalFileSystem()
+    first = compact_partition(local, path)
+    assert compact_partition(local, path) == first
+
+
+def test_compact_days_skips_missing_partitions(tmp_path):
+    root = str(tmp_path)
+    write_small_files(partition_path(root, date(2025, 7, 22)), [range(1, 5), range(5, 9)])
+    result = compact_days(fs.LocalFileSystem(), root, [date(2025, 7, 21), date(2025, 7, 22)])
+    assert result[date(2025, 7, 21)] == []
+    assert len(result[date(2025, 7, 22)]) == 1
+
+
+def test_compaction_keeps_the_latest_copy_of_each_reading(tmp_path):
+    path = str(tmp_path / "day")
+    os.makedirs(path)
+    make_readings(range(1, 21)).to_parquet(f"{path}/part-0.parquet", index=False)
+    rerun = make_readings(range(15, 25))
+    rerun["soil_moisture"] += 100
+    rerun.to_parquet(f"{path}/part-1.parquet", index=False)
+
+    written = compact_partition(fs.LocalFileSystem(), path, batch_rows=3)
+
+    df = pq.read_table(written[0]).to_pandas().set_index("id")
+    assert sorted(df.index) == list(range(1, 25))
+    assert (df.loc[list(range(15, 25)), "soil_moisture"] >= 100).all()
+    assert (df.loc[list(range(1, 15)), "soil_moisture"] < 100).all()
+
+
+def test_compaction_memory_stays_below_the_partition_size(tmp_path, monkeypatch):
+    path = str(tmp_path / "day")
+    write_small_files(path, [range(start, start + 2000) for start in range(1, 40_000, 2000)])
+    expected = make_readings(range(1, 40_001)).sort_values(["plant_id", "reading_taken"])
+    full_size = pa.Table.from_pandas(expected).nbytes
+    allocated = []
+    rows_to_table = compact.rows_to_table
+
+    def measuring_rows_to_table(rows):
+        allocated.append(pa.total_allocated_bytes())
+        return rows_to_table(rows)
+
+    monkeypatch.setattr(compact, "rows_to_table", measuring_rows_to_table)
+    baseline = pa.total_allocated_bytes()
+    written = compact_partition(fs.LocalFileSystem(), path, target_rows=16_000,
+                                row_group_size=500, batch_rows=100)
+
+    # one 100-row batch per input file is buffered while merging, never the whole day
+    assert max(allocated) - baseline < full_size / 4
+    assert [pq.read_metadata(file).num_rows for file in written] == [16_000, 16_000, 8000]
+    df = pd.concat(pq.read_table(file).to_pandas() for file in written)
+    assert df["id"].tolist() == expected["id"].tolist()
@@ -0,0 +1,93 @@
+# pylint: skip-file
+from datetime import datetime
+
+import pandas as pd
+
+from src.rds_to_s3_pipeline.extract import RDSDataGetter, rows_to_frame
+
+COLUMNS = ['id', 'reading_taken', 'last_watered', 'soil_moisture',
+           'soil_temperature', 'plant_id', 'botanist_id']
+ROWS = [(i, datetime(2025, 7, 22, 8, i), None, 30.0 + i, 20.0, i % 3 + 1, None)
+        for i in range(1, 8)]
+
+
+class FakeCursor:
+    description = [(column,) for column in COLUMNS]
+
+    def __init__(self):
+        self.remaining = list(ROWS)
+        self.closed = False
+
+    def execute(self, query):
+        self.query = query
+
+    def fetchmany(self, size):
+        batch, self.remaining = self.remaining[:size], self.remaining[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConn:
+    def __init__(self):
+        self.cur = FakeCursor()
+        self.closed = False
+
+    def cursor(self):
+        return self.cur
+
+    def close(self):
+        self.closed = True
+
+
+def make_getter():
+    getter = RDSDataGetter.__new__(RDSDataGetter)
+    getter.conn = FakeConn()
+    return getter
+
+
+def test_rows_to_frame_types_every_column():
+    df = rows_to_frame(ROWS, COLUMNS)
+    assert pd.api.types.is_datetime64_any_dtype(df['reading_taken'])
+    assert pd.api.types.is_datetime64_any_dtype(df['last_watered'])
+    assert df['soil_moisture'].dtype == 'float64'
+    assert df['botanist_id'].dtype == 'Int64'
+
+
+def test_iter_readings_streams_in_batches():
+    getter = make_getter()
+    chunks = list(getter.iter_readings(batch_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert list(pd.concat(chunks)['id']) == list(range(1, 8))
+
+
+def test_iter_readings_closes_connection():
+    getter = make_getter()
+    list(getter.iter_readings(batch_size=3))
+    assert getter.conn.cur.closed
+    assert getter.conn.closed
+
+
+class ProbeCursor:
+    def execute(self, query):
+        self.tables = [part.split("FROM ")[1].rstrip(";") for part in query.split(" UNION ALL ")]
+
+    def fetchall(self):
+        return [(table, 2, 7) for table in self.tables]
+
+    def close(self):
+        pass
+
+
+class ProbeConn:
+    def cursor(self):
+        return ProbeCursor()
+
+
+def test_probe_metadata_covers_every_table_in_one_query():
+    getter = RDSDataGetter.__new__(RDSDataGetter)
+    getter.conn = ProbeConn()
+    probes = getter.probe_metadata()
+    assert set(probes) == set(RDSDataGetter.METADATA_TABLES)
+    assert probes['plant'] == (2, 7)
@@ -0,0 +1,43 @@
+# pylint: skip-file
+import pandas as pd
+
+from src.rds_to_s3_pipeline.manifest import MetadataManifest, table_hash, table_probe
+
+BOTANISTS = pd.DataFrame({
+    "id": [1, 2, 3],
+    "botanist_name": ["Ann", "Bob", None],
+    "botanist_email": ["a@x.com", "b@x.com", "c@x.com"],
+})
+
+
+def test_hash_ignores_row_and_column_order():
+    shuffled = BOTANISTS.iloc[[2, 0, 1]][["botanist_email", "id", "botanist_name"]]
+    assert table_hash(shuffled) == table_hash(BOTANISTS)
+
+
+def test_hash_changes_with_contents():
+    edited = BOTANISTS.copy()
+    edited.loc[1, "botanist_email"] = "bob@x.com"
+    assert table_hash(edited) != table_hash(BOTANISTS)
+    assert table_hash(BOTANISTS.iloc[:2]) != table_hash(BOTANISTS)
+
+
+def test_hash_changes_with_dtype():
+    assert table_hash(BOTANISTS.astype({"id": "float64"})) != table_hash(BOTANISTS)
+
+
+def test_manifest_detects_changes_and_round_trips():
+    manifest = MetadataManifest()
+    content_hash = table_hash(BOTANISTS)
+    assert manifest.content_changed("botanist", content_hash)
+    assert manifest.probe_changed("botanist", (3, 3))
+
+    manifest.record("botanist", content_hash, table_probe(BOTANISTS))
+    loaded = MetadataManifest.from_json(manifest.to_json())
+    assert not loaded.content_changed("botanist", content_hash)
+    assert not loaded.probe_changed("botanist", (3, 3))
+    assert loaded.probe_changed("botanist", (4, 4))
+
+
+def test_probe_of_empty_table():
+    assert table_probe(BOTANISTS.iloc[:0]) == (0, 0)
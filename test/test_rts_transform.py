@@ -3,7 +3,7 @@
 import pandas as pd
 import pytest
 
-from src.rds_to_s3_pipeline.transform import TransformRDSData
+from src.rds_to_s3_pipeline.transform import TransformRDSData, SummaryAccumulator
 
 @pytest.fixture
 def sample_df_dict():
@@ -78,3 +78,45 @@ def test_final_dict_has_summary(sample_df_dict):
     keys = {'reading', 'plant', 'photo', 'origin',
             'city', 'country', 'botanist', 'summary'}
     assert set(transformed_dict.keys()) == keys
+
+
+def test_summary_from_chunks_matches_create_summary(sample_df_dict):
+    expected = TransformRDSData(sample_df_dict).create_summary()
+    readings = sample_df_dict['reading']
+    transformer = TransformRDSData({})
+    chunks = [readings.iloc[i:i + 1] for i in range(len(readings))]
+    passed_through = list(transformer.summarise_chunks(iter(chunks)))
+    assert len(passed_through) == len(chunks)
+    pd.testing.assert_frame_equal(transformer.summary_from_chunks(), expected)
+
+
+def test_summary_from_no_chunks_is_empty():
+    summary = TransformRDSData({}).summary_from_chunks()
+    assert summary.empty
+    assert list(summary.columns) == ['plant_id', 'mean_soil_moisture', 'mean_soil_temperature',
+                                     'date', 'watering_count', 'most_recent']
+
+
+def test_create_summary_does_not_add_columns(sample_df_dict):
+    TransformRDSData(sample_df_dict).create_summary()
+    assert 'reading_date' not in sample_df_dict['reading'].columns
+    assert 'watered_date' not in sample_df_dict['reading'].columns
+
+
+def test_accumulators_merge_across_days(sample_df_dict):
+    day_one = sample_df_dict['reading']
+    day_two = day_one.assign(
+        reading_taken=pd.to_datetime(day_one['reading_taken']) + pd.Timedelta(days=1),
+        last_watered=pd.to_datetime(day_one['last_watered']) + pd.Timedelta(days=1),
+        soil_moisture=day_one['soil_moisture'] + 0.2)
+    first, second = SummaryAccumulator(), SummaryAccumulator()
+    first.add(day_one)
+    second.add(day_two)
+    summary = first.merge(second).summary()
+
+    both = SummaryAccumulator()
+    both.add(pd.concat([day_one, day_two]))
+    pd.testing.assert_frame_equal(summary, both.summary())
+    plant_1 = summary[summary['plant_id'] == 1].iloc[0]
+    assert plant_1['watering_count'] == 4
+    assert plant_1['mean_soil_moisture'] == pytest.approx(0.45)
@@ -0,0 +1,94 @@
+# pylint: skip-file
+import threading
+import time
+from functools import partial
+
+import pytest
+
+from src.rds_to_s3_pipeline.uploads import UploadBatch, UploadError, run_uploads, run_with_retry
+
+
+class LocalS3:
+    """In-memory object store with a fixed latency per PUT and optional failures"""
+
+    def __init__(self, latency=0.0, failures=None):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def put(self, key, body):
+        time.sleep(self.latency)
+        with self.lock:
+            if self.failures.get(key, 0):
+                self.failures[key] -= 1
+                raise ConnectionError(f"reset while writing {key}")
+            self.objects[key] = body
+
+
+TABLES = ['plant', 'botanist', 'photo', 'origin', 'city', 'country', 'reading', 'summary']
+
+
+def test_uploads_run_concurrently():
+    s3 = LocalS3(latency=0.1)
+    start = time.perf_counter()
+    timings = run_uploads({table: partial(s3.put, table, b"x") for table in TABLES})
+    elapsed = time.perf_counter() - start
+    assert set(s3.objects) == set(TABLES)
+    assert elapsed < 0.1 * len(TABLES) / 2
+    assert all(timing["seconds"] >= 0.1 for timing in timings.values())
+
+
+def test_transient_failures_are_retried():
+    s3 = LocalS3(failures={"reading": 2})
+    timings = run_uploads({table: partial(s3.put, table, b"x") for table in TABLES},
+                          backoff=0)
+    assert timings["reading"]["attempts"] == 3
+    assert timings["plant"]["attempts"] == 1
+    assert "reading" in s3.objects
+
+
+def test_stage_fails_after_every_upload_finishes():
+    s3 = LocalS3(failures={"summary": 5})
+    with pytest.raises(UploadError) as error:
+        run_uploads({table: partial(s3.put, table, b"x") for table in TABLES}, backoff=0)
+    assert set(error.value.failures) == {"summary"}
+    assert set(s3.objects) == set(TABLES) - {"summary"}
+
+
+def test_retry_gives_up_after_retries():
+    calls = []
+
+    def always_fails():
+        calls.append(1)
+        raise ConnectionError()
+
+    with pytest.raises(ConnectionError):
+        run_with_retry(always_fails, retries=3, backoff=0)
+    assert len(calls) == 3
+
+
+def test_batch_runs_in_the_background_until_waited_on():
+    s3 = LocalS3(latency=0.2)
+    start = time.perf_counter()
+    batch = UploadBatch({table: partial(s3.put, table, b"x") for table in TABLES[:6]})
+    assert time.perf_counter() - start < 0.1
+    s3.put("reading", b"x")
+    assert set(batch.wait()) == set(TABLES[:6])
+    assert time.perf_counter() - start < 0.2 * 3
+    assert set(s3.objects) == set(TABLES[:6]) | {"reading"}
+
+
+def test_batch_wait_raises_failures():
+    s3 = LocalS3(failures={"plant": 5})
+    batch = UploadBatch({table: partial(s3.put, table, b"x") for table in TABLES}, backoff=0)
+    with pytest.raises(UploadError) as error:
+        batch.wait()
+    assert set(error.value.failures) == {"plant"}
+
+
+def test_cancelled_batch_skips_queued_uploads():
+    s3 = LocalS3(latency=0.1)
+    batch = UploadBatch({table: partial(s3.put, table, b"x") for table in TABLES}, max_workers=1)
+    batch.cancel()
+    assert 1 <= len(s3.objects) < len(TABLES)
@@ -0,0 +1,77 @@
+# pylint: skip-file
+from datetime import datetime
+
+import pandas as pd
+
+from src.rds_to_s3_pipeline.watermark import Watermark, purge_readings
+
+
+def make_batch(ids):
+    return pd.DataFrame({
+        "id": ids,
+        "reading_taken": [datetime(2025, 7, 22, 8, i % 60) for i in ids],
+    })
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def execute(self, query, params):
+        self.conn.queries.append((query, params))
+        if "FROM reading" in query:
+            limit, max_id, _ = params
+            self.rowcount = min(limit, sum(i <= max_id for i in self.conn.ids))
+            deleted = sorted(self.conn.ids)[:self.rowcount]
+            self.conn.ids -= set(deleted)
+        else:
+            self.rowcount = 0
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, ids):
+        self.ids = set(ids)
+        self.queries = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_watermark_tracks_largest_batch_values():
+    watermark = Watermark()
+    watermark.update(make_batch([3, 4, 5]))
+    watermark.update(make_batch([1, 2]))
+    watermark.update(make_batch([]))
+    assert watermark.max_id == 5
+    assert watermark.max_reading_taken == datetime(2025, 7, 22, 8, 5)
+    assert watermark.rows == 5
+
+
+def test_watermark_round_trips_through_json():
+    watermark = Watermark(42, datetime(2025, 7, 22, 23, 59), 1000)
+    loaded = Watermark.from_json(watermark.to_json())
+    assert (loaded.max_id, loaded.max_reading_taken, loaded.rows) == (42, datetime(2025, 7, 22, 23, 59), 1000)
+
+
+def test_purge_deletes_in_batches_up_to_the_mark():
+    conn = FakeConn(range(1, 24))
+    deleted = purge_readings(conn, Watermark(20, datetime(2025, 7, 22), 20), batch_size=5)
+    assert deleted == 20
+    assert conn.ids == {21, 22, 23}
+    reading_deletes = [q for q in conn.queries if "FROM reading" in q[0]]
+    assert len(reading_deletes) == 5
+    assert conn.commits == 6
+
+
+def test_purge_skips_when_nothing_was_archived():
+    conn = FakeConn(range(1, 5))
+    assert purge_readings(conn, Watermark()) == 0
+    assert conn.queries == []
@@ -0,0 +1,124 @@
+# pylint: skip-file
+import threading
+
+import pytest
+
+from src.utils import metrics
+from src.utils.db_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise OSError("connection reset")
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect():
+        opened.append(FakeConn())
+        return opened[-1]
+
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def test_released_connection_is_reused():
+    pool, opened = make_pool()
+    conn = pool.acquire()
+    conn.close()
+    again = pool.acquire()
+    assert len(opened) == 1
+    assert pool.stats()["hits"] == 1
+    assert pool.stats()["misses"] == 1
+    again.close()
+
+
+def test_close_returns_instead_of_closing():
+    pool, opened = make_pool()
+    conn = pool.acquire()
+    conn.close()
+    conn.close()
+    assert not opened[0].closed
+    assert opened[0].rollbacks == 1
+    assert pool.stats()["idle"] == 1
+    with pytest.raises(RuntimeError):
+        conn.cursor()
+
+
+def test_failed_health_check_opens_new_connection():
+    pool, opened = make_pool(health_check_after=0)
+    pool.acquire().close()
+    opened[0].broken = True
+    conn = pool.acquire()
+    assert len(opened) == 2
+    assert opened[0].closed
+    assert pool.stats()["discards"] == 1
+    conn.close()
+
+
+def test_expired_connection_is_retired():
+    pool, opened = make_pool(max_lifetime=-1)
+    pool.acquire().close()
+    assert opened[0].closed
+    assert pool.stats()["size"] == 0
+
+
+def test_full_pool_times_out():
+    pool, _ = make_pool(max_size=1)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+    assert pool.stats()["timeouts"] == 1
+    held.close()
+
+
+def test_waiting_checkout_gets_released_connection():
+    pool, opened = make_pool(max_size=1)
+    held = pool.acquire()
+    threading.Timer(0.05, held.close).start()
+    conn = pool.acquire(timeout=2)
+    assert len(opened) == 1
+    assert pool.stats()["wait_max"] > 0
+    conn.close()
+
+
+def test_statements_and_commits_are_counted():
+    pool, _ = make_pool()
+    run = metrics.start_run("test")
+    conn = pool.acquire()
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1")
+    cursor.execute("SELECT 2")
+    assert cursor.fetchall() == [(1,)]
+    conn.commit()
+    conn.close()
+    assert run.counters == {"sql_statements": 2, "sql_commits": 1}
@@ -0,0 +1,87 @@
+# pylint: skip-file
+import json
+import threading
+
+from src.utils import metrics
+
+
+def test_repeated_spans_add_up():
+    run = metrics.RunMetrics("test")
+    with run.span("load"):
+        pass
+    first = run.spans["load"]
+    with run.span("load"):
+        pass
+    assert run.spans["load"] >= first >= 0
+
+
+def test_span_is_recorded_when_block_raises():
+    run = metrics.RunMetrics("test")
+    try:
+        with run.span("extract"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert "extract" in run.spans
+
+
+def test_counters_are_thread_safe():
+    run = metrics.RunMetrics("test")
+
+    def count():
+        for _ in range(1000):
+            run.incr("rows")
+
+    threads = [threading.Thread(target=count) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert run.counters["rows"] == 8000
+
+
+def test_gauge_keeps_highest_value():
+    run = metrics.RunMetrics("test")
+    run.gauge("queue_depth", 3)
+    run.gauge("queue_depth", 7)
+    run.gauge("queue_depth", 5)
+    assert run.gauges["queue_depth"] == 7
+
+
+def test_record_is_embedded_metric_format():
+    run = metrics.RunMetrics("api_to_rds")
+    with run.span("transform"):
+        pass
+    run.incr("transform_rows_out", 12)
+    run.incr("s3_put_bytes", 2048)
+    record = run.record()
+
+    definition = record["_aws"]["CloudWatchMetrics"][0]
+    assert definition["Namespace"] == metrics.NAMESPACE
+    assert definition["Dimensions"] == [["pipeline"]]
+    units = {metric["Name"]: metric["Unit"] for metric in definition["Metrics"]}
+    assert units["transform_ms"] == "Milliseconds"
+    assert units["transform_rows_out"] == "Count"
+    assert units["s3_put_bytes"] == "Bytes"
+    assert units["peak_memory_mb"] == "Megabytes"
+    assert record["pipeline"] == "api_to_rds"
+    assert record["transform_rows_out"] == 12
+    assert all(name in record for name in units)
+
+
+def test_emit_prints_one_json_line_for_current_run(capsys):
+    metrics.start_run("rds_to_s3")
+    metrics.incr("readings_extracted", 5)
+    metrics.emit()
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["pipeline"] == "rds_to_s3"
+    assert record["readings_extracted"] == 5
+
+
+def test_start_run_discards_previous_run():
+    metrics.start_run("first")
+    metrics.incr("rows")
+    metrics.start_run("second")
+    assert metrics.current_run().counters == {}
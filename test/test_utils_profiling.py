@@ -0,0 +1,75 @@
+# pylint: skip-file
+import os
+import pstats
+import time
+
+import pytest
+
+from src.utils import profiling
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.mark.parametrize("event, default, expected", [
+    (None, "", None),
+    (None, "0", None),
+    (None, "1", "sample"),
+    (None, "cprofile", "cprofile"),
+    ({"profile": "sample"}, "", "sample"),
+    ({"profile": True}, "", "sample"),
+    ({"profile": False}, "cprofile", None),
+    ({}, "cprofile", "cprofile"),
+    ({"profile": "flamegraph"}, "", None),
+])
+def test_profile_mode(event, default, expected):
+    assert profiling.profile_mode(event, default) == expected
+
+
+def test_off_writes_nothing(tmp_path):
+    with profiling.profiled("api_to_rds", None, str(tmp_path)) as profiler:
+        busy_wait(0.01)
+    assert profiler is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_sample_writes_collapsed_stacks(tmp_path):
+    with profiling.profiled("api_to_rds", "sample", str(tmp_path)) as sampler:
+        busy_wait(0.2)
+    [name] = os.listdir(tmp_path)
+    assert name.startswith("api_to_rds-") and name.endswith(".folded")
+    lines = (tmp_path / name).read_text().splitlines()
+    assert sampler.samples > 0
+    busy = [line for line in lines if "test_utils_profiling:busy_wait" in line]
+    assert busy
+    stack, count = busy[0].rsplit(" ", 1)
+    assert stack.startswith("MainThread;") and int(count) > 0
+
+
+def test_cprofile_writes_pstats(tmp_path):
+    with profiling.profiled("rds_to_s3", "cprofile", str(tmp_path)):
+        busy_wait(0.01)
+    [name] = os.listdir(tmp_path)
+    assert name.endswith(".pstats")
+    stats = pstats.Stats(str(tmp_path / name))
+    assert any(func[2] == "busy_wait" for func in stats.stats)
+
+
+def test_profile_is_written_when_run_fails(tmp_path):
+    with pytest.raises(ValueError):
+        with profiling.profiled("api_to_rds", "sample", str(tmp_path)):
+            raise ValueError("boom")
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_profile_is_uploaded_when_s3_uri_set(tmp_path, monkeypatch):
+    uploaded = []
+    monkeypatch.setattr(profiling, "upload_profile",
+                        lambda path, uri: uploaded.append((os.path.basename(path), uri)))
+    with profiling.profiled("rds_to_s3", "sample", str(tmp_path), "s3://bucket/profiles"):
+        pass
+    [name] = os.listdir(tmp_path)
+    assert uploaded == [(name, "s3://bucket/profiles")]